@@ -1,4 +1,8 @@
+import multiprocessing
+
 from new_certificazione_770.main import main
 
 if __name__ == "__main__":
+    # Worker processes of the job runner in the frozen executable
+    multiprocessing.freeze_support()
     main()
@@ -24,6 +24,8 @@ LICENSE = __license__
 LICENSE_FILE_NAME = "LICENSE"
 
 LOG_FILE_NAME = f"{PACKAGE}.log"
+STARTUP_REPORT_FILE_NAME = f"{PACKAGE}.startup.jsonl"
+STATISTICS_REPORT_FILE_NAME = f"{PACKAGE}.stats.txt"
 
 LOGGING_CONFIG = {
     "version": 1,
@@ -1,4 +1,16 @@
 from .controller import Controller
+from .datasource import DistributorDataSource
+from .import_run import ImportRunRecorder
+from .job_runner import Job, JobRunner
+from .progress import ProgressChannel
 from .result_thread import ResultThread
 
-__all__ = [Controller, ResultThread]
+__all__ = [
+    Controller,
+    DistributorDataSource,
+    ImportRunRecorder,
+    Job,
+    JobRunner,
+    ProgressChannel,
+    ResultThread,
+]
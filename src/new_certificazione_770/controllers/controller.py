@@ -7,19 +7,57 @@ Controller class module
 """
 
 # Built-in/Generic Imports
-from typing import Any, Dict
+import json
+from contextlib import AbstractContextManager, nullcontext
+from datetime import date
+from typing import Any, Callable, Dict, Iterator, List, get_args
 
 # Own modules
 try:
-    from ..models import Company, Distributor, Invoice, Repository, Setting
+    from ..models import (
+        DUPLICATE_MODES,
+        IMPORT_ABANDONED,
+        IMPORT_RUNNING,
+        REJECT_CORRECTED,
+        REJECT_DUPLICATE,
+        REJECT_INVALID,
+        REJECT_NO_DISTRIBUTOR,
+        REJECT_OPEN,
+        REJECT_REPROCESSED,
+        REJECT_STAGE_VALIDATE,
+        REJECT_STAGE_WRITE,
+        Company,
+        Distributor,
+        ImportRun,
+        Invoice,
+        Repository,
+        Setting,
+    )
 except:
     from new_certificazione_770.models import (
+        DUPLICATE_MODES,
+        IMPORT_ABANDONED,
+        IMPORT_RUNNING,
+        REJECT_CORRECTED,
+        REJECT_DUPLICATE,
+        REJECT_INVALID,
+        REJECT_NO_DISTRIBUTOR,
+        REJECT_OPEN,
+        REJECT_REPROCESSED,
+        REJECT_STAGE_VALIDATE,
+        REJECT_STAGE_WRITE,
         Company,
         Distributor,
+        ImportRun,
         Invoice,
         Repository,
         Setting,
     )
+try:
+    from .. import metrics
+except:  # noqa: E722
+    import new_certificazione_770.metrics as metrics
+from . import progress
 
 
 # Errors
@@ -39,6 +77,63 @@ class NoDataFoundError(ValueError):
     """
 
 
+class DuplicateInvoiceError(ValueError):
+    """DuplicateInvoiceError
+
+    Args:
+        ValueError (_type_): Invoice already imported (duplicate mode report)
+    """
+
+
+# Errors of the insert_invoices_bulk and merge_staged_rows reject codes
+REJECT_ERRORS = {
+    REJECT_NO_DISTRIBUTOR: NoDataFoundError,
+    REJECT_DUPLICATE: DuplicateInvoiceError,
+    REJECT_INVALID: ValueError,
+}
+
+# Models of the staged import
+STAGED_MODELS = {Distributor.__name__: Distributor, Invoice.__name__: Invoice}
+
+REPROCESS_CHUNK_SIZE = 500  # corrected rejects reprocessed per transaction
+
+
+def _from_json_record(model: Any, record: Dict[str, Any]) -> Dict[str, Any]:
+    """Source record of a reject with its dates back from the JSON strings
+
+    Args:
+        model (Any): SQL model
+        record (Dict[str, Any]): JSON decoded record
+
+    Raises:
+        ValueError: invalid date
+
+    Returns:
+        Dict[str, Any]: record
+    """
+    record = dict(record)
+    for key, field in model.model_fields.items():
+        value = record.get(key)
+        types = (field.annotation, *get_args(field.annotation))
+        if isinstance(value, str) and date in types:
+            record[key] = date.fromisoformat(value) if value else None
+    return record
+
+
+def reject_code(error: Any) -> str:
+    """Error code of an import reject: the exception class name
+
+    Args:
+        error (Any): exception or message
+
+    Returns:
+        str: error code
+    """
+    if isinstance(error, BaseException):
+        return type(error).__name__
+    return "Error"
+
+
 # Class
 class Controller:
     """Controller Class"""
@@ -53,6 +148,12 @@ class Controller:
         # Create Repository object
         self.repository = Repository(database_path=db_path)
         self.repository.open_session(echo=echo)
+        # Statistics cache: key -> (data version, result)
+        self._statistics: Dict[tuple, tuple[int, Any]] = {}
+
+    def close(self) -> None:
+        """Close database sessions and connection pool"""
+        self.repository.close_session()
 
     def get_distributor_by_id(self, id: int) -> dict | None:
         """Get distributor by id
@@ -130,7 +231,8 @@ class Controller:
             raise NoDataFoundError(msg)
 
         record["distributor_id"] = _distributor.id
-        _invoice = Invoice(**record)
+        with metrics.timer("controller.validate"):
+            _invoice = Invoice(**record)
         _invoice = self.repository.add(model=Invoice, record=_invoice)
         return (
             _invoice.model_dump(exclude={"created_at", "updated_at"})
@@ -138,6 +240,502 @@ class Controller:
             else None
         ), False
 
+    def validate_invoices(
+        self, records: List[Any]
+    ) -> tuple[List[Dict[str, Any]], List[Any], List[tuple[Any, Exception]]]:
+        """Validate a batch of records for the Invoices table, without
+        database access (see insert_invoices)
+
+        Args:
+            records (List[Any]): data records
+
+        Returns:
+            tuple[List[Dict[str, Any]], List[Any], List[tuple[Any, Exception]]]:
+                valid records (model dump), their source records and rejected
+                (record, error)
+        """
+        key = "distributor_number"
+        rejects = []
+        valid_records = []
+        valid_items = []
+        with metrics.timer("controller.validate"):
+            for record in records:
+                try:
+                    if dict(record).get(key, None) is None:
+                        msg = f"Item has not {key} attribute or {key} value is None"
+                        raise KeyAttributeNotFoundError(msg)
+                    _invoice = Invoice.model_validate(record)
+                    valid_records.append(_invoice.model_dump(exclude={"id"}))
+                    valid_items.append(record)
+                except Exception as e:
+                    rejects.append((record, e))
+        return valid_records, valid_items, rejects
+
+    def insert_invoices(
+        self,
+        records: List[Dict[str, Any]],
+        items: List[Any],
+        duplicates: str = DUPLICATE_MODES[0],
+    ) -> tuple[int, int, int, List[tuple[Any, Exception]]]:
+        """Insert a batch of records validated by validate_invoices into
+        Invoices table
+
+        Args:
+            records (List[Dict[str, Any]]): valid records from validate_invoices
+            items (List[Any]): their source records, for the rejects
+            duplicates (str, optional): duplicate invoice mode (skip, replace,
+                report or keep). Defaults to skip.
+
+        Returns:
+            tuple[int, int, int, List[tuple[Any, Exception]]]: inserted, replaced,
+                skipped and rejected (record, error)
+        """
+        inserted, replaced, skipped, _rejects = self.repository.insert_invoices_bulk(
+            records=records, duplicates=duplicates
+        )
+        rejects = [
+            (items[index], REJECT_ERRORS[code](msg)) for index, code, msg in _rejects
+        ]
+        return inserted, replaced, skipped, rejects
+
+    def ensure_invoice_natural_key(self, unique: bool = False) -> bool:
+        """Create the invoice natural key index, unique if requested and
+        possible
+
+        Args:
+            unique (bool, optional): unique index. Defaults to False.
+
+        Returns:
+            bool: True if the unique index exists
+        """
+        return self.repository.ensure_invoice_natural_key(unique=unique)
+
+    def transaction(self) -> AbstractContextManager:
+        """Write unit of work: the writes made inside commit together (e.g. a
+        chunk of invoices and its import checkpoint)
+
+        Returns:
+            AbstractContextManager: session scope
+        """
+        return self.repository.session_scope(write=True)
+
+    def get_import_run(
+        self, file_hash: str, import_type: str
+    ) -> Dict[str, Any] | None:
+        """Get the interrupted import of a file, to resume it
+
+        Args:
+            file_hash (str): source file SHA-256
+            import_type (str): import type (model name and import path)
+
+        Returns:
+            Dict[str, Any] | None: import run or None
+        """
+        _run = self.repository.get_resumable_import_run(
+            file_hash=file_hash, import_type=import_type
+        )
+        return _run.model_dump() if _run else None
+
+    def start_import_run(
+        self,
+        file_hash: str,
+        file_name: str,
+        import_type: str,
+        duplicates: str,
+        chunk_size: int,
+        resume: bool = False,
+    ) -> Dict[str, Any]:
+        """Start the import of a file: resume its interrupted run (checkpoint
+        and counters) or create a new run, abandoning the interrupted one
+
+        Args:
+            file_hash (str): source file SHA-256
+            file_name (str): source file name
+            import_type (str): import type (model name and import path)
+            duplicates (str): duplicate invoice mode
+            chunk_size (int): rows per checkpoint
+            resume (bool, optional): resume the interrupted run. Defaults to False.
+
+        Returns:
+            Dict[str, Any]: import run
+        """
+        _run = self.repository.get_resumable_import_run(
+            file_hash=file_hash, import_type=import_type
+        )
+        if _run is not None and resume:
+            # The chunks are the ones of the interrupted run
+            self.repository.update_import_run(id=_run.id, status=IMPORT_RUNNING)
+            _run.status = IMPORT_RUNNING
+            return _run.model_dump()
+        if _run is not None:
+            self.repository.update_import_run(id=_run.id, status=IMPORT_ABANDONED)
+            self.repository.delete_staged_rows(import_run_id=_run.id)
+        _run = ImportRun(
+            file_hash=file_hash,
+            file_name=file_name,
+            import_type=import_type,
+            duplicates=duplicates,
+            status=IMPORT_RUNNING,
+            chunk_size=chunk_size,
+        )
+        _run = self.repository.add(model=ImportRun, record=_run)
+        return _run.model_dump()
+
+    def checkpoint_import_run(
+        self, id: int, chunk: int, counters: Dict[str, int]
+    ) -> None:
+        """Record the last committed chunk of an import and its counters
+
+        Args:
+            id (int): import run id
+            chunk (int): chunk index
+            counters (Dict[str, int]): rows_done, inserted, updated, errors,
+                skipped
+        """
+        self.repository.update_import_run(id=id, last_chunk=chunk, **counters)
+
+    def finish_import_run(
+        self, id: int, status: str, counters: Dict[str, int] | None = None
+    ) -> None:
+        """Record the final status of an import
+
+        Args:
+            id (int): import run id
+            status (str): completed, cancelled or failed
+            counters (Dict[str, int] | None, optional): final counters, None
+                to keep the ones of the last checkpoint. Defaults to None.
+        """
+        self.repository.update_import_run(id=id, status=status, **(counters or {}))
+
+    def _staged_model(self, model: str) -> Any:
+        """SQL model of a staged import
+
+        Args:
+            model (str): model name
+
+        Raises:
+            ValueError: model unknown
+
+        Returns:
+            Any: SQL model
+        """
+        if model not in STAGED_MODELS:
+            msg = f"Model unknown: {model=}"
+            raise ValueError(msg)
+        return STAGED_MODELS[model]
+
+    def stage_rows(
+        self,
+        import_run_id: int,
+        model: str,
+        records: List[Dict[str, Any]],
+        first_row: int = 0,
+        cache_size: int | None = None,
+    ) -> int:
+        """Load a chunk of normalized records into the staging table of a
+        staged import
+
+        Args:
+            import_run_id (int): import run id
+            model (str): model name
+            records (List[Dict[str, Any]]): normalized records
+            first_row (int, optional): source row of the first record. Defaults to 0.
+            cache_size (int | None, optional): database page cache in KiB.
+                Defaults to None.
+
+        Returns:
+            int: records staged
+        """
+        return self.repository.stage_rows(
+            model=self._staged_model(model),
+            import_run_id=import_run_id,
+            rows=records,
+            first_row=first_row,
+            cache_size=cache_size,
+        )
+
+    def count_staged_rows(self, import_run_id: int, model: str) -> int:
+        """Count the staged records of an import run not merged yet
+
+        Args:
+            import_run_id (int): import run id
+            model (str): model name
+
+        Returns:
+            int: staged records
+        """
+        return self.repository.count_staged_rows(
+            model=self._staged_model(model), import_run_id=import_run_id
+        )
+
+    def merge_staged_rows(
+        self,
+        import_run_id: int,
+        model: str,
+        duplicates: str = DUPLICATE_MODES[0],
+        limit: int = REPROCESS_CHUNK_SIZE,
+        cache_size: int | None = None,
+    ) -> tuple[int, int, int, int, List[tuple[Any, Exception, str]]]:
+        """Validate and merge the next batch of staged records of an import
+        run, see Repository.merge_staged_rows
+
+        Args:
+            import_run_id (int): import run id
+            model (str): model name
+            duplicates (str, optional): duplicate invoice mode (skip, replace,
+                report or keep). Defaults to skip.
+            limit (int, optional): records per batch. Defaults to REPROCESS_CHUNK_SIZE.
+            cache_size (int | None, optional): database page cache in KiB.
+                Defaults to None.
+
+        Returns:
+            tuple[int, int, int, int, List[tuple[Any, Exception, str]]]: records
+                of the batch (0 when nothing is staged), inserted, updated,
+                skipped and rejected (record, error, stage)
+        """
+        size, inserted, updated, skipped, _rejects = self.repository.merge_staged_rows(
+            model=self._staged_model(model),
+            import_run_id=import_run_id,
+            duplicates=duplicates,
+            limit=limit,
+            cache_size=cache_size,
+        )
+        rejects = [
+            (record, REJECT_ERRORS[code](msg), stage)
+            for record, stage, code, msg in _rejects
+        ]
+        return size, inserted, updated, skipped, rejects
+
+    def reject_staged_rows(
+        self, import_run_id: int, model: str, limit: int = REPROCESS_CHUNK_SIZE
+    ) -> List[Dict[str, Any]]:
+        """Remove the next batch of staged records of an import run, when its
+        merge failed
+
+        Args:
+            import_run_id (int): import run id
+            model (str): model name
+            limit (int, optional): records per batch. Defaults to REPROCESS_CHUNK_SIZE.
+
+        Returns:
+            List[Dict[str, Any]]: records of the batch
+        """
+        return self.repository.reject_staged_rows(
+            model=self._staged_model(model), import_run_id=import_run_id, limit=limit
+        )
+
+    def get_import_runs(self, with_rejects: bool = False) -> List[Dict[str, Any]]:
+        """Get the import runs, the last first
+
+        Args:
+            with_rejects (bool, optional): only the runs with rejects. Defaults to False.
+
+        Returns:
+            List[Dict[str, Any]]: import runs
+        """
+        runs = self.repository.list_import_runs(with_rejects=with_rejects)
+        return [dict(_run.model_dump(), created_at=_run.created_at) for _run in runs]
+
+    def add_import_rejects(
+        self, import_run_id: int, rejects: List[tuple[Any, Any, str]]
+    ) -> int:
+        """Store the rejects of an import run
+
+        Args:
+            import_run_id (int): import run id
+            rejects (List[tuple[Any, Any, str]]): (source record, error, stage)
+
+        Returns:
+            int: rejects stored
+        """
+        rows = [
+            dict(
+                import_run_id=import_run_id,
+                stage=stage,
+                error_code=reject_code(error),
+                error_message=str(error),
+                status=REJECT_OPEN,
+                data=json.dumps(dict(record or {}), default=str),
+            )
+            for record, error, stage in rejects
+        ]
+        return self.repository.add_import_rejects(rows=rows)
+
+    def get_import_rejects(
+        self,
+        import_run_id: int,
+        limit: int | None = None,
+        offset: int = 0,
+        search: str | None = None,
+        **filters,
+    ) -> List[Dict[str, Any]]:
+        """Get the rejects of an import run, the source record decoded
+
+        Args:
+            import_run_id (int): import run id
+            limit (int | None, optional): max rejects. Defaults to None.
+            offset (int, optional): rejects to skip. Defaults to 0.
+            search (str | None, optional): text in the row or the message. Defaults to None.
+            filters: stage, error_code, status
+
+        Returns:
+            List[Dict[str, Any]]: rejects
+        """
+        rejects = self.repository.list_import_rejects(
+            import_run_id, limit=limit, offset=offset, search=search, **filters
+        )
+        return [
+            dict(_reject.model_dump(), data=json.loads(_reject.data))
+            for _reject in rejects
+        ]
+
+    def count_import_rejects(
+        self, import_run_id: int, search: str | None = None, **filters
+    ) -> int:
+        """Count the rejects of an import run, see get_import_rejects"""
+        return self.repository.count_import_rejects(
+            import_run_id, search=search, **filters
+        )
+
+    def get_import_reject_summary(self, import_run_id: int) -> List[Dict[str, Any]]:
+        """Count the rejects of an import run by stage, error code and status
+
+        Args:
+            import_run_id (int): import run id
+
+        Returns:
+            List[Dict[str, Any]]: stage, error_code, status, rejects
+        """
+        rows = self.repository.get_import_reject_summary(import_run_id)
+        return [dict(row._mapping) for row in rows]
+
+    def correct_import_reject(self, id: int, data: Dict[str, Any]) -> None:
+        """Store the corrected source record of a reject, to reprocess it
+
+        Args:
+            id (int): reject id
+            data (Dict[str, Any]): corrected record
+        """
+        self.repository.update_import_rejects(
+            ids=[id], data=json.dumps(data, default=str), status=REJECT_CORRECTED
+        )
+
+    def reprocess_import_rejects(
+        self, import_run_id: int, chunk_size: int = REPROCESS_CHUNK_SIZE
+    ) -> tuple[int, int]:
+        """Import again the corrected rejects of an import run, with its
+        duplicate mode; the other rows of the source are not read again
+
+        The rejects imported become reprocessed, the ones still failing go
+        back to open with their new error. Invoices are written with their
+        reject updates in one transaction per chunk, distributors are
+        upserted one by one like in the import.
+
+        Args:
+            import_run_id (int): import run id
+            chunk_size (int, optional): rejects per chunk. Defaults to REPROCESS_CHUNK_SIZE.
+
+        Raises:
+            NoDataFoundError: import run not found
+
+        Returns:
+            tuple[int, int]: rejects reprocessed, rejects still failing
+        """
+        _run = self.repository.get_by_id(ImportRun, import_run_id)
+        if _run is None:
+            msg = f"No import run found for {import_run_id=}"
+            raise NoDataFoundError(msg)
+        model = _run.import_type.split(":")[0]
+        counters = dict(
+            inserted=_run.inserted,
+            updated=_run.updated,
+            errors=_run.errors,
+            skipped=_run.skipped,
+        )
+        reprocessed = rejected = 0
+        with metrics.timer("import.reprocess"):
+            while True:
+                rejects = self.repository.list_import_rejects(
+                    import_run_id, limit=chunk_size, status=REJECT_CORRECTED
+                )
+                if not rejects:
+                    break
+                # Distributor rows commit one by one, like in the import
+                is_invoice = model == Invoice.__name__
+                with self.transaction() if is_invoice else nullcontext():
+                    done, failed = self._reprocess_rejects(
+                        model, rejects, _run.duplicates, counters
+                    )
+                    self.repository.update_import_rejects(
+                        ids=done, status=REJECT_REPROCESSED
+                    )
+                    for _id, error, stage in failed:
+                        self.repository.update_import_rejects(
+                            ids=[_id],
+                            stage=stage,
+                            error_code=reject_code(error),
+                            error_message=str(error),
+                            status=REJECT_OPEN,
+                        )
+                    counters["errors"] -= len(done)
+                    self.repository.update_import_run(id=import_run_id, **counters)
+                reprocessed += len(done)
+                rejected += len(failed)
+                progress.advance(len(rejects))
+        metrics.count("import.reprocessed", reprocessed)
+        return reprocessed, rejected
+
+    def _reprocess_rejects(
+        self,
+        model: str,
+        rejects: List[Any],
+        duplicates: str,
+        counters: Dict[str, int],
+    ) -> tuple[List[int], List[tuple[int, Exception, str]]]:
+        """Import a chunk of rejects, counting the rows in counters
+
+        Returns:
+            tuple[List[int], List[tuple[int, Exception, str]]]: reprocessed
+                reject ids and failed (reject id, error, stage)
+        """
+        records = [json.loads(_reject.data) for _reject in rejects]
+        failed = []
+        if model == Invoice.__name__:
+            ids = {id(record): _reject.id for record, _reject in zip(records, rejects)}
+            valid_records, valid_items, _rejects = self.validate_invoices(records)
+            failed.extend(
+                (ids[id(record)], error, REJECT_STAGE_VALIDATE)
+                for record, error in _rejects
+            )
+            inserted, replaced, skipped, _rejects = self.insert_invoices(
+                records=valid_records, items=valid_items, duplicates=duplicates
+            )
+            failed.extend(
+                (ids[id(record)], error, REJECT_STAGE_WRITE)
+                for record, error in _rejects
+            )
+            counters["inserted"] += inserted
+            counters["updated"] += replaced
+            counters["skipped"] += skipped
+        elif model == Distributor.__name__:
+            for record, _reject in zip(records, rejects):
+                try:
+                    record = _from_json_record(Distributor, record)
+                except Exception as e:
+                    failed.append((_reject.id, e, REJECT_STAGE_VALIDATE))
+                    continue
+                try:
+                    _, is_updated = self.import_distributor(record)
+                    counters["updated" if is_updated else "inserted"] += 1
+                except Exception as e:
+                    failed.append((_reject.id, e, REJECT_STAGE_WRITE))
+        else:
+            msg = f"Model unknown: {model=}"
+            raise ValueError(msg)
+        failed_ids = {_id for _id, _, _ in failed}
+        done = [_reject.id for _reject in rejects if _reject.id not in failed_ids]
+        return done, failed
+
     def import_distributor(self, record: Any) -> tuple[Dict[str, Any] | None, bool]:
         """Import data into Distributor table
 
@@ -254,6 +852,29 @@ class Controller:
             else None
         )
 
+    def get_distributor_count(self) -> int:
+        """Get number of distributors
+
+        Returns:
+            int: number of distributors
+        """
+        return self.repository.get_distributor_count()
+
+    def iter_distributor_rows(
+        self, fields: List[str], chunk_size: int = 1000
+    ) -> Iterator[List[list]]:
+        """Stream Distributor rows for the treeview in chunks
+
+        Args:
+            fields (List[str]): Distributor fields, in column order
+            chunk_size (int, optional): rows per chunk. Defaults to 1000.
+
+        Yields:
+            Iterator[List[list]]: list of rows, empty values as ""
+        """
+        for chunk in self.repository.iter_columns(Distributor, fields, chunk_size):
+            yield [[value if value else "" for value in row] for row in chunk]
+
     def get_company(self) -> Dict[str, Any] | None:
         """Get first Company record
 
@@ -328,3 +949,82 @@ class Controller:
         else:
             msg = f"Model unknown: {model=}"
             raise ValueError(msg)
+
+    def _cached_statistic(self, key: tuple, query: Callable[[], Any]) -> Any:
+        """Get statistic from cache or compute it
+
+        The cached value is valid until a write or a schema change (table
+        recreation, migrations) changes the repository data version.
+
+        Args:
+            key (tuple): cache key
+            query (Callable[[], Any]): function computing the statistic
+
+        Returns:
+            Any: statistic value
+        """
+        version = self.repository.data_version
+        cached = self._statistics.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        result = query()
+        self._statistics[key] = (version, result)
+        return result
+
+    def get_statistics(self, year: int | None = None, top: int = 10) -> Dict[str, Any]:
+        """Get invoice and distributor statistics
+
+        Args:
+            year (int | None, optional): year or all years. Defaults to None.
+            top (int, optional): number of top distributors. Defaults to 10.
+
+        Returns:
+            Dict[str, Any]: statistics with keys years (totals per year),
+                totals (sum of all selected years), distributors,
+                distributors_without_invoices and top_distributors
+        """
+        years = self._cached_statistic(
+            ("invoice_totals", year),
+            lambda: [
+                row._asdict() for row in self.repository.get_invoice_totals(year)
+            ],
+        )
+        distributors = self._cached_statistic(
+            ("distributor_count",), self.repository.get_distributor_count
+        )
+        without_invoices = self._cached_statistic(
+            ("distributors_without_invoices", year),
+            lambda: self.repository.get_distributors_without_invoices_count(year),
+        )
+        top_distributors = (
+            self._cached_statistic(
+                ("top_distributors", year, top),
+                lambda: [
+                    row._asdict()
+                    for row in self.repository.get_top_distributors(year, limit=top)
+                ],
+            )
+            if top > 0
+            else []
+        )
+
+        totals = {
+            key: sum(row[key] for row in years)
+            for key in (
+                "invoices",
+                "taxable_amount",
+                "vat_amount",
+                "inps_amount",
+                "rit_amount",
+                "total_amount",
+            )
+        }
+        return {
+            "year": year,
+            "years": years,
+            "totals": totals,
+            "distributors": distributors,
+            "distributors_without_invoices": without_invoices,
+            "top_distributors": top_distributors,
+        }
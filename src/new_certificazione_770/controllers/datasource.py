@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+Tableview data sources
+
+A data source serves the Tableview pages from the database instead of
+keeping all the rows in memory: each page is a LIMIT/OFFSET (or keyset)
+query and the recently viewed pages are kept in a small LRU cache, which is
+dropped whenever the repository data changes. The Tableview requests the
+pages from worker threads, so the caches are guarded by a lock.
+
+@File: datasource.py
+@Date: 2026-10-19
+"""
+
+# Built-in/Generic Imports
+import threading
+from collections import OrderedDict
+from typing import Iterator, List
+
+# Own modules
+try:
+    from ..models import Distributor
+except:  # noqa: E722
+    from new_certificazione_770.models import Distributor
+from .controller import Controller
+
+# Constants
+PAGE_CACHE_SIZE = 16  # pages kept in the LRU cache
+COUNT_CACHE_SIZE = 16  # row counts kept per search/filter
+
+
+class DistributorDataSource:
+    """Tableview data source of the Distributor table
+
+    Columns are addressed by their index in fields, as the Tableview
+    store does. Rows are shaped like the in-memory grid (empty values
+    as "").
+    """
+
+    def __init__(
+        self,
+        controller: Controller,
+        fields: List[str],
+        cache_size: int = PAGE_CACHE_SIZE,
+    ):
+        """Initialize data source
+
+        Args:
+            controller (Controller): controller
+            fields (List[str]): Distributor fields, in column order
+            cache_size (int, optional): pages kept in cache. Defaults to PAGE_CACHE_SIZE.
+        """
+        self._repository = controller.repository
+        self._fields = list(fields)
+        self._id_index = self._fields.index("id") if "id" in self._fields else None
+        self._cache_size = cache_size
+        self._pages: OrderedDict = OrderedDict()
+        self._counts: OrderedDict = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+
+    @property
+    def fields(self) -> List[str]:
+        """Distributor fields, in column order"""
+        return list(self._fields)
+
+    def _validate_cache(self) -> None:
+        """Drop cached pages and counts when the database changed"""
+        version = self._repository.data_version
+        if version != self._version:
+            self._pages.clear()
+            self._counts.clear()
+            self._version = version
+
+    def _filters(self, filters) -> tuple:
+        """Map (index, operator, value) filters to column names"""
+        return tuple(
+            (self._fields[index], operator, value) for index, operator, value in filters
+        )
+
+    def check_filters(self, filters) -> None:
+        """Check the filters without querying the rows
+
+        Args:
+            filters (Iterable[tuple]): (index, operator, value) predicates
+
+        Raises:
+            ValueError: invalid column, operator or value
+        """
+        self._repository.check_page_filters(Distributor, self._filters(filters))
+
+    def count(self, search: str = "", filters=()) -> int:
+        """Count the rows matching search and filters
+
+        Args:
+            search (str, optional): text contained in any column. Defaults to "".
+            filters (Iterable[tuple], optional): (index, operator, value)
+                predicates. Defaults to ().
+
+        Returns:
+            int: number of rows
+        """
+        with self._lock:
+            self._validate_cache()
+            filters = self._filters(filters)
+            key = (search, filters)
+            if key in self._counts:
+                self._counts.move_to_end(key)
+                return self._counts[key]
+
+            count = self._repository.count_page_rows(
+                Distributor, self._fields, search=search, filters=filters
+            )
+            self._counts[key] = count
+            if len(self._counts) > COUNT_CACHE_SIZE:
+                self._counts.popitem(last=False)
+            return count
+
+    def page(
+        self,
+        offset: int,
+        limit: int,
+        sort: tuple | None = None,
+        search: str = "",
+        filters=(),
+    ) -> List[list]:
+        """Get the rows of one page
+
+        Args:
+            offset (int): rows to skip
+            limit (int): rows of the page
+            sort (tuple | None, optional): (index, descending) sort column.
+                Defaults to None (id order).
+            search (str, optional): text contained in any column. Defaults to "".
+            filters (Iterable[tuple], optional): (index, operator, value)
+                predicates. Defaults to ().
+
+        Returns:
+            List[list]: rows of the page
+        """
+        with self._lock:
+            self._validate_cache()
+            filters = self._filters(filters)
+            key = (offset, limit, sort, search, filters)
+            if key in self._pages:
+                self._pages.move_to_end(key)
+                return self._pages[key]
+
+            order_by, descending = None, False
+            if sort is not None:
+                order_by, descending = self._fields[sort[0]], bool(sort[1])
+
+            # The page after a cached one is read by keyset on id
+            after_id = None
+            previous = self._pages.get((offset - limit, limit, sort, search, filters))
+            if sort is None and previous and self._id_index is not None:
+                after_id = previous[-1][self._id_index]
+
+            rows = self._repository.get_page(
+                Distributor,
+                self._fields,
+                offset=offset,
+                limit=limit,
+                order_by=order_by,
+                descending=descending,
+                search=search,
+                filters=filters,
+                after_id=after_id,
+            )
+            rows = [[value if value else "" for value in row] for row in rows]
+            self._pages[key] = rows
+            if len(self._pages) > self._cache_size:
+                self._pages.popitem(last=False)
+            return rows
+
+    def iter_rows(
+        self,
+        sort: tuple | None = None,
+        search: str = "",
+        filters=(),
+        chunk_size: int = 1000,
+    ) -> Iterator[list]:
+        """Iterate the rows matching search and filters, chunk by chunk
+
+        Pages are read by keyset when unsorted and are not cached, so the
+        rows can be streamed from a worker thread (e.g. an export).
+
+        Args:
+            sort (tuple | None, optional): (index, descending) sort column.
+                Defaults to None (id order).
+            search (str, optional): text contained in any column. Defaults to "".
+            filters (Iterable[tuple], optional): (index, operator, value)
+                predicates. Defaults to ().
+            chunk_size (int, optional): rows read per query. Defaults to 1000.
+
+        Yields:
+            Iterator[list]: rows
+        """
+        filters = self._filters(filters)
+        order_by, descending = None, False
+        if sort is not None:
+            order_by, descending = self._fields[sort[0]], bool(sort[1])
+        keyset = order_by is None and self._id_index is not None
+
+        offset, after_id = 0, None
+        while True:
+            rows = self._repository.get_page(
+                Distributor,
+                self._fields,
+                offset=offset,
+                limit=chunk_size,
+                order_by=order_by,
+                descending=descending,
+                search=search,
+                filters=filters,
+                after_id=after_id,
+            )
+            for row in rows:
+                yield [value if value else "" for value in row]
+            if len(rows) < chunk_size:
+                return
+            offset += len(rows)
+            if keyset:
+                after_id = rows[-1][self._id_index]
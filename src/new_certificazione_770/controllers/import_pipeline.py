@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+Import pipeline
+
+One-shot import where reading, validation and writing overlap: a reader
+produces chunks of rows, a validator cleans and validates them and a
+writer persists them. Reader and validator run on their own threads, the
+writer on the calling thread (the worker of the job), connected by
+bounded queues: a fast stage waits for the slower one instead of filling
+the memory, and the wall time is about the one of the slowest stage
+instead of the sum of the stages.
+
+Each stage is timed in the metrics of the run (pipeline.read,
+pipeline.validate, pipeline.write), the time spent waiting on a full
+queue shows which stage is the bottleneck (pipeline.*_blocked).
+
+@File: import_pipeline.py
+@Date: 2026-10-19
+"""
+
+# Built-in/Generic Imports
+import threading
+from contextlib import ExitStack
+from queue import Empty, Full, Queue
+from typing import Any, Callable, Dict, Iterator, List
+
+# Own modules
+try:
+    from .. import metrics
+except:  # noqa: E722
+    import new_certificazione_770.metrics as metrics
+from . import progress
+
+# Constants
+PIPELINE_CHUNK_SIZE = 500  # rows per chunk
+PIPELINE_QUEUE_SIZE = 4  # chunks buffered between two stages
+PIPELINE_POLL = 0.1  # seconds between two checks of the stop events
+
+_END = object()  # end of the stream
+
+
+def read_excel_chunks(
+    file_path: str, columns: List[str], chunk_size: int = PIPELINE_CHUNK_SIZE
+) -> Iterator[List[Dict[str, Any]]]:
+    """Read the first sheet of an Excel file (xlsx, xlsm) by chunks of rows,
+    without loading the whole file
+
+    The total number of rows is set on the progress channel of the calling
+    thread when the sheet dimension is known.
+
+    Args:
+        file_path (str): Excel file path
+        columns (List[str]): required columns (first row)
+        chunk_size (int, optional): rows per chunk. Defaults to PIPELINE_CHUNK_SIZE.
+
+    Raises:
+        ValueError: missing required columns
+
+    Yields:
+        Iterator[List[Dict[str, Any]]]: chunks of rows as {column: value}
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(filename=file_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None) or ()
+        header = [str(name).strip() if name is not None else "" for name in header]
+        missing_columns = [name for name in columns if name not in header]
+        if missing_columns:
+            msg = f"For excel file missing required columns: {", ".join(missing_columns)}"
+            raise ValueError(msg)
+        if sheet.max_row:
+            progress.set_total(sheet.max_row - 1)
+
+        chunk = []
+        for row in rows:
+            if not any(value is not None for value in row):
+                continue
+            chunk.append(dict(zip(header, row)))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    finally:
+        workbook.close()
+
+
+def run_pipeline(
+    read: Callable[[], Iterator[Any]],
+    validate: Callable[[Any], Any],
+    write: Callable[[Any], None],
+    event: threading.Event,
+    name: str = "Pipeline",
+    queue_size: int = PIPELINE_QUEUE_SIZE,
+) -> bool:
+    """Run a reader, a validator and a writer stage concurrently
+
+    Args:
+        read (Callable[[], Iterator[Any]]): reader, yields the chunks
+        validate (Callable[[Any], Any]): validator, returns the chunk to write
+        write (Callable[[Any], None]): writer, run on the calling thread
+        event (threading.Event): stop event (set by the user)
+        name (str, optional): thread names prefix. Defaults to "Pipeline".
+        queue_size (int, optional): chunks buffered between two stages.
+            Defaults to PIPELINE_QUEUE_SIZE.
+
+    Raises:
+        Exception: the first exception raised by a stage
+
+    Returns:
+        bool: True if all the chunks were written, False if stopped
+    """
+    to_validate: Queue = Queue(maxsize=queue_size)
+    to_write: Queue = Queue(maxsize=queue_size)
+    stop = threading.Event()  # a stage failed or the writer gave up
+    errors: List[BaseException] = []
+    registry = metrics.current()
+    channel = progress.current()
+
+    def _stopped() -> bool:
+        return stop.is_set() or event.is_set()
+
+    def _put(queue: Queue, item: Any, blocked: str) -> bool:
+        with metrics.timer(blocked):
+            while not _stopped():
+                try:
+                    queue.put(item, timeout=PIPELINE_POLL)
+                    return True
+                except Full:
+                    continue
+        return False
+
+    def _get(queue: Queue) -> Any:
+        while not _stopped():
+            try:
+                return queue.get(timeout=PIPELINE_POLL)
+            except Empty:
+                continue
+        return _END
+
+    def _reader() -> None:
+        chunks = iter(read())
+        while not _stopped():
+            with metrics.timer("pipeline.read"):
+                chunk = next(chunks, _END)
+            if chunk is _END or not _put(to_validate, chunk, "pipeline.read_blocked"):
+                break
+        _put(to_validate, _END, "pipeline.read_blocked")
+
+    def _validator() -> None:
+        while True:
+            chunk = _get(to_validate)
+            if chunk is _END:
+                break
+            with metrics.timer("pipeline.validate"):
+                chunk = validate(chunk)
+            if not _put(to_write, chunk, "pipeline.validate_blocked"):
+                break
+        _put(to_write, _END, "pipeline.validate_blocked")
+
+    def _stage(target: Callable[[], None]) -> Callable[[], None]:
+        def _run() -> None:
+            # The stage threads record into the metrics and progress of the job
+            with ExitStack() as stack:
+                if registry is not None:
+                    stack.enter_context(metrics.collect(registry, stop=False))
+                if channel is not None:
+                    stack.enter_context(progress.bind(channel, finish=False))
+                try:
+                    target()
+                except BaseException as e:
+                    errors.append(e)
+                    stop.set()
+
+        return _run
+
+    threads = [
+        threading.Thread(name=f"{name} reader", target=_stage(_reader), daemon=True),
+        threading.Thread(
+            name=f"{name} validator", target=_stage(_validator), daemon=True
+        ),
+    ]
+    for thread in threads:
+        thread.start()
+
+    completed = False
+    try:
+        while True:
+            chunk = _get(to_write)
+            if chunk is _END:
+                completed = not _stopped()
+                break
+            with metrics.timer("pipeline.write"):
+                write(chunk)
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        raise errors[0]
+    return completed
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+Import run recorder
+
+The import workers (one step, pipelined and staged) share the bookkeeping
+of their import run: the counters of a resumed run, the rows done, the
+rejects waiting to be stored and the checkpoint of each chunk. The
+recorder keeps them in one place, each worker keeps only its own read and
+write loop.
+
+@File: import_run.py
+@Date: 2026-10-19
+"""
+
+# Built-in/Generic Imports
+import logging
+from typing import Any, Dict, List
+
+# Own modules
+try:
+    from .. import metrics
+    from ..logger import LOG_STAGE
+    from ..models import IMPORT_FAILED
+except:  # noqa: E722
+    import new_certificazione_770.metrics as metrics
+    from new_certificazione_770.logger import LOG_STAGE
+    from new_certificazione_770.models import IMPORT_FAILED
+from . import progress
+from .controller import Controller
+
+# Constants
+IMPORT_RUN_COUNTERS = ("inserted", "updated", "errors", "skipped")
+
+
+class ImportRunRecorder:
+    """Counters, rejects and checkpoints of the import run of a worker
+
+    The counters are inserted, updated, errors and skipped: the ones of the
+    resumed run plus the ones of this worker. The rejects of `reject` wait
+    for the next `save`, which stores them with the checkpoint; inside a
+    `Controller.transaction()` both commit with the written chunk.
+    """
+
+    def __init__(
+        self,
+        controller: Controller,
+        model: str,
+        duplicates: str,
+        checkpoint: dict | None,
+        chunk_size: int,
+    ):
+        """Initialize recorder, the run is started by `start`
+
+        Args:
+            controller (Controller): controller
+            model (str): import model name
+            duplicates (str): duplicate invoice mode
+            checkpoint (dict | None): file_hash, file_name, import_type,
+                resume; without it the run can not be resumed
+            chunk_size (int): rows per checkpoint of a new run
+        """
+        self.controller = controller
+        self.model = model
+        self.duplicates = duplicates
+        self.checkpoint = checkpoint or dict(
+            file_hash="", file_name="", import_type=model, resume=False
+        )
+        self.chunk_size = chunk_size
+        self.run: Dict[str, Any] | None = None
+        self.done = 0  # rows done, the rows of the resumed run included
+        self._base = [0, 0, 0, 0]
+        self._counters = [0, 0, 0, 0]
+        self._rejects: List[tuple[Any, Any, str]] = []
+
+    @property
+    def id(self) -> int | None:
+        """Import run id, None before start"""
+        return self.run["id"] if self.run else None
+
+    @property
+    def chunk(self) -> int:
+        """Index of the last chunk done (-1 before the first one)"""
+        return -(-self.done // self.chunk_size) - 1
+
+    @property
+    def pending(self) -> int:
+        """Rejects waiting for the next `save`"""
+        return len(self._rejects)
+
+    def start(self) -> Dict[str, Any]:
+        """Start the import run: resume the interrupted run of the file
+        (its duplicate mode, chunks, counters and rows done) or create a new
+        one
+
+        Returns:
+            Dict[str, Any]: import run
+        """
+        self.run = self.controller.start_import_run(
+            duplicates=self.duplicates, chunk_size=self.chunk_size, **self.checkpoint
+        )
+        self.duplicates = self.run["duplicates"]
+        self.chunk_size = self.run["chunk_size"]
+        self.done = self.run["rows_done"]
+        self._base = [self.run[key] for key in IMPORT_RUN_COUNTERS]
+        return self.run
+
+    def totals(self, delta: tuple = (0, 0, 0, 0)) -> List[int]:
+        """Counters of the run plus delta
+
+        Args:
+            delta (tuple, optional): counters not recorded yet.
+                Defaults to (0, 0, 0, 0).
+
+        Returns:
+            List[int]: inserted, updated, errors and skipped
+        """
+        return [b + c + d for b, c, d in zip(self._base, self._counters, delta)]
+
+    def counters(self, delta: tuple = (0, 0, 0, 0)) -> Dict[str, int]:
+        """Counters of the checkpoint of the run
+
+        Args:
+            delta (tuple, optional): counters not recorded yet.
+                Defaults to (0, 0, 0, 0).
+
+        Returns:
+            Dict[str, int]: rows_done, inserted, updated, errors, skipped
+        """
+        return dict(
+            zip(IMPORT_RUN_COUNTERS, self.totals(delta)), rows_done=self.done
+        )
+
+    def reject(self, item: Any, error: Any, stage: str) -> None:
+        """Count a rejected record, it is stored by the next `save`
+
+        Args:
+            item (Any): source record
+            error (Any): error
+            stage (str): stage rejecting the record
+        """
+        self._count_reject(error)
+        self._rejects.append((item, error, stage))
+
+    def advance(self, rows: int = 1) -> None:
+        """Count rows done (written, staged or rejected)
+
+        Args:
+            rows (int, optional): rows. Defaults to 1.
+        """
+        self.done += rows
+
+    def save(self, rejects: list | tuple = (), delta: tuple = (0, 0, 0, 0)) -> None:
+        """Store the waiting rejects plus rejects and the checkpoint of the
+        last chunk done
+
+        Args:
+            rejects (list | tuple, optional): rejects (record, error, stage)
+                of a chunk being written. Defaults to ().
+            delta (tuple, optional): counters of the chunk being written,
+                see `record`. Defaults to (0, 0, 0, 0).
+        """
+        self.controller.add_import_rejects(
+            import_run_id=self.id, rejects=[*self._rejects, *rejects]
+        )
+        self.controller.checkpoint_import_run(
+            id=self.id, chunk=self.chunk, counters=self.counters(delta)
+        )
+        self._rejects.clear()
+
+    def record(
+        self,
+        inserted: int = 0,
+        updated: int = 0,
+        skipped: int = 0,
+        rejects: list | tuple = (),
+    ) -> None:
+        """Count a chunk written, its rejects stored by `save`
+
+        Args:
+            inserted (int, optional): records inserted. Defaults to 0.
+            updated (int, optional): records updated. Defaults to 0.
+            skipped (int, optional): records skipped. Defaults to 0.
+            rejects (list | tuple, optional): rejects (record, error, stage).
+                Defaults to ().
+        """
+        self._counters[0] += inserted
+        self._counters[1] += updated
+        self._counters[3] += skipped
+        metrics.count("import.inserted", inserted)
+        metrics.count("import.updated", updated)
+        metrics.count("import.skipped", skipped)
+        for _, error, _ in rejects:
+            self._count_reject(error)
+
+    def discard(self) -> None:
+        """Forget the waiting rejects (their chunk is rejected whole)"""
+        self._rejects.clear()
+
+    def finish(self, status: str) -> None:
+        """Record the final status of the run, a failed run keeps the
+        counters of its last checkpoint. An error is only logged: the run
+        stays resumable
+
+        Args:
+            status (str): completed, cancelled or failed
+        """
+        if self.run is None:
+            return
+        try:
+            self.controller.finish_import_run(
+                id=self.id,
+                status=status,
+                counters=None if status == IMPORT_FAILED else self.counters(),
+            )
+        except Exception:
+            logging.exception(msg=f"Finish import run: {self.id=}, {status=}")
+
+    def result(self, exit: int, msg: str) -> tuple:
+        """Result of the import worker
+
+        Args:
+            exit (int): exit code
+            msg (str): message
+
+        Returns:
+            tuple: exit code, message, counters and import run id
+        """
+        return (exit, msg, self.totals(), self.id)
+
+    def _count_reject(self, error: Any) -> None:
+        """Count and log a rejected record"""
+        self._counters[2] += 1
+        metrics.count("import.errors")
+        progress.error("Import_data", str(error))
+        logging.warning(
+            msg=f"Record rejected: {error}", extra={LOG_STAGE: "import.reject"}
+        )
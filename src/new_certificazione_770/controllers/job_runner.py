@@ -0,0 +1,372 @@
+# -*- coding: utf-8 -*-
+"""
+Job runner
+
+Runs the worker functions of the dialogs on a thread pool or, for the
+CPU-bound stages (Excel parsing, validation), on a process pool so that
+they neither hold the GIL of the Tk process nor make the UI stutter.
+
+A submitted Job looks like a ResultThread to the dialogs (name, result,
+join, metrics, progress), so the worker functions keep their signature
+and result tuple:
+
+- cancellation stays cooperative: a threading.Event passed in the
+  arguments is relayed to the worker process by a manager Event
+- progress and metrics recorded in the worker process (module functions
+  of progress and metrics) are sent back to the job channel and registry
+  every PROGRESS_INTERVAL ms
+
+Process jobs must be top-level functions with picklable arguments and
+result (no Controller, no Queue).
+
+@File: job_runner.py
+@Date: 2026-10-19
+"""
+
+# Built-in/Generic Imports
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from contextlib import ExitStack
+from queue import Empty
+from typing import Any, Callable, Dict, List, Tuple
+
+# Own modules
+try:
+    from .. import metrics
+except:  # noqa: E722
+    import new_certificazione_770.metrics as metrics
+from . import progress
+
+# Constants
+BACKEND_THREAD = "thread"
+BACKEND_PROCESS = "process"
+BACKENDS = (BACKEND_THREAD, BACKEND_PROCESS)
+
+PUMP_INTERVAL = 0.1  # seconds between two reads of the process job messages
+
+_runners: Dict[str, "JobRunner"] = {}
+_runners_lock = threading.Lock()
+
+
+class Job:
+    """Handle of a submitted job, with the interface of ResultThread"""
+
+    def __init__(
+        self,
+        name: str,
+        future: Future,
+        metrics: metrics.MetricsRegistry | None = None,
+        progress: progress.ProgressChannel | None = None,
+        events: List[threading.Event] | None = None,
+    ) -> None:
+        """Initialize job
+
+        Args:
+            name (str): job name
+            future (Future): result future
+            metrics (MetricsRegistry | None, optional): run metrics. Defaults to None.
+            progress (ProgressChannel | None, optional): progress channel. Defaults to None.
+            events (List[threading.Event] | None, optional): cancel events. Defaults to None.
+        """
+        self.name = name
+        self._future = future
+        self._metrics = metrics
+        self._progress = progress
+        self._events = events or []
+        future.add_done_callback(self._log_exception)
+
+    def is_alive(self) -> bool:
+        """True until the job is done"""
+        return not self._future.done()
+
+    def join(self, timeout: float | None = None) -> Any | None:
+        """Wait for the job
+
+        Args:
+            timeout (float | None, optional): seconds. Defaults to None.
+
+        Returns:
+            Any | None: job result
+        """
+        try:
+            self._future.exception(timeout=timeout)
+        except Exception:
+            pass
+        return self.result
+
+    def cancel(self) -> None:
+        """Set the cancel events and cancel the job if not started"""
+        for event in self._events:
+            event.set()
+        self._future.cancel()
+
+    @property
+    def result(self) -> Any | None:
+        """Job result, None if not done, cancelled or failed"""
+        if not self._future.done() or self._future.cancelled():
+            return None
+        if self._future.exception() is not None:
+            return None
+        return self._future.result()
+
+    @property
+    def exception(self) -> BaseException | None:
+        """Exception raised by the job"""
+        if not self._future.done() or self._future.cancelled():
+            return None
+        return self._future.exception()
+
+    @property
+    def future(self) -> Future:
+        """Result future"""
+        return self._future
+
+    @property
+    def metrics(self) -> metrics.MetricsRegistry | None:
+        """Metrics registry of the job"""
+        return self._metrics
+
+    @property
+    def progress(self) -> progress.ProgressChannel | None:
+        """Progress channel of the job"""
+        return self._progress
+
+    def _log_exception(self, future: Future) -> None:
+        """Log the exception of a failed job"""
+        if future.cancelled() or future.exception() is None:
+            return
+        error = future.exception()
+        logging.error(msg=f"Job {self.name} failed: {error!r}", exc_info=error)
+
+
+class JobRunner:
+    """Run jobs on a thread or a process pool"""
+
+    def __init__(self, backend: str = BACKEND_THREAD, max_workers: int | None = None):
+        """Initialize runner, the pool is created by the first job
+
+        Args:
+            backend (str, optional): BACKEND_THREAD or BACKEND_PROCESS. Defaults to BACKEND_THREAD.
+            max_workers (int | None, optional): pool size. Defaults to the executor default.
+
+        Raises:
+            ValueError: unknown backend
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown job runner backend: {backend=}")
+        self.backend = backend
+        self.max_workers = max_workers
+        self._executor: Executor | None = None
+        self._manager = None
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        target: Callable,
+        args: tuple = (),
+        kwargs: dict | None = None,
+        *,
+        name: str | None = None,
+        metrics: metrics.MetricsRegistry | None = None,
+        progress: progress.ProgressChannel | None = None,
+    ) -> Job:
+        """Submit a job
+
+        Args:
+            target (Callable): worker function
+            args (tuple, optional): positional arguments. Defaults to ().
+            kwargs (dict | None, optional): keyword arguments. Defaults to None.
+            name (str | None, optional): job name. Defaults to the target name.
+            metrics (MetricsRegistry | None, optional): run metrics. Defaults to None.
+            progress (ProgressChannel | None, optional): progress channel. Defaults to None.
+
+        Returns:
+            Job: submitted job
+        """
+        name = name or target.__name__
+        kwargs = kwargs or {}
+        events = [
+            value
+            for value in (*args, *kwargs.values())
+            if isinstance(value, threading.Event)
+        ]
+        executor = self._get_executor()
+        if self.backend == BACKEND_THREAD:
+            future = executor.submit(
+                _run_in_thread, target, args, kwargs, metrics, progress
+            )
+            return Job(name, future, metrics, progress, events)
+
+        # Process: relay the cancel events and pump the worker messages
+        manager = self._manager
+        relays: List[Tuple[threading.Event, Any]] = []
+
+        def _relay(value: Any) -> Any:
+            if isinstance(value, threading.Event):
+                remote = manager.Event()
+                relays.append((value, remote))
+                return remote
+            return value
+
+        queue = manager.Queue()
+        args = tuple(_relay(value) for value in args)
+        kwargs = {key: _relay(value) for key, value in kwargs.items()}
+        future = executor.submit(
+            _run_in_process, target, args, kwargs, queue, metrics is not None
+        )
+        job = Job(name, future, metrics, progress, events)
+        threading.Thread(
+            name=f"{name} pump",
+            target=_pump_process_job,
+            args=(job, queue, relays),
+            daemon=True,
+        ).start()
+        return job
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Shut down the pool, the queued jobs are cancelled
+
+        Args:
+            wait (bool, optional): wait for the running jobs. Defaults to False.
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+            manager, self._manager = self._manager, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+        if manager is not None:
+            manager.shutdown()
+
+    def _get_executor(self) -> Executor:
+        """Get the pool, created at the first call"""
+        with self._lock:
+            if self._executor is None:
+                if self.backend == BACKEND_THREAD:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="JobRunner"
+                    )
+                else:
+                    # spawn as on Windows, the workers import the target module
+                    context = multiprocessing.get_context("spawn")
+                    self._manager = context.Manager()
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers, mp_context=context
+                    )
+            return self._executor
+
+
+def get_runner(backend: str = BACKEND_THREAD) -> JobRunner:
+    """Get the shared runner of a backend
+
+    Args:
+        backend (str, optional): BACKEND_THREAD or BACKEND_PROCESS. Defaults to BACKEND_THREAD.
+
+    Returns:
+        JobRunner: runner
+    """
+    with _runners_lock:
+        runner = _runners.get(backend)
+        if runner is None:
+            runner = _runners[backend] = JobRunner(backend=backend)
+        return runner
+
+
+def shutdown() -> None:
+    """Shut down the shared runners"""
+    with _runners_lock:
+        runners = list(_runners.values())
+        _runners.clear()
+    for runner in runners:
+        runner.shutdown()
+
+
+def _run_in_thread(
+    target: Callable,
+    args: tuple,
+    kwargs: dict,
+    registry: metrics.MetricsRegistry | None,
+    channel: progress.ProgressChannel | None,
+) -> Any:
+    """Run a job on a pool thread, like ResultThread.run"""
+    with ExitStack() as stack:
+        if registry is not None:
+            stack.enter_context(metrics.collect(registry))
+        if channel is not None:
+            stack.enter_context(progress.bind(channel))
+        return target(*args, **kwargs)
+
+
+def _run_in_process(
+    target: Callable, args: tuple, kwargs: dict, queue: Any, with_metrics: bool
+) -> Any:
+    """Run a job in a worker process, its progress and metrics are sent to
+    the parent queue every PROGRESS_INTERVAL ms"""
+    registry = metrics.MetricsRegistry() if with_metrics else None
+    channel = progress.ProgressChannel()
+    stop = threading.Event()
+
+    def _flush() -> None:
+        state, events = channel.drain()
+        if state is not None or events or registry is not None:
+            queue.put((state, events, registry))
+
+    def _flusher() -> None:
+        while not stop.wait(timeout=progress.PROGRESS_INTERVAL / 1000):
+            _flush()
+
+    flusher = threading.Thread(target=_flusher, daemon=True)
+    flusher.start()
+    try:
+        with ExitStack() as stack:
+            if registry is not None:
+                stack.enter_context(metrics.collect(registry))
+            stack.enter_context(progress.bind(channel))
+            return target(*args, **kwargs)
+    finally:
+        stop.set()
+        flusher.join()
+        _flush()
+
+
+def _pump_process_job(
+    job: Job, queue: Any, relays: List[Tuple[threading.Event, Any]]
+) -> None:
+    """Apply the messages of a process job to its channel and registry and
+    relay its cancel events, finish the channel when the job is done"""
+
+    def _apply(message: tuple) -> None:
+        state, events, registry = message
+        if job.progress is not None and (state is not None or events):
+            job.progress.merge(state, events)
+        if job.metrics is not None and registry is not None:
+            job.metrics.load(registry)
+
+    try:
+        while not job.future.done():
+            for local, remote in relays:
+                if local.is_set():
+                    remote.set()
+            relays = [(local, remote) for local, remote in relays if not local.is_set()]
+            try:
+                _apply(queue.get(timeout=PUMP_INTERVAL))
+            except Empty:
+                pass
+        while True:
+            _apply(queue.get_nowait())
+    except (Empty, EOFError, OSError):
+        # Drained, or the manager was shut down with the runner
+        pass
+    except Exception:
+        logging.exception(msg=f"Job {job.name}: progress pump")
+    finally:
+        if job.metrics is not None:
+            job.metrics.stop()
+        if job.progress is not None:
+            job.progress.finish()
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+Progress channel
+
+Progress of a worker thread for the Tk thread. The worker pushes its
+progress (items done), stage and error events; the counters are
+coalesced (only the last value matters) and the events are buffered, so
+the dialog drains everything in a single `after` callback and touches
+its widgets only when something changed. The channel knows nothing of
+how the worker reads its input (queue, batches, chunks).
+
+Like the metrics, the worker reaches the channel of its ResultThread
+through the module functions (`advance`, `stage`, `error`...), which are
+no-ops on threads without a channel.
+
+@File: progress.py
+@Date: 2026-10-19
+"""
+
+# Built-in/Generic Imports
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Iterator, List, NamedTuple, Tuple
+
+# Constants
+PROGRESS_INTERVAL = 200  # ms between two drains of the dialogs
+MAX_EVENTS = 1000  # events buffered between two drains
+
+EVENT_STAGE = "stage"
+EVENT_ERROR = "error"
+
+_local = threading.local()
+
+
+class ProgressEvent(NamedTuple):
+    """Stage or error event"""
+
+    kind: str
+    name: str
+    detail: str = ""
+
+
+class ProgressState(NamedTuple):
+    """Coalesced progress of the worker"""
+
+    done: int
+    total: int
+    stage: str
+    errors: int
+    finished: bool
+
+
+class ProgressChannel:
+    """Progress events from a worker thread to the Tk thread"""
+
+    def __init__(self, total: int = 0) -> None:
+        """Initialize channel
+
+        Args:
+            total (int, optional): items to process, 0 if unknown. Defaults to 0.
+        """
+        self._lock = threading.Lock()
+        self._done = 0
+        self._total = total
+        self._stage = ""
+        self._errors = 0
+        self._dropped = 0
+        self._finished = False
+        self._changed = True
+        self._events: deque[ProgressEvent] = deque()
+
+    # Worker side
+    def set_total(self, total: int) -> None:
+        """Set the number of items to process
+
+        Args:
+            total (int): items, 0 if unknown
+        """
+        with self._lock:
+            self._total = total
+            self._changed = True
+
+    def advance(self, count: int = 1) -> None:
+        """Add processed items
+
+        Args:
+            count (int, optional): items. Defaults to 1.
+        """
+        with self._lock:
+            self._done += count
+            self._changed = True
+
+    def stage(self, name: str, detail: str = "") -> None:
+        """Enter a stage of the work
+
+        Args:
+            name (str): stage name
+            detail (str, optional): stage detail. Defaults to "".
+        """
+        with self._lock:
+            self._stage = name
+            self._push(ProgressEvent(EVENT_STAGE, name, detail))
+
+    def error(self, name: str, detail: str = "") -> None:
+        """Report an error, the work goes on
+
+        Args:
+            name (str): error name (e.g. the stage)
+            detail (str, optional): error message. Defaults to "".
+        """
+        with self._lock:
+            self._errors += 1
+            self._push(ProgressEvent(EVENT_ERROR, name, detail))
+
+    def merge(
+        self, state: ProgressState | None, events: List[ProgressEvent]
+    ) -> None:
+        """Apply the progress drained from another channel (e.g. the channel
+        of a worker process), the finished flag is not copied
+
+        Args:
+            state (ProgressState | None): drained state, None if unchanged
+            events (List[ProgressEvent]): drained events
+        """
+        with self._lock:
+            if state is not None:
+                self._done = state.done
+                self._total = state.total
+                self._stage = state.stage
+                self._errors = state.errors
+                self._changed = True
+            for event in events:
+                self._push(event)
+
+    def finish(self) -> None:
+        """Mark the work as finished, called by ResultThread or JobRunner"""
+        with self._lock:
+            self._finished = True
+            self._changed = True
+
+    # Tk side
+    @property
+    def finished(self) -> bool:
+        """True when the worker is finished"""
+        with self._lock:
+            return self._finished
+
+    def drain(self) -> Tuple[ProgressState | None, List[ProgressEvent]]:
+        """Get the progress changed since the previous drain
+
+        Returns:
+            Tuple[ProgressState | None, List[ProgressEvent]]: state (None if
+                unchanged) and the events buffered
+        """
+        with self._lock:
+            events = list(self._events)
+            self._events.clear()
+            if self._dropped:
+                events.append(
+                    ProgressEvent(EVENT_ERROR, "Dropped", f"{self._dropped:,d} events")
+                )
+                self._dropped = 0
+            if not self._changed:
+                return (None, events)
+            self._changed = False
+            return (
+                ProgressState(
+                    done=self._done,
+                    total=self._total,
+                    stage=self._stage,
+                    errors=self._errors,
+                    finished=self._finished,
+                ),
+                events,
+            )
+
+    def _push(self, event: ProgressEvent) -> None:
+        """Buffer an event, counting the ones beyond MAX_EVENTS"""
+        self._changed = True
+        if len(self._events) < MAX_EVENTS:
+            self._events.append(event)
+        else:
+            self._dropped += 1
+
+
+@contextmanager
+def bind(channel: ProgressChannel, finish: bool = True) -> Iterator[ProgressChannel]:
+    """Report the progress of the calling thread into channel
+
+    Args:
+        channel (ProgressChannel): worker channel
+        finish (bool, optional): finish the channel on exit, False for the
+            helper threads of a worker. Defaults to True.
+
+    Yields:
+        Iterator[ProgressChannel]: the channel
+    """
+    previous = getattr(_local, "channel", None)
+    _local.channel = channel
+    try:
+        yield channel
+    finally:
+        _local.channel = previous
+        if finish:
+            channel.finish()
+
+
+def current() -> ProgressChannel | None:
+    """Channel of the calling thread
+
+    Returns:
+        ProgressChannel | None: channel or None if not reporting
+    """
+    return getattr(_local, "channel", None)
+
+
+def set_total(total: int) -> None:
+    """Set the total of the calling thread channel, see ProgressChannel.set_total"""
+    channel = getattr(_local, "channel", None)
+    if channel is not None:
+        channel.set_total(total)
+
+
+def advance(count: int = 1) -> None:
+    """Add processed items to the calling thread channel, see ProgressChannel.advance"""
+    channel = getattr(_local, "channel", None)
+    if channel is not None:
+        channel.advance(count)
+
+
+def stage(name: str, detail: str = "") -> None:
+    """Enter a stage in the calling thread channel, see ProgressChannel.stage"""
+    channel = getattr(_local, "channel", None)
+    if channel is not None:
+        channel.stage(name, detail)
+
+
+def error(name: str, detail: str = "") -> None:
+    """Report an error in the calling thread channel, see ProgressChannel.error"""
+    channel = getattr(_local, "channel", None)
+    if channel is not None:
+        channel.error(name, detail)
@@ -8,10 +8,16 @@ Thread with result
 
 # Built-in/Generic Imports
 # Libs
+from contextlib import ExitStack
 from threading import Thread
 from typing import Any
 
 # Own modules
+try:
+    from .. import metrics
+except:  # noqa: E722
+    import new_certificazione_770.metrics as metrics
+from . import progress
 
 # Constants
 
@@ -24,14 +30,32 @@ class ResultThread(Thread):
     """
 
     def __init__(
-        self, group=None, target=None, name=None, args=(), kwargs=None, *, daemon=None
+        self,
+        group=None,
+        target=None,
+        name=None,
+        args=(),
+        kwargs=None,
+        *,
+        daemon=None,
+        metrics: metrics.MetricsRegistry | None = None,
+        progress: progress.ProgressChannel | None = None,
     ) -> None:
         Thread.__init__(self, group, target, name, args, kwargs, daemon=daemon)
         self._result = None
+        self._metrics = metrics
+        self._progress = progress
 
     def run(self) -> None:
-        if self._target is not None:
-            self._result = self._target(*self._args, **self._kwargs)
+        # The target records its metrics and progress into the thread
+        # registry and channel, the channel is finished after the result
+        with ExitStack() as stack:
+            if self._metrics is not None:
+                stack.enter_context(metrics.collect(self._metrics))
+            if self._progress is not None:
+                stack.enter_context(progress.bind(self._progress))
+            if self._target is not None:
+                self._result = self._target(*self._args, **self._kwargs)
 
     def join(self, *args):
         Thread.join(self, *args)
@@ -40,3 +64,13 @@ class ResultThread(Thread):
     @property
     def result(self) -> Any | None:
         return self._result
+
+    @property
+    def metrics(self) -> metrics.MetricsRegistry | None:
+        """Metrics registry of the thread"""
+        return self._metrics
+
+    @property
+    def progress(self) -> progress.ProgressChannel | None:
+        """Progress channel of the thread"""
+        return self._progress
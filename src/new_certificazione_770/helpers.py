@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 # Built-in/Generic Imports
+import hashlib
 import os
 import sys
 from ctypes import WinDLL
@@ -17,6 +18,8 @@ Message:\n{}"""
 
 MSG_SUCCESS_TEMPLATE = """Process {} terminate with success"""
 
+FILE_HASH_BLOCK_SIZE = 1024 * 1024
+
 
 def executable_path() -> str:
     """Get absolute path to resource, works for dev and for PyInstaller"""
@@ -30,6 +33,22 @@ def executable_path() -> str:
     return base_path
 
 
+def file_hash(file_path: str) -> str:
+    """Get the SHA-256 of a file, read by blocks
+
+    Args:
+        file_path (str): file path
+
+    Returns:
+        str: hex digest
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(FILE_HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
 def resource_path() -> str:
     """Get absolute path to resource, works for dev and for PyInstaller"""
     if getattr(sys, "frozen", False):
@@ -45,6 +64,8 @@ def resource_path() -> str:
 EXPORT_CODE_ENTE_PREV = "80078750587"
 EXPORT_DENOM_ENTE_PREV = "INPS"
 EXPORT_CODE_SOMME_NON_SOGG = "22"
+IMPORT_MEMORY_LIMIT = "64"
+INVOICE_UNIQUE_KEY = "0"  # 1 = unique index on number, year and distributor
 
 DEFAULT_SETTINGS = [
     {
@@ -62,6 +83,16 @@ DEFAULT_SETTINGS = [
         "title": "Codice altre somme non soggette",
         "value": EXPORT_CODE_SOMME_NON_SOGG,
     },
+    {
+        "name": "import_memory_limit",
+        "title": "Memoria massima importazione (MB)",
+        "value": IMPORT_MEMORY_LIMIT,
+    },
+    {
+        "name": "invoice_unique_key",
+        "title": "Chiave univoca fatture (0/1)",
+        "value": INVOICE_UNIQUE_KEY,
+    },
 ]
 
 DEFAULT_COMPANY = {
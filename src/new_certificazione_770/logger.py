@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+Logging pipeline module
+
+The handlers of config.LOGGING_CONFIG (stdout, rotating file) are moved
+behind a QueueListener: the application threads only enqueue the records
+through a QueueHandler, formatting and file I/O run on the listener
+thread, so logging from the import/export workers never waits on the
+handler locks or the disk.
+
+Repetitive messages are rate limited before they are enqueued: each stage
+(given with `extra={LOG_STAGE: "name"}`) may emit up to `burst` records
+every `interval` seconds, the following ones are dropped and their number
+is reported with the first record of the next window (or when the
+pipeline stops). Records without a stage are never dropped.
+
+@File: logger.py
+@Date: 2026-10-19
+"""
+
+# Built-in/Generic Imports
+import atexit
+import logging
+import logging.config
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from typing import Dict, List, Tuple
+
+# Constants
+LOG_STAGE = "log_stage"  # record attribute grouping the rate limited messages
+RATE_LIMIT_BURST = 20
+RATE_LIMIT_INTERVAL = 10.0  # seconds
+
+_listener: QueueListener | None = None
+_queue_handler: QueueHandler | None = None
+_handlers: List[logging.Handler] = []
+
+
+class RateLimitFilter(logging.Filter):
+    """Drop the records of a stage beyond `burst` every `interval` seconds,
+    the records without a stage pass through unchanged"""
+
+    def __init__(
+        self, burst: int = RATE_LIMIT_BURST, interval: float = RATE_LIMIT_INTERVAL
+    ) -> None:
+        """Initialize filter
+
+        Args:
+            burst (int, optional): records allowed per window. Defaults to RATE_LIMIT_BURST.
+            interval (float, optional): window in seconds. Defaults to RATE_LIMIT_INTERVAL.
+        """
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self._windows: Dict[str, list] = {}  # stage: [start, count, suppressed]
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def stage(record: logging.LogRecord) -> str | None:
+        """Rate limit key of a record: its stage, None if not rate limited"""
+        return getattr(record, LOG_STAGE, None)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = self.stage(record)
+        if key is None:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None:
+                window = self._windows[key] = [now, 0, 0]
+            elif now - window[0] >= self.interval:
+                suppressed = window[2]
+                window[:] = [now, 0, 0]
+                if suppressed:
+                    record.msg = (
+                        f"{record.getMessage()}"
+                        f" [{suppressed:,d} similar messages suppressed]"
+                    )
+                    record.args = None
+            window[1] += 1
+            if window[1] > self.burst:
+                window[2] += 1
+                return False
+            return True
+
+    def pop_suppressed(self) -> List[Tuple[str, int]]:
+        """Get and reset the number of records dropped in the current windows
+
+        Returns:
+            List[Tuple[str, int]]: (stage, suppressed records)
+        """
+        with self._lock:
+            suppressed = [(k, w[2]) for k, w in self._windows.items() if w[2]]
+            self._windows.clear()
+        return suppressed
+
+
+def setup(
+    logging_config: dict,
+    burst: int = RATE_LIMIT_BURST,
+    interval: float = RATE_LIMIT_INTERVAL,
+) -> QueueListener:
+    """Configure logging and move the root handlers behind a queue listener
+
+    Args:
+        logging_config (dict): dictConfig configuration
+        burst (int, optional): records allowed per stage and window. Defaults to RATE_LIMIT_BURST.
+        interval (float, optional): rate limit window in seconds. Defaults to RATE_LIMIT_INTERVAL.
+
+    Returns:
+        QueueListener: the started listener
+    """
+    global _listener, _queue_handler, _handlers
+    stop()
+    logging.config.dictConfig(logging_config)
+    root = logging.getLogger()
+    _handlers = list(root.handlers)
+    for handler in _handlers:
+        root.removeHandler(handler)
+
+    queue = SimpleQueue()
+    _queue_handler = QueueHandler(queue)
+    _queue_handler.addFilter(RateLimitFilter(burst=burst, interval=interval))
+    root.addHandler(_queue_handler)
+    _listener = QueueListener(queue, *_handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop)
+    return _listener
+
+
+def stop() -> None:
+    """Flush the queue, stop the listener and restore the root handlers"""
+    global _listener, _queue_handler, _handlers
+    if _listener is None:
+        return
+    root = logging.getLogger()
+    for log_filter in _queue_handler.filters:
+        if isinstance(log_filter, RateLimitFilter):
+            for stage, suppressed in log_filter.pop_suppressed():
+                root.info(msg=f"{suppressed:,d} log messages suppressed: {stage}")
+    root.removeHandler(_queue_handler)
+    _listener.stop()
+    for handler in _handlers:
+        root.addHandler(handler)
+    _listener = None
+    _queue_handler = None
+    _handlers = []
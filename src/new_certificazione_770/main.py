@@ -8,15 +8,27 @@ Main module
 
 # Built-in/Generic Imports
 
+# Startup profiler, imported first to time the other imports
+try:
+    import profiler as profiler
+except:  # noqa: E722
+    import new_certificazione_770.profiler as profiler
+
+profiler.start()
+
 # Libs
+import argparse
 import logging
-import logging.config
+import multiprocessing
 import os
 import platform
 import sys
+import time
 import tkinter as tk
 import tkinter.ttk as ttk
-from tkinter import messagebox
+from queue import Empty, Full, Queue
+from threading import Event, Thread
+from tkinter import messagebox, simpledialog
 
 # Modules
 import darkdetect
@@ -28,15 +40,18 @@ try:
     import config as config
     import controllers as controllers
     import helpers as helpers
+    import logger as logger
     import models as models
     import views as views
 except:  # noqa: E722
     import new_certificazione_770.config as config
     import new_certificazione_770.controllers as controllers
     import new_certificazione_770.helpers as helpers
+    import new_certificazione_770.logger as logger
     import new_certificazione_770.models as models
     import new_certificazione_770.views as views
 
+profiler.mark("imports")
 
 # Constants
 EXE_PATH = helpers.executable_path()
@@ -47,9 +62,14 @@ BTN_ABOUT = "About..."
 BTN_COMPANY = "Company"
 BTN_EXIT = "Exit"
 BTN_EXPORT = "Export"
+BTN_EXPORT_GRID = "Export grid..."
+BTN_FILTER = "Filter..."
+BTN_FILTER_CLEAR = "Clear filter"
 BTN_HELP = "Show help"
 BTN_IMPORT = "Import"
+BTN_IMPORT_REJECTS = "Import rejects..."
 BTN_SETTINGS = "Settings"
+BTN_STATISTICS = "Statistics"
 BTN_SHOW_LOG = "Show log"
 BTN_USER_ADD = "Add"
 BTN_USER_DELETE = "Delete"
@@ -62,6 +82,26 @@ BTN_TOGGLE_THEME = "Toggle Theme"
 # Var constants
 VAR_STATUS_BAR = "status_bar"
 VAR_SEARCH = "search_text"
+VAR_SUMMARY = "summary_text"
+
+# Statistics constants
+STATS_TOP_DISTRIBUTORS = 10
+
+# Treeview constants: JSON schema type -> column datatype
+SCHEMA_DATATYPES = {"integer": "int", "number": "float"}
+
+# Treeview refresh constants
+THREAD_LOAD_DISTRIBUTORS = "Load distributors"
+REFRESH_CHUNK_SIZE = 2000  # rows read from database per chunk
+REFRESH_QUEUE_SIZE = 8  # chunks buffered between worker and Tk thread
+REFRESH_POLL = 50  # ms between checks of the loading queue
+REFRESH_BUDGET = 0.05  # s of Tk thread spent inserting rows per check
+PAGING_THRESHOLD = 50000  # above this many distributors pages are queried
+THREAD_SUMMARY = "Summary statistics"
+
+# Startup constants
+THREAD_WARM_UP = "Warm up"
+WARM_UP_DELAY = 2000  # ms after the first page before the warm-up starts
 
 
 class MainWindow(ttk.Frame):
@@ -80,19 +120,25 @@ class MainWindow(ttk.Frame):
 
         self.controller: controllers.Controller = None
         self.settings: dict = None
+        self.filter_expression: str = ""
+        self._refresh_event: Event | None = None
+        self._summary_thread: controllers.ResultThread | None = None
+        self._startup_reported = False
 
         try:
             _action = "Load images from assets folders"
             logging.debug(msg=_action)
-            self._load_images()
+            with profiler.phase("images"):
+                self._load_images()
 
             _action = "Draw application"
             logging.debug(msg=_action)
-            self.create_menu_bar(master=self.master)
-            self.create_status_bar()
-            self.create_button_bar()
-            self.create_left_panel()
-            self.create_right_panel()
+            with profiler.phase("draw"):
+                self.create_menu_bar(master=self.master)
+                self.create_status_bar()
+                self.create_button_bar()
+                self.create_left_panel()
+                self.create_right_panel()
 
         except Exception as e:
             logging.exception(msg=_action)
@@ -128,15 +174,22 @@ class MainWindow(ttk.Frame):
             self.photo_images.append(tk.PhotoImage(master=self, name=key, file=_path))
 
     def _initialize(self) -> None:
+        self.startup_timing(phase="window")
         try:
             if self.controller is None:
                 db_path = os.path.join(EXE_PATH, f"{config.PACKAGE}.db")
                 _action = f"Open/create database: {db_path=}"
                 logging.debug(msg=_action)
-                self.controller = controllers.Controller(db_path=db_path, echo=False)
+                with profiler.phase("open database"):
+                    self.controller = controllers.Controller(
+                        db_path=db_path, echo=False
+                    )
 
             if self.settings is None:
-                self.settings = self._get_settings()
+                with profiler.phase("settings"):
+                    self.settings = self._get_settings()
+                    self.apply_invoice_unique_key()
+            self.startup_timing(phase="database")
 
             _action = "Refresh treeview"
             logging.debug(msg=_action)
@@ -147,11 +200,63 @@ class MainWindow(ttk.Frame):
             messagebox.showerror(title=_action, message=msg, parent=self)
             self.master.on_close()
 
+    def startup_timing(self, phase: str, report: bool = False) -> None:
+        """Record the end of a startup phase on the startup profiler
+
+        With report the phase durations are logged, the profiling report is
+        written (in profiling mode) and the modules of the import and export
+        dialogs are warmed up in background; later calls are ignored.
+
+        Args:
+            phase (str): phase name
+            report (bool, optional): log the startup timing. Defaults to False.
+        """
+        if self._startup_reported:
+            return
+        profiler.mark(phase)
+        if not report:
+            return
+
+        self._startup_reported = True
+        _profiler = profiler.PROFILER
+        logging.info(msg=f"Startup timing: {_profiler.summary()}")
+        if _profiler.enabled:
+            _profiler.disable()
+            _action = "Write startup report"
+            try:
+                file_path = os.path.join(
+                    os.path.dirname(os.path.abspath(config.LOG_FILE_NAME)),
+                    config.STARTUP_REPORT_FILE_NAME,
+                )
+                _profiler.write_report(file_path=file_path)
+                logging.info(msg=f"{_action}: {file_path}")
+                for _phase in _profiler.phases:
+                    if _phase["nested"]:
+                        logging.info(
+                            msg=f"Startup phase {_phase['name']}:"
+                            f" {_phase['duration']:.3f}s"
+                        )
+                for item in _profiler.slowest_imports():
+                    logging.info(
+                        msg=f"Startup import {item['module']}: self={item['self_ms']:.1f}ms"
+                        f" cumulative={item['cumulative_ms']:.1f}ms"
+                    )
+            except OSError:
+                logging.exception(msg=_action)
+        self.after(ms=WARM_UP_DELAY, func=self.warm_up)
+
+    def warm_up(self) -> None:
+        """Import the modules of the import and export dialogs in background"""
+        _thread = Thread(name=THREAD_WARM_UP, target=_thread_warm_up, daemon=True)
+        _thread.start()
+
     def create_menu_bar(self, master) -> None:
         menu_items = {
             "File": [
                 BTN_IMPORT,
+                BTN_IMPORT_REJECTS,
                 BTN_EXPORT,
+                BTN_EXPORT_GRID,
                 "---",
                 BTN_EXIT,
             ],
@@ -164,6 +269,10 @@ class MainWindow(ttk.Frame):
             ],
             "View": [
                 BTN_COMPANY,
+                BTN_STATISTICS,
+                "---",
+                BTN_FILTER,
+                BTN_FILTER_CLEAR,
                 "---",
                 BTN_TOGGLE_THEME,
                 "---",
@@ -253,6 +362,7 @@ class MainWindow(ttk.Frame):
                 "text": val.get("title", str(key).replace("_", " ").title()),
                 "anchor": tk.W,
                 "stretch": True,
+                "datatype": schema_datatype(val),
             }
             for key, val in self.fields_list.items()
         ]
@@ -264,8 +374,24 @@ class MainWindow(ttk.Frame):
             pagesize=100,
             coldata=columns_list,
             paginated=True,
+            virtual=True,
         )
         self.treeview.pack(side=tk.TOP, expand=tk.YES, fill=tk.BOTH)
+        self.treeview.bind(
+            sequence=views.widgets.EXPORT_EVENT, func=self.treeview_export_progress
+        )
+        self.treeview.bind(
+            sequence=views.widgets.PAGE_EVENT, func=self.treeview_page_loaded
+        )
+
+        # Summary panel
+        summary_lbl = ttk.Label(
+            master=right_panel_frm,
+            padding=(0, 5, 0, 0),
+            textvariable=VAR_SUMMARY,
+        )
+        summary_lbl.pack(side=tk.TOP, anchor=tk.W, fill=tk.X)
+        self.setvar(name=VAR_SUMMARY, value="")
         # Treeview bind
         self.treeview.view.bind(
             sequence="<<TreeviewSelect>>", func=self.treeview_select
@@ -295,8 +421,12 @@ class MainWindow(ttk.Frame):
             self.master.on_close()
         elif action == BTN_IMPORT:
             self.show_import()
+        elif action == BTN_IMPORT_REJECTS:
+            self.show_import_rejects()
         elif action == BTN_EXPORT:
             self.show_export()
+        elif action == BTN_EXPORT_GRID:
+            self.show_export_grid()
         elif action == BTN_USER_ADD:
             self.show_user_add()
         elif action == BTN_USER_EDIT:
@@ -311,6 +441,12 @@ class MainWindow(ttk.Frame):
             self.show_about()
         elif action == BTN_SETTINGS:
             self.show_settings()
+        elif action == BTN_STATISTICS:
+            self.show_statistics()
+        elif action == BTN_FILTER:
+            self.show_filter()
+        elif action == BTN_FILTER_CLEAR:
+            self.treeview_filter(expression="")
         elif action == BTN_TOGGLE_THEME:
             self.toggle_theme()
         else:
@@ -320,17 +456,162 @@ class MainWindow(ttk.Frame):
 
     # Treeview action
     def treeview_refresh(self) -> None:
+        """Reload the distributors on treeview
+
+        The rows are read and shaped by a worker thread and streamed into
+        the treeview in chunks: the first page is shown as soon as its rows
+        arrive and the pager grows while loading. Above PAGING_THRESHOLD
+        distributors the treeview queries the database page by page instead.
+        """
         try:
-            self.update_idletasks()
             _action = "Get all distributors from database"
             logging.debug(msg=_action)
+            if self._refresh_event is not None:
+                # Stop the running refresh, its rows are discarded
+                self._refresh_event.set()
             self.setvar(name=VAR_STATUS_BAR, value=_action)
             self.configure(cursor="wait")
-            _distribution_list = self.controller.get_all_distributors()
-            if _distribution_list is None or len(_distribution_list) == 0:
-                self.configure(cursor="")
+            # the reload clears the treeview filters and search
+            self.filter_expression = ""
+
+            with profiler.phase("distributor count"):
+                total = self.controller.get_distributor_count()
+            if total > PAGING_THRESHOLD:
+                _action = "Page distributors from database"
+                logging.info(msg=f"{_action}: records={total:,d}")
+                _datasource = controllers.DistributorDataSource(
+                    controller=self.controller, fields=list(self.fields_list)
+                )
+                # The first page is shown by treeview_page_loaded
+                self.treeview.set_datasource(_datasource)
+                self.treeview.focus_set()
+
+                _action = "Refresh summary panel"
+                logging.debug(msg=_action)
+                self.summary_refresh()
+                return
+
+            if self.treeview.datasource is not None:
+                self.treeview.set_datasource(None)
+            self.treeview.delete_rows()
+            self.treeview.load_table_data(clear_filters=True)
+
+            _action = f"Start thread {THREAD_LOAD_DISTRIBUTORS}"
+            logging.debug(msg=_action)
+            _queue = Queue(maxsize=REFRESH_QUEUE_SIZE)
+            _event = Event()
+            _fields = list(self.fields_list)
+            _thread = controllers.ResultThread(
+                name=THREAD_LOAD_DISTRIBUTORS,
+                target=_thread_load_distributors,
+                args=(self.controller, _fields, _queue, _event),
+                daemon=True,
+            )
+            _thread.start()
+            self._refresh_event = _event
+            self.after(
+                ms=REFRESH_POLL,
+                func=lambda: self.treeview_refresh_monitor(
+                    thread=_thread, queue=_queue, event=_event
+                ),
+            )
+        except Exception as e:
+            logging.exception(msg=_action)
+            self.configure(cursor="")
+            msg = helpers.MSG_ERROR_TEMPLATE.format(_action, e)
+            messagebox.showerror(title=_action, message=msg, parent=self)
+
+    def treeview_page_loaded(self, event=None) -> None:
+        """Show info when a page of distributors is loaded from database"""
+        _action = "Page distributors from database"
+        self.configure(cursor="")
+        e = self.treeview.page_error
+        if e is not None:
+            logging.error(msg=f"{_action}: {e}")
+            self.setvar(name=VAR_STATUS_BAR, value=f"{_action} failed")
+            msg = helpers.MSG_ERROR_TEMPLATE.format(_action, e)
+            messagebox.showerror(title=_action, message=msg, parent=self)
+            return
+
+        self.treeview_select()
+        self.startup_timing(phase="first page", report=True)
+
+    def treeview_refresh_monitor(
+        self,
+        thread: controllers.ResultThread,
+        queue: Queue,
+        event: Event,
+        loaded: int = 0,
+        total: int = 0,
+    ) -> None:
+        """Insert the loaded rows on treeview until the worker is done
+
+        Args:
+            thread (ResultThread): loading thread
+            queue (Queue): queue of row chunks (the first item is the total)
+            event (Event): stop event of the refresh
+            loaded (int, optional): rows inserted so far. Defaults to 0.
+            total (int, optional): total rows to load. Defaults to 0.
+        """
+        if event.is_set():
+            return  # a newer refresh is running
+        try:
+            _action = "Add distributors data on treeview"
+            inserted = 0
+            deadline = time.perf_counter() + REFRESH_BUDGET
+            while True:
+                try:
+                    item = queue.get_nowait()
+                except Empty:
+                    break
+                if isinstance(item, int):
+                    total = item
+                    continue
+                self.treeview.insert_rows(index="end", rowdata=item)
+                inserted += len(item)
+                if time.perf_counter() >= deadline:
+                    break
+
+            if inserted:
+                if loaded == 0:
+                    self.treeview.goto_first_page()
+                    self.treeview.focus_set()
+                    self.configure(cursor="")
+                    self.startup_timing(phase="first page")
+                else:
+                    # Update the pager, the current page is kept
+                    self.treeview.load_table_data()
+                loaded += inserted
+                self.setvar(
+                    name=VAR_STATUS_BAR,
+                    value=f"Loading distributors... {loaded:,d} of {total:,d}",
+                )
+
+            if thread.is_alive() or not queue.empty():
+                self.after(
+                    ms=REFRESH_POLL,
+                    func=lambda: self.treeview_refresh_monitor(
+                        thread=thread,
+                        queue=queue,
+                        event=event,
+                        loaded=loaded,
+                        total=total,
+                    ),
+                )
+                return
+
+            self._refresh_event = None
+            self.configure(cursor="")
+            self.startup_timing(phase="loaded", report=True)
+            _action = "Get all distributors from database"
+            _exit, _msg, _ = thread.result
+            if _exit != 0:
+                raise Exception(_msg)
+
+            if loaded == 0:
                 msg = "No data found for distributors on database!"
                 logging.warning(msg=msg)
+                self.setvar(name=VAR_STATUS_BAR, value=msg)
                 msg += (
                     f"\n\nClick on button [{BTN_IMPORT}] to import new distributors from excel file"
                     f" or click on menu item [{BTN_USER_ADD}] to add new distributor"
@@ -340,52 +621,78 @@ class MainWindow(ttk.Frame):
 
             msg = (
                 helpers.MSG_SUCCESS_TEMPLATE.format(_action)
-                + f": records={len(_distribution_list):,d}"
+                + f": records={loaded:,d}"
             )
             logging.info(msg=msg)
+            self.treeview_select()
 
-            _action = "Add distributors data on treeview"
+            _action = "Refresh summary panel"
             logging.debug(msg=_action)
-            _row_data = [
-                list(
-                    dict(
-                        map(lambda k: (k, row[k] if row[k] else ""), self.fields_list)
-                    ).values()
-                )
-                for row in _distribution_list
-            ]
-
-            self.treeview.delete_rows()
-            self.treeview.insert_rows(index="end", rowdata=_row_data)
-            self.treeview.load_table_data(clear_filters=True)
-            self.treeview.focus_set()
-            self.configure(cursor="")
-            self.update_idletasks()
+            self.summary_refresh()
         except Exception as e:
             logging.exception(msg=_action)
+            event.set()
+            self._refresh_event = None
             self.configure(cursor="")
             msg = helpers.MSG_ERROR_TEMPLATE.format(_action, e)
             messagebox.showerror(title=_action, message=msg, parent=self)
 
+    def summary_refresh(self) -> None:
+        """Refresh summary panel with the statistics of the last year, the
+        statistics are queried by a worker thread"""
+        _thread = controllers.ResultThread(
+            name=THREAD_SUMMARY,
+            target=_thread_summary,
+            args=(self.controller,),
+            daemon=True,
+        )
+        _thread.start()
+        self._summary_thread = _thread
+        self.after(
+            ms=REFRESH_POLL, func=lambda: self.summary_refresh_monitor(thread=_thread)
+        )
+
+    def summary_refresh_monitor(self, thread: controllers.ResultThread) -> None:
+        """Show the summary when the worker is done
+
+        Args:
+            thread (ResultThread): summary thread
+        """
+        if thread is not self._summary_thread:
+            return  # a newer refresh is running
+        if thread.is_alive():
+            self.after(
+                ms=REFRESH_POLL,
+                func=lambda: self.summary_refresh_monitor(thread=thread),
+            )
+            return
+        self._summary_thread = None
+        _exit, _msg, summary = thread.result
+        if _exit != 0:
+            logging.error(msg=f"{THREAD_SUMMARY}: {_msg}")
+            return
+        self.setvar(name=VAR_SUMMARY, value=summary)
+
     def treeview_select(self, event=None) -> None:
         """Show info when user select something in treeview"""
         rec_from = (
             1 + (self.treeview._pageindex.get() - 1) * self.treeview._pagesize.get()
         )
+        total = self.treeview.rowcount
         if self.treeview._pageindex.get() == self.treeview._pagelimit.get():
-            if self.treeview.is_filtered:
-                rec_to = len(self.treeview.tablerows_filtered)
-            else:
-                rec_to = len(self.treeview.tablerows)
+            rec_to = total
         else:
             rec_to = (self.treeview._pageindex.get()) * self.treeview._pagesize.get()
-        selected = len(self.treeview.view.selection())
+        selected = self.treeview.selection_count
 
-        if self.treeview.is_filtered:
-            total = len(self.treeview.tablerows_filtered)
+        filtered = (
+            self.treeview.is_filtered
+            or self.treeview.filters
+            or self.treeview.searchcriteria
+        )
+        if filtered:
             msg = f"Filtered record #{rec_from:,d}-{rec_to} of {total:,d}"
         else:
-            total = len(self.treeview.tablerows)
             msg = f"Record #{rec_from:,d}-{rec_to:,d} of #{total:,d}"
         if selected > 1:
             msg += f" (Selected #{selected:,d} records)"
@@ -401,7 +708,10 @@ class MainWindow(ttk.Frame):
         try:
             _action = "Show Import dialog"
             logging.debug(msg=_action)
-            _options = {"controller": self.controller}
+            _options = {
+                "controller": self.controller,
+                "memory_limit": self.get_setting_value("import_memory_limit"),
+            }
             dlg = views.ImportDialog(parent=self, title=BTN_IMPORT, **_options)
             result = dlg.result
             if result:
@@ -411,6 +721,20 @@ class MainWindow(ttk.Frame):
             msg = helpers.MSG_ERROR_TEMPLATE.format(_action, e)
             messagebox.showerror(title=_action, message=msg, parent=self)
 
+    def show_import_rejects(self) -> None:
+        """Show the rejects of the imports"""
+        try:
+            _action = "Show Import rejects dialog"
+            logging.debug(msg=_action)
+            _options = {"controller": self.controller}
+            dlg = views.RejectsDialog(parent=self, title="Import rejects", **_options)
+            if dlg.result:
+                self.treeview_refresh()
+        except Exception as e:
+            logging.exception(msg=_action)
+            msg = helpers.MSG_ERROR_TEMPLATE.format(_action, e)
+            messagebox.showerror(title=_action, message=msg, parent=self)
+
     def show_export(self):
         """Show Export dialog"""
         try:
@@ -462,6 +786,64 @@ class MainWindow(ttk.Frame):
             messagebox.showerror(title=_action, message=msg, parent=self)
             return
 
+    def show_export_grid(self) -> None:
+        """Export the treeview rows (the filtered ones, if filtered) to a
+        csv or xlsx file; the rows are written by a worker thread"""
+        _action = "Export grid"
+        if self.treeview.is_exporting:
+            msg = "An export of the grid is already running!"
+            messagebox.showwarning(title=_action, message=msg, parent=self)
+            return
+        try:
+            logging.debug(msg=_action)
+            filtered = (
+                self.treeview.is_filtered
+                or self.treeview.filters
+                or self.treeview.searchcriteria
+            )
+            if filtered:
+                self.treeview.export_records_in_filter()
+            else:
+                self.treeview.export_all_records()
+        except Exception as e:
+            logging.exception(msg=_action)
+            msg = helpers.MSG_ERROR_TEMPLATE.format(_action, e)
+            messagebox.showerror(title=_action, message=msg, parent=self)
+
+    def treeview_export_progress(self, event=None) -> None:
+        """Show the progress of the grid export on status bar"""
+        _action = "Export grid"
+        progress = self.treeview.export_progress
+        if progress is None:
+            return
+        written, total = progress["written"], progress["total"]
+        if not progress["done"]:
+            msg = f"Exporting grid... {written:,d}"
+            if total:
+                msg += f" of {total:,d}"
+            self.setvar(name=VAR_STATUS_BAR, value=msg)
+            return
+
+        if progress["error"] is not None:
+            e = progress["error"]
+            logging.error(msg=f"{_action}: {e}")
+            self.setvar(name=VAR_STATUS_BAR, value=f"{_action} failed")
+            msg = helpers.MSG_ERROR_TEMPLATE.format(_action, e)
+            messagebox.showerror(title=_action, message=msg, parent=self)
+        elif progress["stopped"]:
+            logging.info(msg=f"{_action}: stopped")
+            self.setvar(name=VAR_STATUS_BAR, value=f"{_action} stopped")
+        else:
+            msg = (
+                helpers.MSG_SUCCESS_TEMPLATE.format(_action)
+                + f": records={written:,d}, file={progress['filename']}"
+            )
+            logging.info(msg=msg)
+            self.setvar(
+                name=VAR_STATUS_BAR,
+                value=f"Exported {written:,d} records to {progress['filename']}",
+            )
+
     def show_user_add(self):
         """Show Distributor dialog for adding user"""
         try:
@@ -482,8 +864,11 @@ class MainWindow(ttk.Frame):
                         )
                     ).values()
                 )
-                _item = self.treeview.insert_row(index="end", values=values)
-                _iid = _item.iid
+                if self.treeview.datasource is not None:
+                    # Reload the page from database
+                    self.treeview.load_table_data()
+                else:
+                    self.treeview.insert_row(index="end", values=values)
                 id = record.get("id", 0)
                 msg = helpers.MSG_SUCCESS_TEMPLATE.format(_action) + f" for {id=}"
                 logging.info(msg=msg)
@@ -535,9 +920,9 @@ class MainWindow(ttk.Frame):
     def show_user_edit(self):
         """Show Distributor dialog for edit user"""
         try:
-            _selected = self.treeview.get_rows(selected=True)
-            if not _selected or len(_selected) == 0:
+            if self.treeview.selection_count == 0:
                 return
+            _selected = self.treeview.selected_rows
             id = _selected[0].values[0]
             _action = "Get distributor from database"
             logging.debug(msg=f"{_action}: {id=}")
@@ -619,6 +1004,63 @@ class MainWindow(ttk.Frame):
             msg = helpers.MSG_ERROR_TEMPLATE.format(_action, e)
             messagebox.showerror(title=_action, message=msg, parent=self)
 
+    def show_statistics(self) -> None:
+        """Show statistics for all years"""
+        try:
+            _action = "Get statistics from database"
+            logging.debug(msg=_action)
+            self.configure(cursor="wait")
+            stats = self.controller.get_statistics(top=STATS_TOP_DISTRIBUTORS)
+            self.configure(cursor="")
+            messagebox.showinfo(
+                title=BTN_STATISTICS, message=format_statistics(stats), parent=self
+            )
+        except Exception as e:
+            logging.exception(msg=_action)
+            self.configure(cursor="")
+            msg = helpers.MSG_ERROR_TEMPLATE.format(_action, e)
+            messagebox.showerror(title=_action, message=msg, parent=self)
+
+    def show_filter(self) -> None:
+        """Ask the filter expression for the treeview"""
+        columns = ", ".join(col.headertext for col in self.treeview.tablecolumns)
+        msg = (
+            "Filter rows with conditions separated by 'and', for example:\n"
+            "Birth Province = RM and Birth Date < 1970-01-01 and VAT Number present"
+            "\n\nOperators: =, !=, <, <=, >, >=, empty, present"
+            f"\nColumns: {columns}"
+        )
+        expression = simpledialog.askstring(
+            title=BTN_FILTER,
+            prompt=msg,
+            initialvalue=self.filter_expression,
+            parent=self,
+        )
+        if expression is None:
+            return
+        self.treeview_filter(expression=expression)
+
+    def treeview_filter(self, expression: str) -> None:
+        """Filter treeview rows
+
+        Args:
+            expression (str): filter expression, empty to clear the filter
+        """
+        try:
+            _action = "Filter distributors"
+            logging.debug(msg=f"{_action}: {expression=}")
+            filters = self.treeview.parse_filters(expression)
+            self.treeview.filter_rows(filters)
+            self.filter_expression = expression
+            self.treeview_select()
+        except ValueError as e:
+            logging.warning(msg=f"{_action}: {e}")
+            messagebox.showwarning(title=BTN_FILTER, message=str(e), parent=self)
+        except Exception as e:
+            logging.exception(msg=_action)
+            msg = helpers.MSG_ERROR_TEMPLATE.format(_action, e)
+            messagebox.showerror(title=_action, message=msg, parent=self)
+
     def show_settings(self):
         """Show Settings dialog"""
         try:
@@ -643,6 +1085,11 @@ class MainWindow(ttk.Frame):
                 self.settings = result
                 msg = helpers.MSG_SUCCESS_TEMPLATE.format(_action)
                 logging.info(msg=msg)
+                if not self.apply_invoice_unique_key():
+                    msg += (
+                        "\n\nThe invoice unique key was not created:"
+                        " the invoices table contains duplicated keys"
+                    )
                 messagebox.showinfo(title=_action, message=msg, parent=self)
             self.treeview.focus_set()
         except Exception as e:
@@ -653,9 +1100,9 @@ class MainWindow(ttk.Frame):
     def show_user_delete(self):
         """Show user delete"""
         try:
-            _selected = self.treeview.get_rows(selected=True)
-            if not _selected or len(_selected) == 0:
+            if self.treeview.selection_count == 0:
                 return
+            _selected = self.treeview.selected_rows
 
             _action = "Ask delete distributor"
             total = len(_selected)
@@ -678,11 +1125,11 @@ class MainWindow(ttk.Frame):
             _action = "Delete distributor"
             self.config(cursor="watch")
             ids = [item.values[0] for item in _selected]
-            iids = [item.iid for item in _selected]
+            rids = [item.rid for item in _selected]
             logging.debug(msg=f"{_action}: {ids=}")
 
             self.controller.delete_distributor_by_id(ids=ids)
-            self.treeview.delete_rows(iids=iids)
+            self.treeview.delete_rows(rids=rids)
             self.config(cursor="")
             msg = helpers.MSG_SUCCESS_TEMPLATE.format(_action) + f" for {ids}"
             logging.info(msg=msg)
@@ -716,9 +1163,30 @@ class MainWindow(ttk.Frame):
         if data is None:
             logging.warning(msg=f"{_action}: no data found, setting default")
             data = helpers.DEFAULT_SETTINGS
+        else:
+            # Settings added after the database was created
+            _names = {item["name"] for item in data}
+            data.extend(
+                dict(item)
+                for item in helpers.DEFAULT_SETTINGS
+                if item["name"] not in _names
+            )
         logging.info(msg=f"{_action}: {data=}")
         return data
 
+    def apply_invoice_unique_key(self) -> bool:
+        """Create or drop the optional invoice unique key of the settings
+
+        Returns:
+            bool: False if the unique key is on but was not created
+                (duplicated invoices)
+        """
+        _action = "Apply invoice unique key"
+        unique = self.get_setting_value("invoice_unique_key") == "1"
+        created = self.controller.ensure_invoice_natural_key(unique=unique)
+        logging.info(msg=f"{_action}: {unique=}, {created=}")
+        return created or not unique
+
     def get_setting_value(self, name) -> str:
         if self.settings is None:
             self.settings = self._get_settings()
@@ -730,6 +1198,203 @@ class MainWindow(ttk.Frame):
         return None
 
 
+def _thread_load_distributors(
+    controller: controllers.Controller, fields: list, queue: Queue, event: Event
+) -> tuple:
+    """Read distributor rows for the treeview and put them in queue
+
+    The total count is put first, then the rows in chunks of
+    REFRESH_CHUNK_SIZE until all rows are read or event is set.
+
+    Args:
+        controller (Controller): controller
+        fields (list): Distributor fields, in column order
+        queue (Queue): output queue
+        event (Event): stop event
+
+    Returns:
+        tuple: exit code (0 OK, 1 stopped, 2 error), message, rows read
+    """
+
+    def _put(item) -> bool:
+        while not event.is_set():
+            try:
+                queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+    _rows = 0
+    _chunks = None
+    try:
+        if not _put(controller.get_distributor_count()):
+            return (1, "Stopped", _rows)
+        _chunks = controller.iter_distributor_rows(fields, REFRESH_CHUNK_SIZE)
+        for chunk in _chunks:
+            if not _put(chunk):
+                return (1, "Stopped", _rows)
+            _rows += len(chunk)
+        return (0, "OK", _rows)
+    except Exception as e:
+        logging.exception(msg=THREAD_LOAD_DISTRIBUTORS)
+        return (2, str(e), _rows)
+    finally:
+        if _chunks is not None:
+            _chunks.close()
+
+
+def _thread_summary(controller: controllers.Controller) -> tuple:
+    """Summary of the statistics of the last year
+
+    Args:
+        controller (Controller): controller
+
+    Returns:
+        tuple: exit code (0 OK, 2 error), message, summary text
+    """
+    try:
+        _years = controller.get_years_from_invoices()
+        _year = _years[0] if _years else None
+        stats = controller.get_statistics(year=_year, top=0)
+        totals = stats["totals"]
+        summary = (
+            f"Distributors: {stats['distributors']:,d}"
+            f" - without invoices: {stats['distributors_without_invoices']:,d}"
+        )
+        if _year is not None:
+            summary = (
+                f"Year {_year}: invoices {totals['invoices']:,d}"
+                f" - total amount {totals['total_amount']:,.2f}"
+                f" - {summary}"
+            )
+        return (0, "OK", summary)
+    except Exception as e:
+        logging.exception(msg=THREAD_SUMMARY)
+        return (2, str(e), None)
+
+
+def _thread_warm_up() -> None:
+    """Import the modules used by the import and export dialogs, so that
+    they open without delay"""
+    try:
+        _start = time.perf_counter()
+        for _view in ("ImportDialog", "ExportDialog"):
+            getattr(views, _view)
+        import pandas  # noqa: F401
+
+        logging.info(msg=f"{THREAD_WARM_UP}: {time.perf_counter() - _start:.2f}s")
+    except Exception:
+        logging.exception(msg=THREAD_WARM_UP)
+
+
+def schema_datatype(field: dict) -> str:
+    """Get the treeview column datatype of a JSON schema field
+
+    Args:
+        field (dict): JSON schema of the field
+
+    Returns:
+        str: column datatype (date, int, float or str)
+    """
+    for item in [field, *field.get("anyOf", [])]:
+        if item.get("format") == "date":
+            return "date"
+        if item.get("type") in SCHEMA_DATATYPES:
+            return SCHEMA_DATATYPES[item["type"]]
+    return "str"
+
+
+def format_statistics(stats: dict) -> str:
+    """Format statistics returned by Controller.get_statistics
+
+    Args:
+        stats (dict): statistics
+
+    Returns:
+        str: statistics text
+    """
+    lines = [
+        f"Distributors: {stats['distributors']:,d}",
+        f"Distributors without invoices: {stats['distributors_without_invoices']:,d}",
+    ]
+    for row in stats["years"] + [dict(stats["totals"], year="Total")]:
+        lines.append(
+            f"\n{row['year']}: invoices {row['invoices']:,d}"
+            f"\n  taxable {row['taxable_amount']:,.2f}"
+            f" - VAT {row['vat_amount']:,.2f}"
+            f"\n  INPS {row['inps_amount']:,.2f}"
+            f" - withholding {row['rit_amount']:,.2f}"
+            f"\n  total {row['total_amount']:,.2f}"
+        )
+    if stats["top_distributors"]:
+        lines.append("\nTop distributors:")
+        for row in stats["top_distributors"]:
+            lines.append(
+                f"  {row['number']} {row['last_name']} {row['name']}:"
+                f" {row['invoices']:,d} invoices - {row['total_amount']:,.2f}"
+            )
+    return "\n".join(lines)
+
+
+def print_statistics(year: int | None = None, top: int = STATS_TOP_DISTRIBUTORS) -> None:
+    """Write the statistics of the application database in a report next to
+    the log file, the windowed executable has no console. The report is
+    also printed when stdout is available
+
+    Args:
+        year (int | None, optional): year or all years. Defaults to None.
+        top (int, optional): number of top distributors. Defaults to STATS_TOP_DISTRIBUTORS.
+    """
+    db_path = os.path.join(EXE_PATH, f"{config.PACKAGE}.db")
+    controller = controllers.Controller(db_path=db_path, echo=False)
+    try:
+        report = format_statistics(controller.get_statistics(year=year, top=top))
+    finally:
+        controller.close()
+    file_path = os.path.join(
+        os.path.dirname(os.path.abspath(config.LOG_FILE_NAME)),
+        config.STATISTICS_REPORT_FILE_NAME,
+    )
+    with open(file_path, mode="w", encoding="utf-8") as f:
+        f.write(report + "\n")
+    logging.info(msg=f"Write statistics report: {file_path}")
+    if sys.stdout is not None:
+        print(report)
+
+
+def parse_args(args: list | None = None) -> argparse.Namespace:
+    """Parse command line arguments
+
+    Args:
+        args (list | None, optional): arguments. Defaults to sys.argv.
+
+    Returns:
+        argparse.Namespace: parsed arguments
+    """
+    parser = argparse.ArgumentParser(prog=config.PACKAGE, description=config.DESCRIPTION)
+    parser.add_argument(
+        profiler.PROFILE_CLI_FLAG,
+        action="store_true",
+        help="write a startup profiling report next to the log file"
+        f" (or set {profiler.PROFILE_ENV_VAR}=1)",
+    )
+    subparsers = parser.add_subparsers(dest="command")
+    stats_parser = subparsers.add_parser(
+        "stats",
+        help="write database statistics next to the log file"
+        f" ({config.STATISTICS_REPORT_FILE_NAME})",
+    )
+    stats_parser.add_argument("--year", type=int, default=None, help="filter year")
+    stats_parser.add_argument(
+        "--top",
+        type=int,
+        default=STATS_TOP_DISTRIBUTORS,
+        help="number of top distributors",
+    )
+    return parser.parse_args(args)
+
+
 def apply_theme_to_titlebar(window):
     version = sys.getwindowsversion()
 
@@ -751,7 +1416,8 @@ def apply_theme_to_titlebar(window):
 class MyApplication(tk.Tk):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        sv_ttk.set_theme(theme=darkdetect.theme(), root=self)
+        with profiler.phase("theme"):
+            sv_ttk.set_theme(theme=darkdetect.theme(), root=self)
         self.title(f"{config.PACKAGE} v.{config.VERSION}")
         self.geometry("{}x{}".format(1000, 800))
         self.minsize(width=800, height=800)
@@ -763,12 +1429,26 @@ class MyApplication(tk.Tk):
 
     def on_close(self):
         # self.destroy()
+        _view = getattr(self, "mainView", None)
+        if _view is not None and _view._refresh_event is not None:
+            _view._refresh_event.set()
+        if _view is not None and getattr(_view, "treeview", None) is not None:
+            _view.treeview.cancel_export()
+        controllers.job_runner.shutdown()
+        if _view is not None and _view.controller is not None:
+            _view.controller.close()
         self.quit()
 
 
 def main() -> None:
     """Main function"""
-    logging.config.dictConfig(config.LOGGING_CONFIG)
+    args = parse_args()
+    logger.setup(config.LOGGING_CONFIG)
+    if args.command == "stats":
+        print_statistics(year=args.year, top=args.top)
+        logger.stop()
+        return
+
     logging.info(msg="-" * 50)
     logging.info(msg="Start application")
     if helpers.instance_check(config.PACKAGE):
@@ -778,10 +1458,14 @@ def main() -> None:
         logging.info("End application")
     else:
         logging.warning("Application is yet running")
+        logger.stop()
         sys.exit(0)
 
     logging.info(msg="-" * 50)
+    logger.stop()
 
 
 if __name__ == "__main__":
+    # Worker processes of the job runner in the frozen executable
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+"""
+Metrics module
+
+Counters and latency histograms of the hot paths (import, export). A run
+collects its metrics in a MetricsRegistry bound to the worker thread with
+`collect`; the instrumented code (Controller, Repository, DATFile, thread
+functions) records with the module functions `count`, `timer` and
+`timed`, which are no-ops on threads without a registry. The dialogs
+read the registry of the running thread to show the progress and log
+its summary at the end.
+
+@File: metrics.py
+@Date: 2026-10-19
+"""
+
+# Built-in/Generic Imports
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List
+
+# Constants
+# Histogram bucket upper bounds in seconds: 1us * 2^i, up to ~17s
+HISTOGRAM_BOUNDS = tuple(1e-6 * 2**i for i in range(25))
+
+_local = threading.local()
+
+
+class Histogram:
+    """Distribution of observed values (seconds) in exponential buckets"""
+
+    __slots__ = ("count", "total", "min", "max", "buckets")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.buckets = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+
+    def observe(self, value: float) -> None:
+        """Add an observation
+
+        Args:
+            value (float): observed value
+        """
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.buckets[bisect_left(HISTOGRAM_BOUNDS, value)] += 1
+
+    @property
+    def mean(self) -> float:
+        """Mean of the observations"""
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percent: float) -> float:
+        """Approximate percentile (upper bound of the bucket)
+
+        Args:
+            percent (float): percentile, 0-100
+
+        Returns:
+            float: value
+        """
+        if not self.count:
+            return 0.0
+        rank = self.count * percent / 100
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank and count:
+                if index < len(HISTOGRAM_BOUNDS):
+                    return min(HISTOGRAM_BOUNDS[index], self.max)
+                return self.max
+        return self.max
+
+    def snapshot(self) -> dict:
+        """Statistics of the histogram
+
+        Returns:
+            dict: count, total, mean, min, p50, p95 and max
+        """
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.mean,
+            "min": self.min if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "max": self.max,
+        }
+
+
+class MetricsRegistry:
+    """Counters and histograms of a run
+
+    Values are updated by the worker thread and read by the Tk thread,
+    every access holds the registry lock.
+    """
+
+    def __init__(self, name: str = "") -> None:
+        """Initialize registry
+
+        Args:
+            name (str, optional): run name, used in the summary. Defaults to "".
+        """
+        self.name = name
+        self.start_time = time.perf_counter()
+        self.end_time: float | None = None
+        self._counters: Dict[str, int] = {}
+        self._histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        # Registries of worker processes are sent back to the parent
+        with self._lock:
+            state = self.__dict__.copy()
+            state["_counters"] = dict(self._counters)
+            state["_histograms"] = dict(self._histograms)
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def load(self, other: "MetricsRegistry") -> None:
+        """Replace the counters and histograms with the ones of another
+        registry (e.g. the registry of a worker process), the run clock is
+        kept
+
+        Args:
+            other (MetricsRegistry): registry
+        """
+        with other._lock:
+            counters = dict(other._counters)
+            histograms = dict(other._histograms)
+        with self._lock:
+            self._counters = counters
+            self._histograms = histograms
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the start of the run (until its stop)"""
+        end = self.end_time if self.end_time is not None else time.perf_counter()
+        return end - self.start_time
+
+    def stop(self) -> None:
+        """Stop the run clock"""
+        if self.end_time is None:
+            self.end_time = time.perf_counter()
+
+    def count(self, name: str, value: int = 1) -> None:
+        """Increment a counter
+
+        Args:
+            name (str): counter name
+            value (int, optional): increment. Defaults to 1.
+        """
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float) -> None:
+        """Add an observation to a histogram
+
+        Args:
+            name (str): histogram name
+            value (float): observed value (seconds for timers)
+        """
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """Time a block of code into the histogram name
+
+        Args:
+            name (str): histogram name
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def counter(self, name: str) -> int:
+        """Get a counter value
+
+        Args:
+            name (str): counter name
+
+        Returns:
+            int: value (0 if never incremented)
+        """
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def rate(self, name: str) -> float:
+        """Counter increments per second since the start of the run
+
+        Args:
+            name (str): counter name
+
+        Returns:
+            float: rate
+        """
+        elapsed = self.elapsed
+        return self.counter(name) / elapsed if elapsed > 0 else 0.0
+
+    def snapshot(self) -> dict:
+        """Copy of the metrics
+
+        Returns:
+            dict: elapsed, counters and histograms statistics
+        """
+        with self._lock:
+            return {
+                "elapsed": self.elapsed,
+                "counters": dict(self._counters),
+                "histograms": {
+                    name: histogram.snapshot()
+                    for name, histogram in self._histograms.items()
+                },
+            }
+
+    def stage_latencies(self) -> List[tuple[str, str]]:
+        """Latency of each timed stage, for the progress of the dialogs
+
+        Returns:
+            List[tuple[str, str]]: (stage, latency) like
+                ("db.commit", "1.20 ms avg, 3.10 ms p95 (1,000)")
+        """
+        histograms = self.snapshot()["histograms"]
+        return [
+            (
+                name,
+                f"{stats['mean'] * 1000:,.2f} ms avg,"
+                f" {stats['p95'] * 1000:,.2f} ms p95 ({stats['count']:,d})",
+            )
+            for name, stats in sorted(histograms.items())
+        ]
+
+    def summary(self) -> str:
+        """Multi-line summary of the run
+
+        Returns:
+            str: summary
+        """
+        snapshot = self.snapshot()
+        elapsed = snapshot["elapsed"]
+        lines = [f"Metrics {self.name}: elapsed={elapsed:.3f}s"]
+        for name, value in sorted(snapshot["counters"].items()):
+            rate = value / elapsed if elapsed > 0 else 0.0
+            lines.append(f"- {name}: {value:,d} ({rate:,.1f}/s)")
+        for name, stats in sorted(snapshot["histograms"].items()):
+            lines.append(
+                f"- {name}: count={stats['count']:,d} total={stats['total']:.3f}s"
+                f" mean={stats['mean'] * 1000:.3f}ms p50={stats['p50'] * 1000:.3f}ms"
+                f" p95={stats['p95'] * 1000:.3f}ms max={stats['max'] * 1000:.3f}ms"
+            )
+        return "\n".join(lines)
+
+
+@contextmanager
+def collect(registry: MetricsRegistry, stop: bool = True) -> Iterator[MetricsRegistry]:
+    """Record the metrics of the calling thread into registry
+
+    Args:
+        registry (MetricsRegistry): run registry
+        stop (bool, optional): stop the run clock on exit, False for the
+            helper threads of a run. Defaults to True.
+
+    Yields:
+        Iterator[MetricsRegistry]: the registry
+    """
+    previous = getattr(_local, "registry", None)
+    _local.registry = registry
+    try:
+        yield registry
+    finally:
+        _local.registry = previous
+        if stop:
+            registry.stop()
+
+
+def current() -> MetricsRegistry | None:
+    """Registry of the calling thread
+
+    Returns:
+        MetricsRegistry | None: registry or None if not collecting
+    """
+    return getattr(_local, "registry", None)
+
+
+def count(name: str, value: int = 1) -> None:
+    """Increment a counter of the calling thread registry
+
+    Args:
+        name (str): counter name
+        value (int, optional): increment. Defaults to 1.
+    """
+    registry = getattr(_local, "registry", None)
+    if registry is not None:
+        registry.count(name, value)
+
+
+@contextmanager
+def timer(name: str) -> Iterator[None]:
+    """Time a block of code into the calling thread registry
+
+    Args:
+        name (str): histogram name
+    """
+    registry = getattr(_local, "registry", None)
+    if registry is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe(name, time.perf_counter() - start)
+
+
+def timed(name: str) -> Callable:
+    """Decorator timing the calls of a function into the calling thread
+    registry
+
+    Args:
+        name (str): histogram name
+
+    Returns:
+        Callable: decorator
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            registry = getattr(_local, "registry", None)
+            if registry is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                registry.observe(name, time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
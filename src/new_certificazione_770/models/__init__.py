@@ -1,14 +1,60 @@
-from .base_models import BaseModel, Company, Distributor, Invoice, Setting
+from .base_models import (
+    BaseModel,
+    Company,
+    Distributor,
+    ImportReject,
+    ImportRun,
+    Invoice,
+    Setting,
+)
 from .dat_model import DATCSVModel, DATFile
-from .repository import Repository
+from .repository import (
+    DUPLICATE_MODES,
+    IMPORT_ABANDONED,
+    IMPORT_CANCELLED,
+    IMPORT_COMPLETED,
+    IMPORT_FAILED,
+    IMPORT_RUNNING,
+    REJECT_CORRECTED,
+    REJECT_DUPLICATE,
+    REJECT_INVALID,
+    REJECT_NO_DISTRIBUTOR,
+    REJECT_OPEN,
+    REJECT_REPROCESSED,
+    REJECT_STAGE_CLEAN,
+    REJECT_STAGE_VALIDATE,
+    REJECT_STAGE_WRITE,
+    REJECT_STAGES,
+    REJECT_STATUSES,
+    Repository,
+)
 
 __all__ = [
     BaseModel,
     Company,
     Distributor,
+    ImportReject,
+    ImportRun,
     Invoice,
     DATCSVModel,
     DATFile,
+    DUPLICATE_MODES,
+    IMPORT_ABANDONED,
+    IMPORT_CANCELLED,
+    IMPORT_COMPLETED,
+    IMPORT_FAILED,
+    IMPORT_RUNNING,
+    REJECT_CORRECTED,
+    REJECT_DUPLICATE,
+    REJECT_INVALID,
+    REJECT_NO_DISTRIBUTOR,
+    REJECT_OPEN,
+    REJECT_REPROCESSED,
+    REJECT_STAGE_CLEAN,
+    REJECT_STAGE_VALIDATE,
+    REJECT_STAGE_WRITE,
+    REJECT_STAGES,
+    REJECT_STATUSES,
     Setting,
     Repository,
 ]
@@ -301,3 +301,70 @@ class Invoice(BaseModel, table=True, extend_existing=True):
 
     def __repr__(self):
         return f"{self.__class__.__qualname__}: ({self.id=!r}, {self.number=!r})"
+
+
+class ImportRun(BaseModel, table=True, extend_existing=True):
+    """Import run SQL model: checkpoint of an import, to resume it after a
+    crash or a cancellation
+
+    Args:
+        BaseModel (SQL base model): Base SQL model
+        table (bool, optional): define if is table. Defaults to True.
+        extend_existing (bool, optional): extend existing. Defaults to True.
+
+    Returns:
+         model: SQL model
+    """
+
+    __tablename__ = "import_runs"
+
+    file_hash: str = Field(index=True, title="File SHA-256")
+    file_name: str = Field(title="File name")
+    import_type: str = Field(title="Import type")
+    duplicates: str = Field(title="Duplicate mode", default="")
+    status: str = Field(title="Status")
+    chunk_size: int = Field(title="Chunk size")
+    last_chunk: int = Field(title="Last committed chunk", default=-1)
+
+    rows_done: int = Field(title="Rows done", default=0)
+    inserted: int = Field(title="Inserted", default=0)
+    updated: int = Field(title="Updated", default=0)
+    errors: int = Field(title="Errors", default=0)
+    skipped: int = Field(title="Skipped", default=0)
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__qualname__}: ({self.id=!r}, {self.status=!r},"
+            f" {self.last_chunk=!r})"
+        )
+
+
+class ImportReject(BaseModel, table=True, extend_existing=True):
+    """Import reject SQL model: a source row rejected by an import run, with
+    the error and the stage that rejected it
+
+    Args:
+        BaseModel (SQL base model): Base SQL model
+        table (bool, optional): define if is table. Defaults to True.
+        extend_existing (bool, optional): extend existing. Defaults to True.
+
+    Returns:
+         model: SQL model
+    """
+
+    __tablename__ = "import_rejects"
+
+    import_run_id: int = Field(
+        foreign_key="import_runs.id", index=True, title="Import run"
+    )
+    stage: str = Field(title="Stage")
+    error_code: str = Field(title="Error code")
+    error_message: str = Field(title="Error message", default="")
+    status: str = Field(title="Status")
+    data: str = Field(title="Source row (JSON)")
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__qualname__}: ({self.id=!r}, {self.stage=!r},"
+            f" {self.error_code=!r}, {self.status=!r})"
+        )
@@ -15,6 +15,12 @@ import os
 # Libs
 from pydantic import BaseModel, Field
 
+# Own modules
+try:
+    from .. import metrics
+except:  # noqa: E722
+    import new_certificazione_770.metrics as metrics
+
 
 class DATCSVModel(BaseModel):
     """DATCSV Model Class for DAT record"""
@@ -321,6 +327,7 @@ class DATFile:
         text: str = f"{val:z.2f}".replace(".", ",")
         return text
 
+    @metrics.timed("dat.format")
     def _transform_data_into_datcsv(self, record: list) -> DATCSVModel:
         """(Static) Trasform a list of values in DATCSVModel"""
         try:
@@ -373,8 +380,9 @@ class DATFile:
         row_dict = record.model_dump(by_alias=True)
         if self._csv_writer is None:
             self._start_CSV()
-        self._csv_writer.writerow(row_dict.values())
-        self._csv_fd.flush()
+        with metrics.timer("dat.write"):
+            self._csv_writer.writerow(row_dict.values())
+            self._csv_fd.flush()
 
     def __exit__(self):
         if self._csv_fd and not self._csv_fd.closed:
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+Schema migrations module
+
+The schema version is stored in the database header (PRAGMA user_version).
+At startup only the pending steps of MIGRATIONS are applied and the version
+is bumped after each one; when the schema is current no table is reflected
+at all. Steps must be idempotent (IF NOT EXISTS, checkfirst) because the
+SQLite driver does not wrap DDL in a transaction.
+
+@File: migrations.py
+@Date: 2026-10-19
+"""
+
+# Built-in/Generic Imports
+import logging
+from typing import Callable, List, Tuple
+
+# Libs
+from sqlalchemy import Column, Integer, MetaData, Table
+from sqlalchemy.engine import Connection, Engine
+from sqlmodel import SQLModel, inspect
+
+# Own modules
+from .base_models import Distributor, ImportReject, ImportRun, Invoice, Setting
+
+# Constants
+INVOICE_KEY_COLUMNS = ("number", "year", "distributor_number")
+INVOICE_KEY_UNIQUE_INDEX = "ux_invoices_natural_key"
+INVOICE_KEY_INDEX = "ix_invoices_natural_key"
+
+# Staged import: source rows of an import run, waiting for the merge
+IMPORT_STAGE_RUN = "import_run_id"
+IMPORT_STAGE_ROW = "stage_row"
+IMPORT_STAGE_EXCLUDE = ("id", "created_at", "updated_at", "distributor_id")
+
+
+def _import_stage_table(model) -> Table:
+    """Build the staging table of the staged import of a model
+
+    Unlike the temporary table of the bulk invoice insert, the table is on
+    disk: the rows of a file are loaded chunk by chunk and merged later,
+    also after a restart. The model columns are all nullable, the merge
+    checks them.
+
+    Args:
+        model (SQLModel): SQL model
+
+    Returns:
+        Table: model columns plus the import run and the source row
+    """
+    columns = [
+        Column(column.name, column.type)
+        for column in model.__table__.columns
+        if column.name not in IMPORT_STAGE_EXCLUDE
+    ]
+    return Table(
+        f"import_stage_{model.__tablename__}",
+        MetaData(),
+        Column(IMPORT_STAGE_RUN, Integer, primary_key=True),
+        Column(IMPORT_STAGE_ROW, Integer, primary_key=True),
+        *columns,
+    )
+
+
+IMPORT_STAGE_TABLES = {
+    Distributor: _import_stage_table(Distributor),
+    Invoice: _import_stage_table(Invoice),
+}
+
+
+def _migration_baseline(connection: Connection) -> None:
+    """Create missing tables and fix the settings table of release 0.2.x
+
+    Args:
+        connection (Connection): database connection
+    """
+    SQLModel.metadata.create_all(bind=connection, checkfirst=True)
+
+    # Control settings.code_somme_non_sogg
+    inspector = inspect(connection)
+    columns = inspector.get_columns(Setting.__tablename__)
+    column_names = [column["name"] for column in columns]
+    if "name" not in column_names:
+        Setting.__table__.drop(connection)
+        Setting.__table__.create(connection)
+
+
+def _migration_performance_indexes(connection: Connection) -> None:
+    """Add indexes used by the export and the invoice lookups
+
+    Args:
+        connection (Connection): database connection
+    """
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_invoices_year_distributor_id"
+        " ON invoices (year, distributor_id)"
+    )
+
+
+def invoice_natural_key_is_unique(connection: Connection) -> bool:
+    """Check if the invoice natural key has the unique index
+
+    Args:
+        connection (Connection): database connection
+
+    Returns:
+        bool: True if the unique index exists
+    """
+    table = Invoice.__tablename__
+    indexes = [
+        row[1] for row in connection.exec_driver_sql(f"PRAGMA index_list({table})")
+    ]
+    return INVOICE_KEY_UNIQUE_INDEX in indexes
+
+
+def create_invoice_natural_key(connection: Connection, unique: bool = False) -> bool:
+    """Create the index on the invoice natural key
+
+    The plain index keeps the duplicate checks of the import indexed and
+    allows repeated keys. The unique index is optional and is created only
+    when the table has no duplicated keys, otherwise the plain index is kept.
+
+    Args:
+        connection (Connection): database connection
+        unique (bool, optional): create the unique index. Defaults to False.
+
+    Returns:
+        bool: True if the unique index exists
+    """
+    table = Invoice.__tablename__
+    columns = ", ".join(INVOICE_KEY_COLUMNS)
+    if unique:
+        if invoice_natural_key_is_unique(connection):
+            return True
+        duplicates = connection.exec_driver_sql(
+            f"SELECT COUNT(*) FROM (SELECT 1 FROM {table}"
+            f" GROUP BY {columns} HAVING COUNT(*) > 1)"
+        ).scalar()
+        if not duplicates:
+            connection.exec_driver_sql(f"DROP INDEX IF EXISTS {INVOICE_KEY_INDEX}")
+            connection.exec_driver_sql(
+                f"CREATE UNIQUE INDEX {INVOICE_KEY_UNIQUE_INDEX} ON {table} ({columns})"
+            )
+            return True
+        logging.warning(
+            msg=f"Invoice natural key not unique: {duplicates:,d} duplicated key(s)"
+        )
+
+    connection.exec_driver_sql(
+        f"CREATE INDEX IF NOT EXISTS {INVOICE_KEY_INDEX} ON {table} ({columns})"
+    )
+    connection.exec_driver_sql(f"DROP INDEX IF EXISTS {INVOICE_KEY_UNIQUE_INDEX}")
+    return False
+
+
+def _migration_invoice_natural_key(connection: Connection) -> None:
+    """Add the invoice natural key index (not unique, the unique index is
+    an option of the settings)
+
+    Args:
+        connection (Connection): database connection
+    """
+    create_invoice_natural_key(connection, unique=False)
+
+
+def _migration_import_runs(connection: Connection) -> None:
+    """Add the import runs table (import checkpoints)
+
+    Args:
+        connection (Connection): database connection
+    """
+    ImportRun.__table__.create(bind=connection, checkfirst=True)
+
+
+def _migration_import_rejects(connection: Connection) -> None:
+    """Add the import rejects table
+
+    Args:
+        connection (Connection): database connection
+    """
+    ImportReject.__table__.create(bind=connection, checkfirst=True)
+
+
+def _migration_import_stage(connection: Connection) -> None:
+    """Add the staging tables of the staged import
+
+    Args:
+        connection (Connection): database connection
+    """
+    for table in IMPORT_STAGE_TABLES.values():
+        table.create(bind=connection, checkfirst=True)
+
+
+# (version, description, step) - append new steps, never edit applied ones
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "Baseline schema", _migration_baseline),
+    (2, "Performance indexes", _migration_performance_indexes),
+    (3, "Invoice natural key", _migration_invoice_natural_key),
+    (4, "Import runs", _migration_import_runs),
+    (5, "Import rejects", _migration_import_rejects),
+    (6, "Import staging", _migration_import_stage),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(connection: Connection) -> int:
+    """Get schema version stored in database
+
+    Args:
+        connection (Connection): database connection
+
+    Returns:
+        int: schema version (0 for a new or never migrated database)
+    """
+    return int(connection.exec_driver_sql("PRAGMA user_version").scalar())
+
+
+def upgrade(engine: Engine) -> List[int]:
+    """Apply pending migrations
+
+    Args:
+        engine (Engine): database engine
+
+    Returns:
+        List[int]: applied versions (empty if schema is current)
+    """
+    with engine.connect() as connection:
+        current = get_schema_version(connection)
+
+    applied = []
+    for version, description, step in MIGRATIONS:
+        if version <= current:
+            continue
+        logging.info(msg=f"Apply schema migration {version}: {description}")
+        with engine.begin() as connection:
+            step(connection)
+            # Version is bumped only after the step completed
+            connection.exec_driver_sql(f"PRAGMA user_version = {version:d}")
+        applied.append(version)
+    return applied
@@ -7,9 +7,28 @@ Repository module
 """
 
 # Built-in/Generic Imports
-from typing import Any, List, Optional, Type, Union
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Any, Iterator, List, Optional, Type, Union
 
 # Libs
+from sqlalchemy import (
+    Column,
+    Date,
+    DateTime,
+    Integer,
+    MetaData,
+    Numeric,
+    String,
+    Table,
+    bindparam,
+    cast,
+    event,
+    or_,
+    text,
+)
+from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlmodel import (
     Session,
     SQLModel,
@@ -18,21 +37,217 @@ from sqlmodel import (
     delete,
     desc,
     distinct,
+    exists,
     func,
-    inspect,
     select,
 )
 
 # Own modules
-from .base_models import Distributor, Invoice, Setting
+try:
+    from .. import metrics
+except:  # noqa: E722
+    import new_certificazione_770.metrics as metrics
+
+from . import migrations
+from .base_models import Distributor, ImportReject, ImportRun, Invoice
 
 # Constants
 CONNECTION_DIALECT = "sqlite"
 
+# SQLite allows one writer at a time: the pool keeps one connection for the
+# writer plus POOL_READERS connections for concurrent readers (WAL mode)
+POOL_READERS = 4
+POOL_SIZE = POOL_READERS + 1
+POOL_TIMEOUT = 30
+BUSY_TIMEOUT = 30
+
+SESSION_DEPTH = "scope_depth"
+SESSION_WRITER = "scope_writer"
+
+# Duplicate invoice handling of insert_invoices_bulk; keep stores repeated
+# keys, unless the optional unique index forbids them (they are reported)
+DUPLICATE_SKIP = "skip"
+DUPLICATE_REPLACE = "replace"
+DUPLICATE_REPORT = "report"
+DUPLICATE_KEEP = "keep"
+DUPLICATE_MODES = (DUPLICATE_SKIP, DUPLICATE_REPLACE, DUPLICATE_REPORT, DUPLICATE_KEEP)
+
+# Import run status (import checkpoints)
+IMPORT_RUNNING = "running"
+IMPORT_COMPLETED = "completed"
+IMPORT_CANCELLED = "cancelled"
+IMPORT_FAILED = "failed"
+IMPORT_ABANDONED = "abandoned"
+# A run still "running" was interrupted by a crash
+IMPORT_RESUMABLE = (IMPORT_RUNNING, IMPORT_CANCELLED, IMPORT_FAILED)
+
+# Import rejects: stage that rejected the row and status of the row
+REJECT_STAGE_CLEAN = "clean"
+REJECT_STAGE_VALIDATE = "validate"
+REJECT_STAGE_WRITE = "write"
+REJECT_STAGES = (REJECT_STAGE_CLEAN, REJECT_STAGE_VALIDATE, REJECT_STAGE_WRITE)
+REJECT_OPEN = "open"
+REJECT_CORRECTED = "corrected"
+REJECT_REPROCESSED = "reprocessed"
+REJECT_STATUSES = (REJECT_OPEN, REJECT_CORRECTED, REJECT_REPROCESSED)
+REJECT_FILTERS = ("stage", "error_code", "status")
+
+# Error codes of the insert_invoices_bulk and merge_staged_rows rejects
+REJECT_NO_DISTRIBUTOR = "no_distributor"
+REJECT_DUPLICATE = "duplicate"
+REJECT_INVALID = "invalid"
+
+INVOICE_STAGE_TABLE = "invoices_stage"
+INVOICE_STAGE_ROW = "stage_row"
+
+
+def _set_sqlite_pragma(dbapi_connection, connection_record) -> None:
+    """Configure every new SQLite connection of the pool
+
+    Args:
+        dbapi_connection (Any): DBAPI connection
+        connection_record (Any): pool connection record
+    """
+    cursor = dbapi_connection.cursor()
+    # WAL lets readers work while the writer holds the write lock
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+def _invoice_stage_table() -> Table:
+    """Build the temporary staging table used by the bulk invoice import
+
+    Returns:
+        Table: temporary table with the invoice columns plus the batch row index
+    """
+    columns = [
+        Column(column.name, column.type)
+        for column in Invoice.__table__.columns
+        if column.name != "id"
+    ]
+    return Table(
+        INVOICE_STAGE_TABLE,
+        MetaData(),
+        Column(INVOICE_STAGE_ROW, Integer, primary_key=True),
+        *columns,
+        prefixes=["TEMPORARY"],
+    )
+
+
+INVOICE_STAGE = _invoice_stage_table()
+
+
+def _column_type(column: Column) -> Any:
+    """Type of a column, decorated types (AutoString) by their implementation"""
+    return getattr(column.type, "impl", column.type)
+
+
+def _import_stage_checks(model: Any, constraints: bool) -> List[tuple[str, str]]:
+    """SQL checks of the staged rows of a model
+
+    Args:
+        model (Any): SQL model
+        constraints (bool): check the field types and lengths of the model
+            besides the required columns
+
+    Returns:
+        List[tuple[str, str]]: (condition of an invalid row, error message)
+    """
+    checks = []
+    for column in model.__table__.columns:
+        name = column.name
+        if name in migrations.IMPORT_STAGE_EXCLUDE:
+            continue
+        if not column.nullable:
+            checks.append((f"{name} IS NULL", f"{name}: field required"))
+        if not constraints:
+            continue
+        column_type = _column_type(column)
+        if isinstance(column_type, Integer):
+            checks.append(
+                (
+                    f"typeof({name}) NOT IN ('integer', 'null')",
+                    f"{name}: invalid integer",
+                )
+            )
+        elif isinstance(column_type, Numeric):
+            checks.append(
+                (
+                    f"typeof({name}) NOT IN ('integer', 'real', 'null')",
+                    f"{name}: invalid number",
+                )
+            )
+        elif isinstance(column_type, Date):
+            checks.append(
+                (
+                    f"{name} IS NOT NULL AND date({name}) IS NULL",
+                    f"{name}: invalid date",
+                )
+            )
+        for metadata in model.model_fields[name].metadata:
+            if getattr(metadata, "min_length", None):
+                checks.append(
+                    (
+                        f"length({name}) < {metadata.min_length:d}",
+                        f"{name}: at least {metadata.min_length:d} characters",
+                    )
+                )
+            if getattr(metadata, "max_length", None):
+                checks.append(
+                    (
+                        f"length({name}) > {metadata.max_length:d}",
+                        f"{name}: at most {metadata.max_length:d} characters",
+                    )
+                )
+    return checks
+
+
+# Staged import: invoices are checked against their model like
+# Controller.validate_invoices, distributors are upserted as they are like
+# Controller.import_distributor (only their required columns are checked)
+IMPORT_STAGE_CHECKS = {
+    Distributor: _import_stage_checks(Distributor, constraints=False),
+    Invoice: _import_stage_checks(Invoice, constraints=True),
+}
+
+
+@contextmanager
+def _cache_size(connection: Any, cache_size: int | None) -> Iterator[None]:
+    """Cap the page cache of a connection, split between the database and
+    the temporary tables, and restore it on exit
+
+    Args:
+        connection (Any): connection of a scope
+        cache_size (int | None): page cache in KiB, None to keep it
+    """
+    if not cache_size:
+        yield
+        return
+    previous = {
+        schema: connection.exec_driver_sql(f"PRAGMA {schema}.cache_size").scalar()
+        for schema in ("main", "temp")
+    }
+    for schema in previous:
+        # A negative cache size is in KiB instead of pages
+        connection.exec_driver_sql(
+            f"PRAGMA {schema}.cache_size = {-max(cache_size // 2, 1):d}"
+        )
+    try:
+        yield
+    finally:
+        for schema, size in previous.items():
+            connection.exec_driver_sql(f"PRAGMA {schema}.cache_size = {size:d}")
+
 
 # Class
 class Repository:
-    """Repository class"""
+    """Repository class
+
+    Every public method runs in its own unit of work (see `session_scope`).
+    Sessions are thread-local, so the Tk main thread and the worker threads
+    never share a session or its identity map.
+    """
 
     def __init__(self, database_path: str) -> None:
         """init
@@ -41,75 +256,178 @@ class Repository:
             database_path (str): database file path
         """
         self.connection_string = f"{CONNECTION_DIALECT}:///" + f"{database_path}"
-        self.model: SQLModel | None = None
-        self.session = None
         self.engine = None
+        self._sessions: scoped_session | None = None
+        self._write_lock = threading.Lock()
+        self._statements: dict[tuple, Any] = {}
+        self._data_version = 0
 
     def open_session(self, echo: Any = False) -> None:
-        """Create SQL engine and open session
+        """Create SQL engine and the thread-aware session factory
 
         Args:
             echo (Any, optional): set echo debug level. Defaults to False.
         """
-        self.engine = create_engine(self.connection_string, echo=echo, echo_pool=True)
-        self.session = Session(
-            self.engine, autoflush=False, expire_on_commit=True, autocommit=False
+        self.engine = create_engine(
+            self.connection_string,
+            echo=echo,
+            echo_pool=True,
+            pool_size=POOL_SIZE,
+            max_overflow=0,
+            pool_timeout=POOL_TIMEOUT,
+            connect_args={"check_same_thread": False, "timeout": BUSY_TIMEOUT},
+        )
+        event.listen(self.engine, "connect", _set_sqlite_pragma)
+        self._sessions = scoped_session(
+            sessionmaker(
+                bind=self.engine,
+                class_=Session,
+                autoflush=False,
+                expire_on_commit=False,
+            )
         )
-
-        SQLModel.metadata.create_all(bind=self.engine, checkfirst=True)
 
         self.upgrade_tables()
 
-    def upgrade_tables(self):
-        # Control settings.code_somme_non_sogg
-        inspector = inspect(self.engine)
-        columns = inspector.get_columns("settings")
-        column_names = [column["name"] for column in columns]
-        if "name" not in column_names:
-            Setting.__table__.drop(self.engine)
-            SQLModel.metadata.create_all(bind=self.engine, checkfirst=True)
+    def close_session(self) -> None:
+        """Close the sessions of the calling thread and dispose the engine"""
+        if self._sessions is not None:
+            self._sessions.remove()
+        if self.engine is not None:
+            self.engine.dispose()
+
+    @contextmanager
+    def session_scope(self, write: bool = False) -> Iterator[Session]:
+        """Unit of work on the session of the calling thread
+
+        The outermost scope commits (or rolls back) and releases the session;
+        nested scopes join the running transaction. Write scopes are
+        serialized by a lock so that only one thread writes at a time, while
+        read scopes never wait for it.
+
+        Args:
+            write (bool, optional): scope writes to database. Defaults to False.
+
+        Yields:
+            Iterator[Session]: thread-local session
+        """
+        session = self._sessions()
+        depth = session.info.get(SESSION_DEPTH, 0)
+        if write and not session.info.get(SESSION_WRITER, False):
+            with metrics.timer("db.write_lock"):
+                self._write_lock.acquire()
+            session.info[SESSION_WRITER] = True
+
+        session.info[SESSION_DEPTH] = depth + 1
+        try:
+            yield session
+            if depth == 0:
+                with metrics.timer("db.commit"):
+                    session.commit()
+        except Exception as e:
+            if depth == 0:
+                session.rollback()
+            raise e
+        finally:
+            session.info[SESSION_DEPTH] = depth
+            if depth == 0:
+                if session.info.pop(SESSION_WRITER, False):
+                    self._data_version += 1
+                    self._write_lock.release()
+                self._sessions.remove()
+
+    @property
+    def data_version(self) -> int:
+        """Counter incremented by every write unit of work and schema change"""
+        return self._data_version
+
+    def upgrade_tables(self) -> List[int]:
+        """Apply pending schema migrations
+
+        Returns:
+            List[int]: applied schema versions (empty if schema is current)
+        """
+        with self._write_lock:
+            try:
+                return migrations.upgrade(self.engine)
+            finally:
+                self._data_version += 1
 
     def recreate_table(self) -> None:
         """Recreate table"""
-        SQLModel.metadata.drop_all(self.engine)
-        SQLModel.metadata.create_all(self.engine)
+        with self._write_lock:
+            try:
+                SQLModel.metadata.drop_all(self.engine)
+                for table in migrations.IMPORT_STAGE_TABLES.values():
+                    table.drop(bind=self.engine, checkfirst=True)
+                with self.engine.begin() as connection:
+                    connection.exec_driver_sql("PRAGMA user_version = 0")
+            finally:
+                self._data_version += 1
+        self.upgrade_tables()
 
-    def _construct_get_stmt(self, id: int):
-        stmt = select(self.model).where(self.model.id == id)
-        return stmt
+    def _construct_get_stmt(self, model: Any):
+        """Construct SQL statement get by id (cached, parameter `id`)
 
-    def _construct_list_stmt(self, **filters):
+        Args:
+            model (Any): SQL model
+
+        Returns:
+            statement: SQL statement
+        """
+        return self._construct_list_stmt(model, id=0)
+
+    def _construct_list_stmt(self, model: Any, **filters):
         """Construct SQL statement list
 
+        Statements are parameterized and cached by shape (model and filter
+        columns), so the hot import loop reuses the same statement object
+        and SQLAlchemy's compiled cache instead of rebuilding the select on
+        every call. Execute it with `params=filters`.
+
         Raises:
             ValueError: Return invalid column name
 
         Returns:
             statement: SQL statement
         """
-        stmt = select(self.model)
+        # None values compile to IS NULL, so they are part of the shape
+        shape = (model, tuple((c, filters[c] is None) for c in sorted(filters)))
+        stmt = self._statements.get(shape)
+        if stmt is not None:
+            return stmt
+
+        stmt = select(model)
         where_clauses = []
-        for c, v in filters.items():
-            if not hasattr(self.model, c):
+        for c, is_null in shape[1]:
+            if not hasattr(model, c):
                 raise ValueError(f"Invalid column name {c}")
-            where_clauses.append(getattr(self.model, c) == v)
+            if is_null:
+                where_clauses.append(getattr(model, c).is_(None))
+            else:
+                where_clauses.append(getattr(model, c) == bindparam(c))
 
         if len(where_clauses) == 1:
             stmt = stmt.where(where_clauses[0])
         elif len(where_clauses) > 1:
             stmt = stmt.where(and_(*where_clauses))
+        self._statements[shape] = stmt
         return stmt
 
-    def _to_model_cls(self, obj) -> SQLModel:
+    def _params(self, **filters) -> dict:
+        """Bind parameters for a statement built by `_construct_list_stmt`"""
+        return {c: v for c, v in filters.items() if v is not None}
+
+    def _to_model_cls(self, model: Any, obj) -> SQLModel:
         """Turn an object to item"""
-        if isinstance(obj, self.model):
+        if isinstance(obj, model):
             return obj
         elif isinstance(obj, dict):
-            return self.model(**obj)
+            return model(**obj)
         elif isinstance(obj, (list, tuple, set)):
-            return self.model(*obj)
+            return model(*obj)
         else:
-            raise TypeError(f"Cannot cast {type(obj)} to {self.model}")
+            raise TypeError(f"Cannot cast {type(obj)} to {model}")
 
     def _to_dict(self, item: Any, exclude_unset: bool = True) -> dict:
         """Transform model item into dict
@@ -134,19 +452,18 @@ class Repository:
             d.pop("_sa_instance_state", None)
             return d
 
-    def _set_model(self, model: Any) -> SQLModel:
-        """Set class model
+    def _get_model(self, model: Any) -> Type[SQLModel]:
+        """Get class model
 
         Args:
             model (Any): model
 
         Returns:
-            SQLModel: SQL model
+            Type[SQLModel]: SQL model
         """
         if isinstance(model, str):
-            self.model = Type[model]
-        else:
-            self.model = model
+            return Type[model]
+        return model
 
     def get_by_id(self, model: Any, id: int) -> Optional[SQLModel]:
         """Get model item by id
@@ -158,10 +475,12 @@ class Repository:
         Returns:
             Optional[SQLModel]: return SQLModel | None
         """
-        self._set_model(model)
-        stmt = select(self.model).where(self.model.id == id)
-        return self.session.exec(stmt).first()
+        model = self._get_model(model)
+        with self.session_scope() as session:
+            stmt = self._construct_get_stmt(model)
+            return session.exec(stmt, params={"id": id}).first()
 
+    @metrics.timed("db.lookup")
     def get_first(self, model: Any, **filters) -> Optional[SQLModel]:
         """Get first item by filters
 
@@ -171,9 +490,10 @@ class Repository:
         Returns:
             Optional[SQLModel]: SQL Model | None
         """
-        self._set_model(model)
-        stmt = self._construct_list_stmt(**filters)
-        return self.session.exec(stmt).first()
+        model = self._get_model(model)
+        with self.session_scope() as session:
+            stmt = self._construct_list_stmt(model, **filters)
+            return session.exec(stmt, params=self._params(**filters)).first()
 
     def list(self, model: Any, **filters) -> List[SQLModel]:
         """Get list for model by filters
@@ -184,10 +504,213 @@ class Repository:
         Returns:
             List[SQLModel]: List of SQL Model | None
         """
-        self._set_model(model)
-        stmt = self._construct_list_stmt(**filters)
-        return self.session.exec(stmt).all()
+        model = self._get_model(model)
+        with self.session_scope() as session:
+            stmt = self._construct_list_stmt(model, **filters)
+            return session.exec(stmt, params=self._params(**filters)).all()
+
+    def iter_columns(
+        self, model: Any, columns: List[str], chunk_size: int = 1000
+    ) -> Iterator[List]:
+        """Stream column values of all records in chunks ordered by id
+
+        Only the requested columns are selected and no model instance is
+        built, rows are fetched from the cursor chunk by chunk.
+
+        Args:
+            model (Any): SQL Model
+            columns (List[str]): column names
+            chunk_size (int, optional): rows per chunk. Defaults to 1000.
+
+        Raises:
+            ValueError: Return invalid column name
+
+        Yields:
+            Iterator[List]: list of rows (tuples of column values)
+        """
+        model = self._get_model(model)
+        for c in columns:
+            if not hasattr(model, c):
+                raise ValueError(f"Invalid column name {c}")
+        stmt = (
+            select(*[getattr(model, c) for c in columns])
+            .order_by(model.id)
+            .execution_options(yield_per=chunk_size)
+        )
+        with self.session_scope() as session:
+            for partition in session.execute(stmt).partitions():
+                yield [tuple(row) for row in partition]
+
+    def _page_conditions(
+        self, model: Any, columns: List[str], search: str = "", filters=()
+    ) -> list:
+        """Build the where clauses of a page query
+
+        Args:
+            model (Any): SQL Model
+            columns (List[str]): column names searched for text
+            search (str, optional): text contained in any column. Defaults to "".
+            filters (Iterable[tuple], optional): (column, operator, value)
+                predicates, operators ==, !=, <, <=, >, >=, empty, present.
+                Defaults to ().
+
+        Raises:
+            ValueError: Return invalid column name, operator or value
+
+        Returns:
+            list: where clauses
+        """
+        conditions = []
+        if search:
+            pattern = "%{}%".format(
+                search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            )
+            conditions.append(
+                or_(
+                    *[
+                        cast(getattr(model, c), String).like(pattern, escape="\\")
+                        for c in columns
+                    ]
+                )
+            )
+
+        for name, operator, value in filters:
+            if not hasattr(model, name):
+                raise ValueError(f"Invalid column name {name}")
+            column = getattr(model, name)
+            if operator == "empty":
+                conditions.append(or_(column.is_(None), column == ""))
+                continue
+            if operator == "present":
+                conditions.append(and_(column.is_not(None), column != ""))
+                continue
+
+            # Decorated types (AutoString) are checked by their implementation
+            column_type = getattr(column.type, "impl", column.type)
+            if isinstance(column_type, Date):
+                value = date.fromisoformat(str(value).strip()[:10])
+            elif isinstance(column_type, Integer):
+                value = int(value)
+            elif isinstance(column_type, Numeric):
+                value = float(value)
+            elif isinstance(column_type, String):
+                # Text compares case-insensitively like the treeview
+                column = column.collate("NOCASE")
+                value = str(value)
+
+            if operator == "==":
+                conditions.append(column == value)
+            elif operator == "!=":
+                conditions.append(or_(column != value, column.is_(None)))
+            elif operator in ("<", "<=", ">", ">="):
+                compare = {
+                    "<": column.__lt__,
+                    "<=": column.__le__,
+                    ">": column.__gt__,
+                    ">=": column.__ge__,
+                }[operator]
+                conditions.append(and_(compare(value), column != ""))
+            else:
+                raise ValueError(f"Invalid filter operator {operator}")
+        return conditions
+
+    def check_page_filters(self, model: Any, filters=()) -> None:
+        """Check the filters of a page query without running it
+
+        Args:
+            model (Any): SQL Model
+            filters (Iterable[tuple], optional): (column, operator, value)
+                predicates. Defaults to ().
+
+        Raises:
+            ValueError: Return invalid column name, operator or value
+        """
+        self._page_conditions(self._get_model(model), [], filters=filters)
 
+    def count_page_rows(
+        self, model: Any, columns: List[str], search: str = "", filters=()
+    ) -> int:
+        """Count the records matching a page query
+
+        Args:
+            model (Any): SQL Model
+            columns (List[str]): column names searched for text
+            search (str, optional): text contained in any column. Defaults to "".
+            filters (Iterable[tuple], optional): (column, operator, value)
+                predicates. Defaults to ().
+
+        Returns:
+            int: number of records
+        """
+        model = self._get_model(model)
+        stmt = select(func.count(model.id))
+        conditions = self._page_conditions(model, columns, search, filters)
+        if conditions:
+            stmt = stmt.where(and_(*conditions))
+        with self.session_scope() as session:
+            return session.exec(stmt).one()
+
+    def get_page(
+        self,
+        model: Any,
+        columns: List[str],
+        offset: int = 0,
+        limit: int = 100,
+        order_by: str | None = None,
+        descending: bool = False,
+        search: str = "",
+        filters=(),
+        after_id: int | None = None,
+    ) -> List[tuple]:
+        """Get one page of column values
+
+        Rows are ordered by order_by and then by id. Without order_by the
+        page after a known one is read by keyset (`id > after_id`, or
+        `id < after_id` when descending) instead of skipping offset rows.
+
+        Args:
+            model (Any): SQL Model
+            columns (List[str]): column names
+            offset (int, optional): rows to skip. Defaults to 0.
+            limit (int, optional): rows of the page. Defaults to 100.
+            order_by (str | None, optional): sort column. Defaults to None.
+            descending (bool, optional): sort descending. Defaults to False.
+            search (str, optional): text contained in any column. Defaults to "".
+            filters (Iterable[tuple], optional): (column, operator, value)
+                predicates. Defaults to ().
+            after_id (int | None, optional): keyset, last id of the previous
+                page (offset is ignored, requires order_by None). Defaults to None.
+
+        Raises:
+            ValueError: Return invalid column name
+
+        Returns:
+            List[tuple]: rows (tuples of column values)
+        """
+        model = self._get_model(model)
+        for c in columns:
+            if not hasattr(model, c):
+                raise ValueError(f"Invalid column name {c}")
+        stmt = select(*[getattr(model, c) for c in columns])
+        conditions = self._page_conditions(model, columns, search, filters)
+        if order_by is not None:
+            if not hasattr(model, order_by):
+                raise ValueError(f"Invalid column name {order_by}")
+            column = getattr(model, order_by)
+            stmt = stmt.order_by(column.desc() if descending else column.asc())
+        elif after_id is not None:
+            conditions.append(
+                model.id < after_id if descending else model.id > after_id
+            )
+            offset = 0
+        stmt = stmt.order_by(model.id.desc() if descending else model.id)
+        if conditions:
+            stmt = stmt.where(and_(*conditions))
+        stmt = stmt.offset(offset).limit(limit)
+        with self.session_scope() as session:
+            return [tuple(row) for row in session.execute(stmt).all()]
+
+    @metrics.timed("db.add")
     def add(self, model: Any, record: Any) -> Optional[SQLModel]:
         """Add record for model
 
@@ -201,15 +724,10 @@ class Repository:
         Returns:
             Optional[SQLModel]: SQL Model record added | None
         """
-        self._set_model(model)
-        try:
-            self.session.add(record)
-            self.session.commit()
-            self.session.refresh(record)
+        with self.session_scope(write=True) as session:
+            session.add(record)
+            session.flush()
             return record
-        except Exception as e:
-            self.session.rollback()
-            raise e
 
     def delete_table(self, model) -> None:
         """Delete model table
@@ -220,17 +738,12 @@ class Repository:
         Raises:
             e: SQL Exception
         """
-        self._set_model(model)
-        try:
-            stmt = delete(self.model)
-            self.session.exec(stmt)
-            self.session.commit()
-            return
-        except Exception as e:
-            self.session.rollback()
-            raise e
+        model = self._get_model(model)
+        with self.session_scope(write=True) as session:
+            stmt = delete(model)
+            session.exec(stmt)
 
-    # Delete\
+    # Delete
     def delete(self, model: Any, ids: int | tuple[int]) -> bool:
         """Delete model item by id
 
@@ -244,28 +757,20 @@ class Repository:
         Returns:
             bool: Return success action
         """
-        self._set_model(model=model)
-        if isinstance(ids, list):
-            for _id in ids:
-                record = self.get_by_id(model=model, id=_id)
-                try:
-                    self.session.delete(instance=record)
-                    self.session.commit()
-                except Exception as e:
-                    self.session.rollback()
-                    raise e
-            return True
-        else:
-            record = self.get_by_id(model=model, id=int(ids))
-            if record is not None:
-                try:
-                    self.session.delete(record)
-                    self.session.commit()
+        model = self._get_model(model)
+        with self.session_scope(write=True) as session:
+            if isinstance(ids, list):
+                for _id in ids:
+                    record = session.get(model, int(_id))
+                    if record is not None:
+                        session.delete(record)
+                return True
+            else:
+                record = session.get(model, int(ids))
+                if record is not None:
+                    session.delete(record)
                     return True
-                except Exception as e:
-                    self.session.rollback()
-                    raise e
-            return False
+                return False
 
     # Delete all item by filter
     def delete_bulk(self, model: Any, **filters) -> int:
@@ -280,17 +785,13 @@ class Repository:
         Returns:
             int: number of deleted record
         """
-        self._set_model(model)
-        try:
-            stmt = self._construct_list_stmt(**filters)
-            result = self.session.exec(stmt).all()
+        model = self._get_model(model)
+        with self.session_scope(write=True) as session:
+            stmt = self._construct_list_stmt(model, **filters)
+            result = session.exec(stmt, params=self._params(**filters)).all()
             for record in result:
-                self.session.delete(record)
-                self.session.commit()
+                session.delete(record)
             return len(result)
-        except Exception as e:
-            self.session.rollback()
-            raise e
 
     def update(self, model: Any, record: Any) -> SQLModel:
         """Update record model
@@ -305,16 +806,12 @@ class Repository:
         Returns:
             SQLModel: updated record
         """
-        self._set_model(model)
-        try:
-            self.session.add(record)
-            self.session.commit()
-            self.session.refresh(record)
+        with self.session_scope(write=True) as session:
+            session.add(record)
+            session.flush()
             return record
-        except Exception as e:
-            self.session.rollback()
-            raise e
 
+    @metrics.timed("db.upsert")
     def upsert(
         self, model: Any, record: Any, columns: str | List[str]
     ) -> Union[SQLModel, bool]:
@@ -328,37 +825,34 @@ class Repository:
         Returns:
             Union[SQLModel, bool]: insert or updated record | True if updated or False if inserted
         """
-        self._set_model(model)
+        model = self._get_model(model)
         if isinstance(columns, str):
             columns = [columns]
 
-        try:
-            # get specified model
+        with self.session_scope(write=True) as session:
             # get obj columns and designate matches
-            match_on = [getattr(self.model, col) == record.get(col) for col in columns]
+            match_on = {col: record.get(col) for col in columns}
 
-            # reduce clauses into statement
-            statement = select(self.model).where(and_(*match_on))
+            # cached statement for the match columns
+            statement = self._construct_list_stmt(model, **match_on)
 
             # check for existing record
-            upsert_record = self.session.exec(statement).first()
+            upsert_record = session.exec(
+                statement, params=self._params(**match_on)
+            ).first()
 
             # prepare the record
             if upsert_record:
                 _ = [setattr(upsert_record, key, record[key]) for key in record]
                 is_updated = True
             else:
-                upsert_record = self.model(**record)
+                upsert_record = model(**record)
                 is_updated = False
 
             # add to the session
-            self.session.add(upsert_record)
-            self.session.commit()
-            self.session.refresh(upsert_record)
+            session.add(upsert_record)
+            session.flush()
             return upsert_record, is_updated
-        except Exception as e:
-            self.session.rollback()
-            raise e
 
     def get_years_from_invoices(self) -> List[int]:
         """Get list of distinct years (int) from Invoices table
@@ -366,9 +860,11 @@ class Repository:
         Returns:
             List[int]: list of distinct years
         """
-        stmt = select(distinct(Invoice.year)).order_by(desc(Invoice.year))
-        return self.session.exec(stmt).all()
+        with self.session_scope() as session:
+            stmt = select(distinct(Invoice.year)).order_by(desc(Invoice.year))
+            return session.exec(stmt).all()
 
+    @metrics.timed("db.export_query")
     def get_data_for_dat(self, year: int, limit: int | None = None) -> List:
         """Get data for DAT export
 
@@ -408,4 +904,845 @@ class Repository:
         if limit is not None:
             stmt = stmt.limit(limit)
 
-        return self.session.exec(stmt).all()
+        with self.session_scope() as session:
+            return session.exec(stmt).all()
+
+    def get_invoice_totals(self, year: int | None = None) -> List:
+        """Get invoice count and amount sums grouped by year
+
+        Args:
+            year (int | None, optional): year or all years. Defaults to None.
+
+        Returns:
+            List: list of (year, invoices, taxable_amount, vat_amount,
+                inps_amount, rit_amount, total_amount) ordered by year desc
+        """
+        stmt = select(
+            Invoice.year,
+            func.count(Invoice.id).label("invoices"),
+            func.coalesce(func.sum(Invoice.taxable_amount), 0).label("taxable_amount"),
+            func.coalesce(func.sum(Invoice.vat_amount), 0).label("vat_amount"),
+            func.coalesce(func.sum(Invoice.inps_amount), 0).label("inps_amount"),
+            func.coalesce(func.sum(Invoice.rit_amount), 0).label("rit_amount"),
+            func.coalesce(func.sum(Invoice.total_amount), 0).label("total_amount"),
+        )
+        if year is not None:
+            stmt = stmt.where(Invoice.year == year)
+        stmt = stmt.group_by(Invoice.year).order_by(desc(Invoice.year))
+
+        with self.session_scope() as session:
+            return session.exec(stmt).all()
+
+    def get_distributor_count(self) -> int:
+        """Get number of distributors
+
+        Returns:
+            int: number of distributors
+        """
+        stmt = select(func.count(Distributor.id))
+        with self.session_scope() as session:
+            return session.exec(stmt).one()
+
+    def get_top_distributors(self, year: int | None = None, limit: int = 10) -> List:
+        """Get distributors with the highest invoice total amount
+
+        Args:
+            year (int | None, optional): year or all years. Defaults to None.
+            limit (int, optional): number of distributors. Defaults to 10.
+
+        Returns:
+            List: list of (id, number, last_name, name, invoices, total_amount)
+        """
+        stmt = select(
+            Distributor.id,
+            Distributor.number,
+            Distributor.last_name,
+            Distributor.name,
+            func.count(Invoice.id).label("invoices"),
+            func.coalesce(func.sum(Invoice.total_amount), 0).label("total_amount"),
+        ).where(Distributor.id == Invoice.distributor_id)
+        if year is not None:
+            stmt = stmt.where(Invoice.year == year)
+        stmt = (
+            stmt.group_by(Distributor.id)
+            .order_by(desc("total_amount"), Distributor.number)
+            .limit(limit)
+        )
+
+        with self.session_scope() as session:
+            return session.exec(stmt).all()
+
+    def get_distributors_without_invoices_count(self, year: int | None = None) -> int:
+        """Get number of distributors without invoices
+
+        Args:
+            year (int | None, optional): year or all years. Defaults to None.
+
+        Returns:
+            int: number of distributors without invoices
+        """
+        condition = Invoice.distributor_id == Distributor.id
+        if year is not None:
+            condition = and_(condition, Invoice.year == year)
+        stmt = select(func.count(Distributor.id)).where(
+            ~exists().where(condition)
+        )
+
+        with self.session_scope() as session:
+            return session.exec(stmt).one()
+
+    def ensure_invoice_natural_key(self, unique: bool = False) -> bool:
+        """Create the index on (number, year, distributor_number), unique or
+        not (an existing unique index is dropped when not unique)
+
+        Args:
+            unique (bool, optional): create the unique index. Defaults to False.
+
+        Returns:
+            bool: True if the unique index exists (False while the table
+                contains duplicated invoices)
+        """
+        with self.session_scope(write=True) as session:
+            return migrations.create_invoice_natural_key(
+                session.connection(), unique=unique
+            )
+
+    @metrics.timed("db.insert_invoices")
+    def insert_invoices_bulk(
+        self, records: List[dict], duplicates: str = DUPLICATE_SKIP
+    ) -> tuple[int, int, int, List[tuple[int, str, str]]]:
+        """Insert a batch of invoices with set-based duplicate detection
+
+        The batch is loaded into a temporary staging table; distributor
+        resolution and the duplicate checks on the natural key are joins
+        against the indexed invoices table instead of per-row lookups.
+
+        Args:
+            records (List[dict]): invoice records (model columns without id)
+            duplicates (str, optional): duplicate mode, one of DUPLICATE_MODES.
+                Defaults to DUPLICATE_SKIP.
+
+        Raises:
+            ValueError: duplicate mode unknown
+
+        Returns:
+            tuple[int, int, int, List[tuple[int, str, str]]]: inserted, replaced,
+                skipped and rejected (record index, error code, message)
+        """
+        if duplicates not in DUPLICATE_MODES:
+            msg = f"Duplicate mode unknown: {duplicates=}"
+            raise ValueError(msg)
+        if not records:
+            return 0, 0, 0, []
+
+        now = datetime.now()
+        rows = [
+            dict(record, **{INVOICE_STAGE_ROW: index, "created_at": now, "updated_at": now})
+            for index, record in enumerate(records)
+        ]
+        with self.session_scope(write=True) as session:
+            connection = session.connection()
+            INVOICE_STAGE.create(bind=connection, checkfirst=True)
+            connection.execute(INVOICE_STAGE.delete())
+            connection.execute(INVOICE_STAGE.insert(), rows)
+            return self._merge_invoice_stage(connection, duplicates)
+
+    def _merge_invoice_stage(
+        self, connection: Any, duplicates: str
+    ) -> tuple[int, int, int, List[tuple[int, str, str]]]:
+        """Merge the rows of the temporary invoice stage into the invoices
+        table and empty the stage (see insert_invoices_bulk)
+
+        Args:
+            connection (Any): connection of the write scope
+            duplicates (str): duplicate mode, one of DUPLICATE_MODES
+
+        Returns:
+            tuple[int, int, int, List[tuple[int, str, str]]]: inserted, replaced,
+                skipped and rejected (stage row, error code, message)
+        """
+        stage = INVOICE_STAGE.name
+        table = Invoice.__tablename__
+        columns = ", ".join(
+            column.name
+            for column in INVOICE_STAGE.columns
+            if column.name != INVOICE_STAGE_ROW
+        )
+        same_key = " AND ".join(
+            f"{{0}}.{column} IS {{1}}.{column}"
+            for column in migrations.INVOICE_KEY_COLUMNS
+        )
+        rejects: List[tuple[int, str, str]] = []
+        replaced = skipped = 0
+        if duplicates == DUPLICATE_KEEP and migrations.invoice_natural_key_is_unique(
+            connection
+        ):
+            # The unique index does not store repeated keys
+            duplicates = DUPLICATE_REPORT
+
+        # Distributor resolution
+        connection.execute(
+            text(
+                f"UPDATE {stage} SET distributor_id = (SELECT d.id FROM"
+                f" {Distributor.__tablename__} d"
+                f" WHERE d.number = {stage}.distributor_number)"
+            )
+        )
+        missing = connection.execute(
+            text(
+                f"SELECT {INVOICE_STAGE_ROW}, distributor_number FROM {stage}"
+                " WHERE distributor_id IS NULL"
+            )
+        ).all()
+        rejects.extend(
+            (
+                row,
+                REJECT_NO_DISTRIBUTOR,
+                f"No Distributor found with number={number!r}",
+            )
+            for row, number in missing
+        )
+        connection.execute(text(f"DELETE FROM {stage} WHERE distributor_id IS NULL"))
+
+        # Duplicates inside the batch: replace keeps the last row (the
+        # superseded ones are skipped), skip and report keep the first one
+        operator = ">" if duplicates == DUPLICATE_REPLACE else "<"
+        in_batch = (
+            f"EXISTS (SELECT 1 FROM {stage} o WHERE"
+            f" {same_key.format('o', stage)}"
+            f" AND o.{INVOICE_STAGE_ROW} {operator} {stage}.{INVOICE_STAGE_ROW})"
+        )
+        # Duplicates against the invoices table (natural key index)
+        in_table = (
+            f"EXISTS (SELECT 1 FROM {table} i WHERE {same_key.format('i', stage)})"
+        )
+        condition = in_batch
+        if duplicates != DUPLICATE_REPLACE:
+            condition = f"{in_batch} OR {in_table}"
+        found = []
+        if duplicates != DUPLICATE_KEEP:
+            found = connection.execute(
+                text(f"SELECT {INVOICE_STAGE_ROW} FROM {stage} WHERE {condition}")
+            ).scalars().all()
+            connection.execute(text(f"DELETE FROM {stage} WHERE {condition}"))
+
+        if duplicates == DUPLICATE_REPORT:
+            rejects.extend(
+                (row, REJECT_DUPLICATE, "Duplicate invoice") for row in found
+            )
+        else:
+            skipped = len(found)
+        if duplicates == DUPLICATE_REPLACE:
+            # Keys are unique in the stage now; count the keys matched in the
+            # table, not the deleted rows (without the unique index the table
+            # may hold more than one row per key)
+            replaced = connection.execute(
+                text(f"SELECT count(*) FROM {stage} WHERE {in_table}")
+            ).scalar_one()
+            in_stage = (
+                f"EXISTS (SELECT 1 FROM {stage} WHERE {same_key.format(stage, table)})"
+            )
+            connection.execute(text(f"DELETE FROM {table} WHERE {in_stage}"))
+
+        result = connection.execute(
+            text(
+                f"INSERT INTO {table} ({columns})"
+                f" SELECT {columns} FROM {stage} ORDER BY {INVOICE_STAGE_ROW}"
+            )
+        )
+        inserted = result.rowcount - replaced
+        connection.execute(INVOICE_STAGE.delete())
+
+        rejects.sort()
+        return inserted, replaced, skipped, rejects
+
+    def stage_rows(
+        self,
+        model: Any,
+        import_run_id: int,
+        rows: List[dict],
+        first_row: int = 0,
+        cache_size: int | None = None,
+    ) -> int:
+        """Load a chunk of source rows into the staging table of a model;
+        inside a write scope they are committed with the rest of the unit of
+        work (checkpoint of the chunk)
+
+        Args:
+            model (Any): SQL model (Distributor or Invoice)
+            import_run_id (int): import run id
+            rows (List[dict]): normalized rows (model columns)
+            first_row (int, optional): source row of the first row. Defaults to 0.
+            cache_size (int | None, optional): page cache in KiB. Defaults to None.
+
+        Returns:
+            int: rows staged
+        """
+        if not rows:
+            return 0
+        table = migrations.IMPORT_STAGE_TABLES[model]
+        names = [column.name for column in table.columns][2:]
+        # The values are bound as they are (no type processing): a value of
+        # the wrong type is kept for the checks of the merge
+        values = [
+            (
+                import_run_id,
+                first_row + index,
+                *(
+                    value.isoformat() if isinstance(value, date) else value
+                    for value in (row.get(name) for name in names)
+                ),
+            )
+            for index, row in enumerate(rows)
+        ]
+        stmt = (
+            f"INSERT INTO {table.name}"
+            f" ({migrations.IMPORT_STAGE_RUN}, {migrations.IMPORT_STAGE_ROW},"
+            f" {', '.join(names)}) VALUES ({', '.join('?' * (len(names) + 2))})"
+        )
+        with self.session_scope(write=True) as session:
+            connection = session.connection()
+            with _cache_size(connection, cache_size):
+                connection.exec_driver_sql(stmt, values)
+        return len(values)
+
+    def count_staged_rows(self, model: Any, import_run_id: int) -> int:
+        """Count the staged rows of an import run not merged yet
+
+        Args:
+            model (Any): SQL model (Distributor or Invoice)
+            import_run_id (int): import run id
+
+        Returns:
+            int: staged rows
+        """
+        table = migrations.IMPORT_STAGE_TABLES[model]
+        stmt = select(func.count()).select_from(table).where(
+            table.c[migrations.IMPORT_STAGE_RUN] == import_run_id
+        )
+        with self.session_scope() as session:
+            return session.execute(stmt).scalar_one()
+
+    def _staged_batch(
+        self, connection: Any, table: Table, import_run_id: int, limit: int
+    ) -> int | None:
+        """Last source row of the next batch of staged rows
+
+        Returns:
+            int | None: last row of the batch, None if nothing is staged
+        """
+        run = migrations.IMPORT_STAGE_RUN
+        row = migrations.IMPORT_STAGE_ROW
+        return connection.execute(
+            text(
+                f"SELECT MAX({row}) FROM (SELECT {row} FROM {table.name}"
+                f" WHERE {run} = :run ORDER BY {row} LIMIT :limit)"
+            ),
+            {"run": import_run_id, "limit": limit},
+        ).scalar()
+
+    def _staged_records(
+        self,
+        connection: Any,
+        table: Table,
+        condition: str,
+        params: dict,
+        rows: List[int] | None = None,
+    ) -> dict[int, dict]:
+        """Staged rows as source records (model columns) by source row
+
+        Args:
+            connection (Any): connection of the scope
+            table (Table): staging table
+            condition (str): where clause
+            params (dict): where clause parameters
+            rows (List[int] | None, optional): only these source rows.
+                Defaults to None.
+
+        Returns:
+            dict[int, dict]: records by source row
+        """
+        stmt = text(f"SELECT * FROM {table.name} WHERE {condition}")
+        if rows is not None:
+            stmt = text(
+                f"SELECT * FROM {table.name} WHERE {condition}"
+                f" AND {migrations.IMPORT_STAGE_ROW} IN :rows"
+            ).bindparams(bindparam("rows", expanding=True))
+            params = dict(params, rows=rows)
+        result = connection.execute(stmt, params)
+        records = {}
+        for mapping in result.mappings():
+            record = dict(mapping)
+            record.pop(migrations.IMPORT_STAGE_RUN)
+            records[record.pop(migrations.IMPORT_STAGE_ROW)] = record
+        return records
+
+    @metrics.timed("db.merge_staged")
+    def merge_staged_rows(
+        self,
+        model: Any,
+        import_run_id: int,
+        duplicates: str = DUPLICATE_SKIP,
+        limit: int = 1000,
+        cache_size: int | None = None,
+    ) -> tuple[int, int, int, int, List[tuple[dict, str, str, str]]]:
+        """Validate and merge the next batch of staged rows of an import run
+        into the model table, then remove them from the stage; inside a
+        write scope the batch is committed with the rest of the unit of work
+
+        The checks, the distributor resolution, the duplicate detection and
+        the merge are SQL statements over the staging table: only the
+        rejected rows are read back.
+
+        Args:
+            model (Any): SQL model (Distributor or Invoice)
+            import_run_id (int): import run id
+            duplicates (str, optional): duplicate invoice mode, one of
+                DUPLICATE_MODES. Defaults to DUPLICATE_SKIP.
+            limit (int, optional): staged rows per batch. Defaults to 1000.
+            cache_size (int | None, optional): page cache in KiB. Defaults to None.
+
+        Raises:
+            ValueError: duplicate mode unknown
+
+        Returns:
+            tuple[int, int, int, int, List[tuple[dict, str, str, str]]]: rows
+                of the batch (0 when nothing is staged), inserted, updated,
+                skipped and rejected (record, stage, error code, message)
+        """
+        if duplicates not in DUPLICATE_MODES:
+            msg = f"Duplicate mode unknown: {duplicates=}"
+            raise ValueError(msg)
+        table = migrations.IMPORT_STAGE_TABLES[model]
+        run = migrations.IMPORT_STAGE_RUN
+        row = migrations.IMPORT_STAGE_ROW
+        with self.session_scope(write=True) as session:
+            connection = session.connection()
+            with _cache_size(connection, cache_size):
+                last = self._staged_batch(connection, table, import_run_id, limit)
+                if last is None:
+                    return 0, 0, 0, 0, []
+                params = {"run": import_run_id, "last": last}
+                batch = f"{run} = :run AND {row} <= :last"
+                size = connection.execute(
+                    text(f"SELECT COUNT(*) FROM {table.name} WHERE {batch}"), params
+                ).scalar()
+
+                if model is Invoice:
+                    # Normalization: strings are stripped like by the model
+                    strings = [
+                        column.name
+                        for column in table.columns
+                        if isinstance(_column_type(column), String)
+                    ]
+                    connection.execute(
+                        text(
+                            f"UPDATE {table.name} SET "
+                            + ", ".join(f"{name} = trim({name})" for name in strings)
+                            + f" WHERE {batch}"
+                        ),
+                        params,
+                    )
+
+                # Validation
+                rejects = []
+                checks = IMPORT_STAGE_CHECKS[model]
+                if checks:
+                    invalid = " OR ".join(f"({condition})" for condition, _ in checks)
+                    message = " || ".join(
+                        "CASE WHEN {} THEN '{}; ' ELSE '' END".format(
+                            condition, error.replace("'", "''")
+                        )
+                        for condition, error in checks
+                    )
+                    errors = dict(
+                        connection.execute(
+                            text(
+                                f"SELECT {row}, {message} FROM {table.name}"
+                                f" WHERE {batch} AND ({invalid})"
+                            ),
+                            params,
+                        ).all()
+                    )
+                    if errors:
+                        records = self._staged_records(
+                            connection, table, f"{batch} AND ({invalid})", params
+                        )
+                        rejects.extend(
+                            (
+                                records[index],
+                                REJECT_STAGE_VALIDATE,
+                                REJECT_INVALID,
+                                errors[index].rstrip("; "),
+                            )
+                            for index in sorted(errors)
+                        )
+                        connection.execute(
+                            text(
+                                f"DELETE FROM {table.name}"
+                                f" WHERE {batch} AND ({invalid})"
+                            ),
+                            params,
+                        )
+
+                # Merge
+                now = {"now": datetime.now()}
+                if model is Invoice:
+                    inserted, updated, skipped, invalid_rows = (
+                        self._merge_staged_invoices(
+                            connection, table, batch, dict(params, **now), duplicates
+                        )
+                    )
+                else:
+                    inserted, updated, skipped, invalid_rows = (
+                        self._merge_staged_distributors(
+                            connection, table, batch, dict(params, **now)
+                        )
+                    )
+                if invalid_rows:
+                    records = self._staged_records(
+                        connection,
+                        table,
+                        batch,
+                        params,
+                        rows=[index for index, _, _ in invalid_rows],
+                    )
+                    rejects.extend(
+                        (records[index], REJECT_STAGE_WRITE, code, message)
+                        for index, code, message in invalid_rows
+                    )
+                connection.execute(
+                    text(f"DELETE FROM {table.name} WHERE {batch}"), params
+                )
+        return size, inserted, updated, skipped, rejects
+
+    def _merge_staged_invoices(
+        self, connection: Any, table: Table, batch: str, params: dict, duplicates: str
+    ) -> tuple[int, int, int, List[tuple[int, str, str]]]:
+        """Merge a batch of staged invoices through the temporary invoice
+        stage (see insert_invoices_bulk)
+
+        Returns:
+            tuple[int, int, int, List[tuple[int, str, str]]]: inserted, replaced,
+                skipped and rejected (source row, error code, message)
+        """
+        keys = (migrations.IMPORT_STAGE_RUN, migrations.IMPORT_STAGE_ROW)
+        columns = ", ".join(
+            column.name for column in table.columns if column.name not in keys
+        )
+        INVOICE_STAGE.create(bind=connection, checkfirst=True)
+        connection.execute(INVOICE_STAGE.delete())
+        connection.execute(
+            text(
+                f"INSERT INTO {INVOICE_STAGE.name}"
+                f" ({INVOICE_STAGE_ROW}, {columns}, created_at, updated_at)"
+                f" SELECT {migrations.IMPORT_STAGE_ROW}, {columns}, :now, :now"
+                f" FROM {table.name} WHERE {batch}"
+            ).bindparams(bindparam("now", type_=DateTime())),
+            params,
+        )
+        return self._merge_invoice_stage(connection, duplicates)
+
+    def _merge_staged_distributors(
+        self, connection: Any, table: Table, batch: str, params: dict
+    ) -> tuple[int, int, int, List[tuple[int, str, str]]]:
+        """Upsert a batch of staged distributors by number, the last row of a
+        number wins like in the row by row import
+
+        Returns:
+            tuple[int, int, int, List[tuple[int, str, str]]]: inserted, updated,
+                skipped (always 0) and rejected (always empty)
+        """
+        stage = table.name
+        target = Distributor.__tablename__
+        run = migrations.IMPORT_STAGE_RUN
+        row = migrations.IMPORT_STAGE_ROW
+        names = [
+            column.name for column in table.columns if column.name not in (run, row)
+        ]
+        columns = ", ".join(names)
+
+        # Rows of a number repeated in the batch: the row import upserts
+        # them one after the other, the earlier ones count as updates
+        later = (
+            f"EXISTS (SELECT 1 FROM {stage} o WHERE o.{run} = {stage}.{run}"
+            f" AND o.number = {stage}.number AND o.{row} > {stage}.{row}"
+            f" AND o.{row} <= :last)"
+        )
+        superseded = connection.execute(
+            text(f"DELETE FROM {stage} WHERE {batch} AND {later}"), params
+        ).rowcount
+
+        now = bindparam("now", type_=DateTime())
+        updated = connection.execute(
+            text(
+                f"UPDATE {target} SET ({columns}) = (SELECT {columns} FROM {stage} s"
+                f" WHERE s.{run} = :run AND s.{row} <= :last"
+                f" AND s.number = {target}.number), updated_at = :now"
+                f" WHERE number IN (SELECT number FROM {stage} WHERE {batch})"
+            ).bindparams(now),
+            params,
+        ).rowcount
+        inserted = connection.execute(
+            text(
+                f"INSERT INTO {target} ({columns}, created_at, updated_at)"
+                f" SELECT {columns}, :now, :now FROM {stage} WHERE {batch}"
+                f" AND NOT EXISTS (SELECT 1 FROM {target} d"
+                f" WHERE d.number = {stage}.number) ORDER BY {row}"
+            ).bindparams(now),
+            params,
+        ).rowcount
+        return inserted, superseded + updated, 0, []
+
+    def reject_staged_rows(
+        self, model: Any, import_run_id: int, limit: int = 1000
+    ) -> List[dict]:
+        """Remove the next batch of staged rows of an import run, when its
+        merge failed; inside a write scope they are removed with the rest of
+        the unit of work (rejects and checkpoint)
+
+        Args:
+            model (Any): SQL model (Distributor or Invoice)
+            import_run_id (int): import run id
+            limit (int, optional): staged rows per batch. Defaults to 1000.
+
+        Returns:
+            List[dict]: source records of the batch
+        """
+        table = migrations.IMPORT_STAGE_TABLES[model]
+        with self.session_scope(write=True) as session:
+            connection = session.connection()
+            last = self._staged_batch(connection, table, import_run_id, limit)
+            if last is None:
+                return []
+            params = {"run": import_run_id, "last": last}
+            batch = (
+                f"{migrations.IMPORT_STAGE_RUN} = :run"
+                f" AND {migrations.IMPORT_STAGE_ROW} <= :last"
+            )
+            records = self._staged_records(connection, table, batch, params)
+            connection.execute(text(f"DELETE FROM {table.name} WHERE {batch}"), params)
+        return [records[index] for index in sorted(records)]
+
+    def delete_staged_rows(self, import_run_id: int) -> int:
+        """Delete the staged rows of an import run (abandoned run)
+
+        Args:
+            import_run_id (int): import run id
+
+        Returns:
+            int: rows deleted
+        """
+        deleted = 0
+        with self.session_scope(write=True) as session:
+            for table in migrations.IMPORT_STAGE_TABLES.values():
+                result = session.connection().execute(
+                    table.delete().where(
+                        table.c[migrations.IMPORT_STAGE_RUN] == import_run_id
+                    )
+                )
+                deleted += result.rowcount
+        return deleted
+
+    def get_resumable_import_run(
+        self, file_hash: str, import_type: str
+    ) -> Optional[ImportRun]:
+        """Get the last interrupted run of an import
+
+        Args:
+            file_hash (str): source file SHA-256
+            import_type (str): import type (model name)
+
+        Returns:
+            Optional[ImportRun]: import run | None
+        """
+        with self.session_scope() as session:
+            stmt = (
+                select(ImportRun)
+                .where(
+                    ImportRun.file_hash == file_hash,
+                    ImportRun.import_type == import_type,
+                    ImportRun.status.in_(IMPORT_RESUMABLE),
+                )
+                .order_by(desc(ImportRun.id))
+                .limit(1)
+            )
+            return session.exec(stmt).first()
+
+    def update_import_run(self, id: int, **values) -> None:
+        """Update an import run; inside a write scope the update is committed
+        with the rest of the unit of work (checkpoint of a chunk)
+
+        Args:
+            id (int): import run id
+            values: columns to update
+        """
+        values["updated_at"] = datetime.now()
+        with self.session_scope(write=True) as session:
+            session.exec(
+                ImportRun.__table__.update()
+                .where(ImportRun.__table__.c.id == id)
+                .values(**values)
+            )
+
+    def list_import_runs(self, with_rejects: bool = False) -> List[ImportRun]:
+        """List the import runs, the last first
+
+        Args:
+            with_rejects (bool, optional): only the runs with rejects. Defaults to False.
+
+        Returns:
+            List[ImportRun]: import runs
+        """
+        with self.session_scope() as session:
+            stmt = select(ImportRun).order_by(desc(ImportRun.id))
+            if with_rejects:
+                stmt = stmt.where(
+                    exists().where(ImportReject.import_run_id == ImportRun.id)
+                )
+            return session.exec(stmt).all()
+
+    def add_import_rejects(self, rows: List[dict]) -> int:
+        """Bulk insert import rejects; inside a write scope they are committed
+        with the rest of the unit of work (chunk and checkpoint)
+
+        Args:
+            rows (List[dict]): rejects (model columns without id)
+
+        Returns:
+            int: rejects inserted
+        """
+        if not rows:
+            return 0
+        now = datetime.now()
+        rows = [dict(row, created_at=now, updated_at=now) for row in rows]
+        with self.session_scope(write=True) as session:
+            session.connection().execute(ImportReject.__table__.insert(), rows)
+        return len(rows)
+
+    def _reject_conditions(
+        self, import_run_id: int, search: str | None = None, **filters
+    ) -> list:
+        """Where conditions of the import rejects queries
+
+        Args:
+            import_run_id (int): import run id
+            search (str | None, optional): text in the row or the message. Defaults to None.
+            filters: stage, error_code, status (empty values are ignored)
+
+        Raises:
+            ValueError: filter unknown
+
+        Returns:
+            list: conditions
+        """
+        conditions = [ImportReject.import_run_id == import_run_id]
+        for key, value in filters.items():
+            if key not in REJECT_FILTERS:
+                msg = f"Import reject filter unknown: {key=}"
+                raise ValueError(msg)
+            if value:
+                conditions.append(getattr(ImportReject, key) == value)
+        if search:
+            pattern = f"%{search}%"
+            conditions.append(
+                or_(
+                    ImportReject.data.like(pattern),
+                    ImportReject.error_message.like(pattern),
+                )
+            )
+        return conditions
+
+    def list_import_rejects(
+        self,
+        import_run_id: int,
+        limit: int | None = None,
+        offset: int = 0,
+        search: str | None = None,
+        **filters,
+    ) -> List[ImportReject]:
+        """List the rejects of an import run
+
+        Args:
+            import_run_id (int): import run id
+            limit (int | None, optional): max rejects. Defaults to None.
+            offset (int, optional): rejects to skip. Defaults to 0.
+            search (str | None, optional): text in the row or the message. Defaults to None.
+            filters: stage, error_code, status
+
+        Returns:
+            List[ImportReject]: rejects, in import order
+        """
+        conditions = self._reject_conditions(import_run_id, search, **filters)
+        with self.session_scope() as session:
+            stmt = (
+                select(ImportReject)
+                .where(and_(*conditions))
+                .order_by(ImportReject.id)
+                .offset(offset)
+                .limit(limit)
+            )
+            return session.exec(stmt).all()
+
+    def count_import_rejects(
+        self, import_run_id: int, search: str | None = None, **filters
+    ) -> int:
+        """Count the rejects of an import run
+
+        Args:
+            import_run_id (int): import run id
+            search (str | None, optional): text in the row or the message. Defaults to None.
+            filters: stage, error_code, status
+
+        Returns:
+            int: rejects
+        """
+        conditions = self._reject_conditions(import_run_id, search, **filters)
+        with self.session_scope() as session:
+            stmt = select(func.count(ImportReject.id)).where(and_(*conditions))
+            return session.exec(stmt).one()
+
+    def get_import_reject_summary(self, import_run_id: int) -> List:
+        """Count the rejects of an import run by stage, error code and status
+
+        Args:
+            import_run_id (int): import run id
+
+        Returns:
+            List: rows (stage, error_code, status, rejects)
+        """
+        with self.session_scope() as session:
+            stmt = (
+                select(
+                    ImportReject.stage,
+                    ImportReject.error_code,
+                    ImportReject.status,
+                    func.count(ImportReject.id).label("rejects"),
+                )
+                .where(ImportReject.import_run_id == import_run_id)
+                .group_by(
+                    ImportReject.stage, ImportReject.error_code, ImportReject.status
+                )
+                .order_by(ImportReject.stage, ImportReject.error_code)
+            )
+            return session.exec(stmt).all()
+
+    def update_import_rejects(self, ids: List[int], **values) -> int:
+        """Update import rejects (status, data, error)
+
+        Args:
+            ids (List[int]): reject ids
+            values: columns to update
+
+        Returns:
+            int: rejects updated
+        """
+        if not ids:
+            return 0
+        values["updated_at"] = datetime.now()
+        table = ImportReject.__table__
+        with self.session_scope(write=True) as session:
+            result = session.connection().execute(
+                table.update().where(table.c.id.in_(ids)).values(**values)
+            )
+            return result.rowcount
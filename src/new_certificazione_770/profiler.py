@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+Startup profiler module
+
+Startup milestones and timed phases are always recorded (they cost a
+perf_counter call each). In profiling mode, enabled by the environment
+variable PROFILE_ENV_VAR or the command line flag PROFILE_CLI_FLAG, the
+module imports are timed too, like `python -X importtime`, and the report
+is appended as one JSON line to a file next to the log file, so that the
+startup of different releases can be compared.
+
+The module only depends on the standard library and config: it is
+imported before the other modules so that their import is measured.
+
+@File: profiler.py
+@Date: 2026-10-19
+"""
+
+# Built-in/Generic Imports
+import builtins
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Iterator, List
+
+# Own modules
+try:
+    import config as config
+except:  # noqa: E722
+    import new_certificazione_770.config as config
+
+# Constants
+PROFILE_ENV_VAR = "NEW_CERTIFICAZIONE_770_PROFILE"
+PROFILE_CLI_FLAG = "--profile-startup"
+PROFILE_ENV_VALUES = ("1", "true", "yes", "on")
+IMPORTS_TOP = 30  # slowest imports logged with the report
+
+
+class StartupProfiler:
+    """Startup profiler
+
+    The clock starts when the object is created. Milestones are sequential:
+    each one is a phase lasting since the previous milestone. Phases can
+    also be timed explicitly, and nested, with the `phase` context manager.
+    """
+
+    def __init__(self) -> None:
+        """Initialize profiler and start the clock"""
+        self.start_time = time.perf_counter()
+        self.enabled = False
+        self.phases: List[dict] = []
+        self.imports: List[dict] = []
+        self._last_mark = self.start_time
+        self._stack: List[list] = []  # [module, start, children time]
+        self._thread_id = threading.get_ident()
+        self._original_import = None
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the start of the profiler"""
+        return time.perf_counter() - self.start_time
+
+    def enable(self) -> None:
+        """Enable profiling mode, the following imports are timed"""
+        if self.enabled:
+            return
+        self.enabled = True
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._import
+
+    def disable(self) -> None:
+        """Stop timing the imports"""
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def mark(self, name: str) -> float:
+        """Record a milestone, the end of the phase since the previous one
+
+        Args:
+            name (str): phase name
+
+        Returns:
+            float: phase duration in seconds
+        """
+        now = time.perf_counter()
+        duration = now - self._last_mark
+        self._add_phase(name, self._last_mark, duration, nested=False)
+        self._last_mark = now
+        return duration
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a block of code
+
+        Args:
+            name (str): phase name
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add_phase(name, start, time.perf_counter() - start, nested=True)
+
+    def summary(self) -> str:
+        """One line summary of the milestones
+
+        Returns:
+            str: summary (e.g. "imports=0.80s window=0.40s total=1.20s")
+        """
+        phases = [
+            f"{phase['name']}={phase['duration']:.2f}s"
+            for phase in self.phases
+            if not phase["nested"]
+        ]
+        phases.append(f"total={self._last_mark - self.start_time:.2f}s")
+        return " ".join(phases)
+
+    def report(self) -> dict:
+        """Build the startup report
+
+        Returns:
+            dict: report
+        """
+        return {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "package": config.PACKAGE,
+            "version": config.VERSION,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "argv": sys.argv[1:],
+            "total": round(self._last_mark - self.start_time, 4),
+            "phases": self.phases,
+            "imports": self.imports,
+        }
+
+    def write_report(self, file_path: str) -> dict:
+        """Append the startup report to a JSON lines file
+
+        Args:
+            file_path (str): report file path
+
+        Returns:
+            dict: report
+        """
+        report = self.report()
+        with open(file_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(report, default=str) + "\n")
+        return report
+
+    def slowest_imports(self, top: int = IMPORTS_TOP) -> List[dict]:
+        """Imports with the highest self time
+
+        Args:
+            top (int, optional): number of imports. Defaults to IMPORTS_TOP.
+
+        Returns:
+            List[dict]: imports
+        """
+        return sorted(self.imports, key=lambda i: i["self_ms"], reverse=True)[:top]
+
+    def _add_phase(self, name: str, start: float, duration: float, nested: bool):
+        """Record a phase"""
+        self.phases.append(
+            {
+                "name": name,
+                "start": round(start - self.start_time, 4),
+                "duration": round(duration, 4),
+                "nested": nested,
+                "thread": threading.current_thread().name,
+            }
+        )
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        """builtins.__import__ timing the first import of the modules"""
+        original = self._original_import
+        if threading.get_ident() != self._thread_id or original is None:
+            return original(name, globals, locals, fromlist, level)
+
+        module = name
+        if level and globals:
+            package = globals.get("__package__") or ""
+            base = package.rsplit(".", level - 1)[0] if level > 1 else package
+            module = f"{base}.{name}" if name else base
+        if module in sys.modules:
+            return original(name, globals, locals, fromlist, level)
+
+        entry = [module, time.perf_counter(), 0.0]
+        self._stack.append(entry)
+        try:
+            return original(name, globals, locals, fromlist, level)
+        finally:
+            self._stack.pop()
+            cumulative = time.perf_counter() - entry[1]
+            if self._stack:
+                self._stack[-1][2] += cumulative
+            self.imports.append(
+                {
+                    "module": module,
+                    "self_ms": round((cumulative - entry[2]) * 1000, 2),
+                    "cumulative_ms": round(cumulative * 1000, 2),
+                    "depth": len(self._stack),
+                }
+            )
+
+
+def is_enabled(argv: List[str] | None = None) -> bool:
+    """Check whether profiling mode is requested
+
+    Args:
+        argv (List[str] | None, optional): command line. Defaults to sys.argv.
+
+    Returns:
+        bool: True if enabled by environment variable or command line flag
+    """
+    argv = sys.argv if argv is None else argv
+    value = os.environ.get(PROFILE_ENV_VAR, "").strip().lower()
+    return value in PROFILE_ENV_VALUES or PROFILE_CLI_FLAG in argv
+
+
+PROFILER = StartupProfiler()
+
+
+def start() -> StartupProfiler:
+    """Enable profiling mode when requested
+
+    Returns:
+        StartupProfiler: the application profiler
+    """
+    if is_enabled():
+        PROFILER.enable()
+    return PROFILER
+
+
+def mark(name: str) -> float:
+    """Record a milestone of the application profiler, see StartupProfiler.mark"""
+    return PROFILER.mark(name)
+
+
+def phase(name: str):
+    """Time a block of code with the application profiler, see StartupProfiler.phase"""
+    return PROFILER.phase(name)
@@ -2,21 +2,37 @@ from .about_dialog import AboutDialog
 from .company_dialog import CompanyDialog
 from .dialog import BaseDialog
 from .distributor_dialog import DistributorDialog
-from .export_dialogs import ExportDialog
-from .import_dialogs import ImportDialog
+from .rejects_dialog import RejectsDialog
 from .settings_dialog import SettingsDialog
 from .widgets import ScrolledFrame, TableColumn, TableRow, Tableview
 
 __all__ = [
-    AboutDialog,
-    BaseDialog,
-    CompanyDialog,
-    DistributorDialog,
-    ExportDialog,
-    ImportDialog,
-    SettingsDialog,
-    TableColumn,
-    TableRow,
-    Tableview,
-    ScrolledFrame,
+    "AboutDialog",
+    "BaseDialog",
+    "CompanyDialog",
+    "DistributorDialog",
+    "ExportDialog",
+    "ImportDialog",
+    "RejectsDialog",
+    "SettingsDialog",
+    "TableColumn",
+    "TableRow",
+    "Tableview",
+    "ScrolledFrame",
 ]
+
+
+def __getattr__(name: str):
+    """Import the export and import dialogs on first use
+
+    They load tkcalendar and pandas, which are not needed to browse the
+    distributors, so they are kept out of the application startup.
+    """
+    if name == "ExportDialog":
+        from .export_dialogs import ExportDialog as view
+    elif name == "ImportDialog":
+        from .import_dialogs import ImportDialog as view
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = view
+    return view
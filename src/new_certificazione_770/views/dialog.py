@@ -10,10 +10,11 @@ import tkinter.ttk as ttk
 from tkinter import messagebox
 from tkinter.simpledialog import Dialog
 
-# Modules
-from tkcalendar import DateEntry
-
 # Own modules
+try:
+    from controllers.progress import PROGRESS_INTERVAL
+except:  # noqa: E722
+    from new_certificazione_770.controllers.progress import PROGRESS_INTERVAL
 
 # Constants
 
@@ -87,6 +88,9 @@ class BaseDialog(Dialog):
                 _var = tk.StringVar(self, name=key)
                 _ent = ttk.Combobox(master=master, textvariable=_var, values=choices)
             elif field_type in ["date", "date-time", "date-time"]:
+                # tkcalendar is loaded by the first dialog with a date field
+                from tkcalendar import DateEntry
+
                 _var = tk.StringVar(self, name=key)
                 _ent = DateEntry(
                     master=master,
@@ -152,6 +156,47 @@ class BaseDialog(Dialog):
             else:
                 self.set_frame_state(child, state)
 
+    def watch_thread(self, thread, on_progress, on_finish) -> None:
+        """Drain the progress channel of a worker thread every
+        PROGRESS_INTERVAL ms until the worker is finished
+
+        Args:
+            thread (ResultThread | Job): worker with a progress channel
+            on_progress (Callable): called as on_progress(thread, state, events)
+                when the progress changed
+            on_finish (Callable): called as on_finish(thread) once the result
+                is available
+        """
+        state, events = thread.progress.drain()
+        if state is not None or events:
+            on_progress(thread, state, events)
+        if state is not None and state.finished:
+            thread.join()
+            on_finish(thread)
+            return
+        self.after(
+            ms=PROGRESS_INTERVAL,
+            func=lambda: self.watch_thread(thread, on_progress, on_finish),
+        )
+
+    def show_metrics(self, treeview, item: str, registry) -> None:
+        """Show the stage latencies of a metrics registry as children of a
+        treeview item, updated in place
+
+        Args:
+            treeview (ttk.Treeview): treeview with one values column
+            item (str): parent item
+            registry (MetricsRegistry): run metrics
+        """
+        for name, latency in registry.stage_latencies():
+            iid = f"{item}.{name}"
+            if treeview.exists(item=iid):
+                treeview.item(item=iid, values=(latency,))
+            else:
+                treeview.insert(
+                    parent=item, index="end", iid=iid, text=name, values=(latency,)
+                )
+
 
 def extract_field_metadata(property_info):
     """
@@ -15,11 +15,19 @@ from tkinter import filedialog, messagebox
 
 # Own modules
 try:
-    from controllers import Controller, ResultThread
+    import metrics
+    from controllers import Controller, Job, ProgressChannel, job_runner, progress
     from helpers import MSG_ERROR_TEMPLATE, MSG_SUCCESS_TEMPLATE, MSG_WARNING_TEMPLATE
     from models import DATFile
 except:
-    from new_certificazione_770.controllers import Controller, ResultThread
+    import new_certificazione_770.metrics as metrics
+    from new_certificazione_770.controllers import (
+        Controller,
+        Job,
+        ProgressChannel,
+        job_runner,
+        progress,
+    )
     from new_certificazione_770.helpers import (
         MSG_ERROR_TEMPLATE,
         MSG_SUCCESS_TEMPLATE,
@@ -371,9 +379,9 @@ class ExportDialog(BaseDialog):
         _action = f"Start thread {THREAD_EXPORT_DAT}"
         logging.debug(msg=_action)
         self._event = Event()
-        _thread = ResultThread(
-            name=THREAD_EXPORT_DAT,
-            target=thread_export_data,
+        # The worker reads the items from a Queue (not picklable): thread backend
+        _job = job_runner.get_runner(job_runner.BACKEND_THREAD).submit(
+            thread_export_data,
             args=(
                 export_folder,
                 export_code_ente_prev,
@@ -384,29 +392,47 @@ class ExportDialog(BaseDialog):
                 self._queue,
                 self._event,
             ),
+            name=THREAD_EXPORT_DAT,
+            metrics=metrics.MetricsRegistry(name=THREAD_EXPORT_DAT),
+            progress=ProgressChannel(total=total),
         )
-        _thread.start()
-        self.after(ms=200, func=lambda t=_thread: self.monitor_thread(thread=t))
-
-    def monitor_thread(self, thread: ResultThread) -> None:
-        if thread.is_alive():
-            if thread.name == THREAD_EXPORT_DAT:
-                _total = self._queue.maxsize
-                _ind = _total - self._queue.unfinished_tasks
-                self.setvar(
-                    name=VAR_MESSAGE,
-                    value=f"{THREAD_EXPORT_DAT} processing record {_ind} of {_total}...",
-                )
-                self.progress_bar.config(value=_ind)
-            self.after(ms=200, func=lambda: self.monitor_thread(thread=thread))
+        self.watch_thread(_job, self.show_progress, self.monitor_thread)
+
+    def show_progress(
+        self,
+        thread: Job,
+        state: progress.ProgressState | None,
+        events: list[progress.ProgressEvent],
+    ) -> None:
+        """Show the progress drained from the worker channel"""
+        if state is None or thread.name != THREAD_EXPORT_DAT:
             return
+        _rate = thread.metrics.rate("export.rows")
+        self.setvar(
+            name=VAR_MESSAGE,
+            value=(
+                f"{THREAD_EXPORT_DAT} processing record"
+                f" {state.done:,d} of {state.total:,d} ({_rate:,.0f} rows/s)..."
+            ),
+        )
+        self.progress_bar.config(value=state.done)
+        self.show_metrics(self.treeview, "export", thread.metrics)
 
+    def monitor_thread(self, thread: Job) -> None:
         _action = thread.name
         logging.debug(msg=f"Thread {_action} terminated")
+        if thread.metrics is not None:
+            logging.info(msg=thread.metrics.summary())
         self._event = None
 
         self.set_frame_state(self.label_frm, tk.NORMAL)
         self.action_btn.config(state=tk.NORMAL)
+        if thread.exception is not None:
+            # The job failed without a result tuple (e.g. worker process died)
+            self.setvar(name=VAR_MESSAGE, value=f"{_action}... Error!")
+            msg = MSG_ERROR_TEMPLATE.format(_action, repr(thread.exception))
+            messagebox.showerror(title=_action, message=msg, parent=self)
+            return
         if thread.name == THREAD_EXPORT_GUFANA:
             # TODO
             return
@@ -532,8 +558,11 @@ def thread_export_data(
             item = queue.get()
 
             _action = "Write record on CSV"
-            _dat_csv.write_record(data=item)
+            with metrics.timer("export.row"):
+                _dat_csv.write_record(data=item)
             _records += 1
+            metrics.count("export.rows")
+            progress.advance()
             queue.task_done()
 
         return (_exit, _msg, _records, (_dat_csv.file_name if _dat_csv else None))
@@ -4,40 +4,89 @@ Import Dialog
 """
 
 # Built-in/Generic Imports
-import csv
+import datetime
 import logging
 import os
-import tempfile
 import tkinter as tk
 from queue import Queue
 from threading import Event
 from tkinter import filedialog, messagebox, ttk
 from typing import Any
 
-# Libs
-import pandas
-
 # Own modules
 try:
-    from controllers import Controller, ResultThread
-    from helpers import MSG_ERROR_TEMPLATE, MSG_SUCCESS_TEMPLATE, MSG_WARNING_TEMPLATE
-    from models import Distributor, Invoice
+    import metrics
+    from controllers import (
+        Controller,
+        ImportRunRecorder,
+        Job,
+        ProgressChannel,
+        job_runner,
+        progress,
+    )
+    from controllers.import_pipeline import read_excel_chunks, run_pipeline
+    from helpers import (
+        IMPORT_MEMORY_LIMIT,
+        MSG_ERROR_TEMPLATE,
+        MSG_SUCCESS_TEMPLATE,
+        MSG_WARNING_TEMPLATE,
+        file_hash,
+    )
+    from models import (
+        DUPLICATE_MODES,
+        IMPORT_CANCELLED,
+        IMPORT_COMPLETED,
+        IMPORT_FAILED,
+        REJECT_STAGE_CLEAN,
+        REJECT_STAGE_VALIDATE,
+        REJECT_STAGE_WRITE,
+        Distributor,
+        Invoice,
+    )
 except:
-    from new_certificazione_770.controllers import Controller, ResultThread
+    import new_certificazione_770.metrics as metrics
+    from new_certificazione_770.controllers import (
+        Controller,
+        ImportRunRecorder,
+        Job,
+        ProgressChannel,
+        job_runner,
+        progress,
+    )
+    from new_certificazione_770.controllers.import_pipeline import (
+        read_excel_chunks,
+        run_pipeline,
+    )
     from new_certificazione_770.helpers import (
+        IMPORT_MEMORY_LIMIT,
         MSG_ERROR_TEMPLATE,
         MSG_SUCCESS_TEMPLATE,
         MSG_WARNING_TEMPLATE,
+        file_hash,
+    )
+    from new_certificazione_770.models import (
+        DUPLICATE_MODES,
+        IMPORT_CANCELLED,
+        IMPORT_COMPLETED,
+        IMPORT_FAILED,
+        REJECT_STAGE_CLEAN,
+        REJECT_STAGE_VALIDATE,
+        REJECT_STAGE_WRITE,
+        Distributor,
+        Invoice,
     )
-    from new_certificazione_770.models import Distributor, Invoice
 
 from .dialog import BaseDialog
+from .rejects_dialog import RejectsDialog
 
 # Constants
 VAR_FILE_PATH = "file_path"
 VAR_MESSAGE = "message"
 VAR_IMPORT_TYPE = "import_type"
 VAR_CHECK_DELETE = "delete"
+VAR_DUPLICATES = "duplicates"
+VAR_PIPELINE = "pipeline"
+VAR_STAGED = "staged"
 
 
 BTN_CONTROL = "Control"
@@ -46,12 +95,37 @@ BTN_IMPORT_EXCEL = "Import"
 THREAD_IMPORT_DATA = "Import Data"
 THREAD_CONTROL_EXCEL = "Control excel file"
 
+# Invoices are imported in batches (set-based duplicate check)
+INVOICE_BATCH_SIZE = 500
+
+# Excel parsing is CPU-bound and its arguments and result are picklable:
+# it runs on a worker process, the import needs the Controller (thread)
+CONTROL_EXCEL_BACKEND = job_runner.BACKEND_PROCESS
+IMPORT_DATA_BACKEND = job_runner.BACKEND_THREAD
+
+# The pipelined and the staged imports read the file with openpyxl (no xls)
+PIPELINE_EXTENSIONS = (".xlsx", ".xlsm")
+DATE_COLUMNS = ("DataDiNascita", "InvoiceDate")
+
+# Import paths after the model name in the import type of the import runs
+IMPORT_PATH_PIPELINE = "pipeline"
+IMPORT_PATH_STAGED = "staged"
+
+# Staged import: the memory limit (MB) is shared between the chunk of rows
+# held by the worker and the page cache of the database connection
+STAGED_MEMORY_LIMIT = int(IMPORT_MEMORY_LIMIT)
+STAGED_CACHE_SHARE = 4  # 1/4 of the limit to the database page cache
+STAGED_ROW_BYTES = 4096  # estimated memory of a row: excel cells and record
+STAGED_MIN_CHUNK = 100
+STAGED_MAX_CHUNK = 20000
+
 REPORT_TEMPLATE = """
 Final report
 ------------
 - Inserted: {:,d}
 - Updated: {:,d}
 - Error: {:,d}
+- Skipped: {:,d}
 - Total: {:,d}
 """
 
@@ -98,6 +172,7 @@ class ImportDialog(BaseDialog):
         self._queue: Queue | None = None
         self._data_frame = None
         self._controller: Controller | None = None
+        self._checkpoint: dict | None = None
         super().__init__(parent=parent, title=title, **kwargs)
 
     def body(self, master):
@@ -141,6 +216,20 @@ class ImportDialog(BaseDialog):
         ent.pack(side=tk.LEFT, fill=tk.X, expand=tk.Y, padx=5)
         self.import_type_opt = ent
 
+        # Duplicate invoices
+        frm = ttk.Frame(master=self.label_frm, padding=5)
+        frm.pack(side=tk.TOP, expand=tk.Y, fill=tk.X)
+        lbl = ttk.Label(master=frm, padding=5, text="Duplicate invoices:", width=20)
+        lbl.pack(side=tk.LEFT)
+        self.setvar(name=VAR_DUPLICATES, value=DUPLICATE_MODES[0])
+        ent = ttk.Combobox(
+            master=frm,
+            textvariable=VAR_DUPLICATES,
+            state="readonly",
+            values=DUPLICATE_MODES,
+        )
+        ent.pack(side=tk.LEFT, fill=tk.X, expand=tk.Y, padx=5)
+
         # check delete table
         frm = ttk.Frame(master=self.label_frm, padding=5)
         frm.pack(side=tk.TOP, expand=tk.Y, fill=tk.X)
@@ -160,6 +249,38 @@ class ImportDialog(BaseDialog):
         )
         ent.pack(side=tk.LEFT, fill=tk.X, expand=tk.Y, padx=5)
 
+        # check pipelined import
+        frm = ttk.Frame(master=self.label_frm, padding=5)
+        frm.pack(side=tk.TOP, expand=tk.Y, fill=tk.X)
+        self.setvar(name=VAR_PIPELINE, value=False)
+        ent = ttk.Checkbutton(
+            master=frm,
+            variable=VAR_PIPELINE,
+            text="Import in one step (read, control and write together)",
+            padding=10,
+            style="Switch.TCheckbutton",
+            onvalue=True,
+            offvalue=False,
+            command=lambda: self.select_import_path(VAR_PIPELINE),
+        )
+        ent.pack(side=tk.LEFT, fill=tk.X, expand=tk.Y, padx=5)
+
+        # check staged import
+        frm = ttk.Frame(master=self.label_frm, padding=5)
+        frm.pack(side=tk.TOP, expand=tk.Y, fill=tk.X)
+        self.setvar(name=VAR_STAGED, value=False)
+        ent = ttk.Checkbutton(
+            master=frm,
+            variable=VAR_STAGED,
+            text="Low memory import (stage the rows in the database)",
+            padding=10,
+            style="Switch.TCheckbutton",
+            onvalue=True,
+            offvalue=False,
+            command=lambda: self.select_import_path(VAR_STAGED),
+        )
+        ent.pack(side=tk.LEFT, fill=tk.X, expand=tk.Y, padx=5)
+
         # Message frame
         frm = ttk.Frame(master=body_frm, padding=5)
         frm.pack(side=tk.TOP, fill=tk.X, expand=tk.Y)
@@ -258,11 +379,8 @@ class ImportDialog(BaseDialog):
             )
             self.treeview.see(item=iid)
             self.treeview.selection_set(_item)
-            self.action_btn.config(
-                state=tk.NORMAL,
-                text=BTN_CONTROL,
-                command=self.control_excel_file,
-            )
+            self.action_btn.config(state=tk.NORMAL)
+            self.select_first_action()
         else:
             self.setvar(name=VAR_MESSAGE, value="Choose a file")
 
@@ -297,19 +415,27 @@ class ImportDialog(BaseDialog):
         _action = f"Start thread {THREAD_CONTROL_EXCEL}"
         logging.debug(msg=_action)
         self._event = Event()
-        _thread = ResultThread(
-            name=THREAD_CONTROL_EXCEL,
-            target=_thread_control_excel_file,
+        _job = job_runner.get_runner(CONTROL_EXCEL_BACKEND).submit(
+            _thread_control_excel_file,
             args=(_excel_file, _model, self._event),
+            name=THREAD_CONTROL_EXCEL,
+            metrics=metrics.MetricsRegistry(name=THREAD_CONTROL_EXCEL),
+            progress=ProgressChannel(),
         )
-        _thread.start()
-        self.after(ms=200, func=lambda t=_thread: self.monitor_thread(thread=t))
+        self.watch_thread(_job, self.show_progress, self.monitor_thread)
 
-    def import_excel_file_data(self):
-        """Import excel file data process"""
-        if self._data_frame is None:
-            return
+    def prepare_import(self, import_path: str = "") -> bool:
+        """Check the controller, show the import item, offer to resume an
+        interrupted import of the file and delete the table if asked, before
+        an import
 
+        Args:
+            import_path (str, optional): IMPORT_PATH_PIPELINE, IMPORT_PATH_STAGED
+                or "" for the import after the control. Defaults to "".
+
+        Returns:
+            bool: False if the import can not go on
+        """
         if self._controller is None:
             # Check Controller
             _action = "Check Controller"
@@ -321,7 +447,7 @@ class ImportDialog(BaseDialog):
                     _action, "No controller passed to dialog"
                 )
                 messagebox.showerror(title=_action, message=msg, parent=self)
-                return
+                return False
 
         self.update_idletasks()
         self.action_btn.config(state=tk.DISABLED)
@@ -347,8 +473,62 @@ class ImportDialog(BaseDialog):
         self.treeview.see(item=_item)
         self.treeview.selection_set(_item)
 
-        # Delete table
+        # Resume an interrupted import of the same file
         _model = self.getvar(name=VAR_IMPORT_TYPE)
+        self._checkpoint = None
+        _action = "Check interrupted import"
+        logging.debug(msg=_action)
+        try:
+            _excel_file = self.getvar(name=VAR_FILE_PATH)
+            # The import paths do not split the file in the same chunks
+            _import_type = f"{_model}:{import_path}" if import_path else _model
+            _file_hash = file_hash(_excel_file)
+            _run = self._controller.get_import_run(
+                file_hash=_file_hash, import_type=_import_type
+            )
+            self._checkpoint = dict(
+                file_hash=_file_hash,
+                file_name=os.path.basename(_excel_file),
+                import_type=_import_type,
+                resume=False,
+            )
+        except Exception:
+            # Import without checkpoint
+            logging.exception(msg=_action)
+            _run = None
+        if _run is not None:
+            iid = self.treeview.insert(
+                parent=_item, index="end", text="Resume import", values=("Running")
+            )
+            self.treeview.see(item=iid)
+            msg = (
+                f"The import of this file was interrupted ({_run['status']}) after"
+                f" {_run['rows_done']:,d} record(s).\n\nDo you want to resume it?"
+                "\n\nNo starts a new import."
+            )
+            ask = messagebox.askyesnocancel(
+                title="Resume import", message=msg, default="yes", parent=self
+            )
+            if ask is None:
+                logging.warning(msg=f"{_action}: cancel")
+                self.treeview.item(item=iid, values=("Cancel"))
+                self.treeview.item(item=_item, values=("Cancel"))
+                self.progress_bar.stop()
+                self.action_btn.config(state=tk.NORMAL)
+                self.set_frame_state(self.label_frm, tk.NORMAL)
+                self.setvar(name=VAR_MESSAGE, value=f"{_action}... Cancel")
+                return False
+            self._checkpoint["resume"] = ask
+            logging.info(msg=f"{_action}: run={_run['id']}, resume={ask}")
+            self.treeview.item(
+                item=iid,
+                values=(f"From record {_run['rows_done']:,d}" if ask else "New import"),
+            )
+            if ask:
+                # Deleting the table would lose the records already imported
+                return True
+
+        # Delete table
         if self.getvar(name=VAR_CHECK_DELETE) == 1:
             _action = "Delete table"
             logging.debug(msg=_action)
@@ -368,7 +548,7 @@ class ImportDialog(BaseDialog):
                 self.action_btn.config(state=tk.NORMAL)
                 self.set_frame_state(self.label_frm, tk.NORMAL)
                 self.setvar(name=VAR_MESSAGE, value=f"{_action}... Cancel")
-                return
+                return False
             if ask:
                 try:
                     self._controller.delete_table(model=_model)
@@ -386,12 +566,21 @@ class ImportDialog(BaseDialog):
                     self.treeview.item(item=iid, values=(str(e)))
                     msg = MSG_ERROR_TEMPLATE.format(_action, str(e))
                     messagebox.showerror(title=_action, message=msg, parent=self)
-                    return
+                    return False
             else:
                 logging.warning(msg=f"{_action}: bypass by user")
                 self.treeview.item(item=iid, values=("Bypass"))
+        return True
+
+    def import_excel_file_data(self):
+        """Import excel file data process"""
+        if self._data_frame is None:
+            return
+        if not self.prepare_import():
+            return
 
         # Add data to queue
+        _item = "import"
         try:
             _action = "Add data to queue"
             logging.debug(msg=_action)
@@ -424,13 +613,100 @@ class ImportDialog(BaseDialog):
         self.progress_bar.stop()
         self.progress_bar.config(mode="determinate", value=0, maximum=total)
         self._event = Event()
-        _thread = ResultThread(
+        _duplicates = self.getvar(name=VAR_DUPLICATES)
+        _job = job_runner.get_runner(IMPORT_DATA_BACKEND).submit(
+            _thread_import_data_on_db,
+            args=(
+                self._controller,
+                _model,
+                self._queue,
+                self._event,
+                _duplicates,
+                self._checkpoint,
+            ),
+            name=THREAD_IMPORT_DATA,
+            metrics=metrics.MetricsRegistry(name=THREAD_IMPORT_DATA),
+            progress=ProgressChannel(total=total),
+        )
+        self.watch_thread(_job, self.show_progress, self.monitor_thread)
+
+    def pipeline_import(self) -> None:
+        """Pipelined import: read, control and write the excel file in one
+        step, without loading it whole"""
+        _excel_file = self.getvar(name=VAR_FILE_PATH)
+        if not _excel_file:
+            return
+        if not self.prepare_import(import_path=IMPORT_PATH_PIPELINE):
+            return
+
+        _action = f"Start thread {THREAD_IMPORT_DATA}"
+        logging.debug(msg=_action)
+        self._data_frame = None
+        self._queue = None
+        self._event = Event()
+        _model = self.getvar(name=VAR_IMPORT_TYPE)
+        _duplicates = self.getvar(name=VAR_DUPLICATES)
+        _job = job_runner.get_runner(IMPORT_DATA_BACKEND).submit(
+            _thread_pipeline_import,
+            args=(
+                self._controller,
+                _excel_file,
+                _model,
+                self._event,
+                _duplicates,
+                self._checkpoint,
+            ),
+            name=THREAD_IMPORT_DATA,
+            metrics=metrics.MetricsRegistry(name=THREAD_IMPORT_DATA),
+            progress=ProgressChannel(),
+        )
+        self.watch_thread(_job, self.show_progress, self.monitor_thread)
+
+    def staged_import(self) -> None:
+        """Low memory import: load the excel file into a staging table chunk
+        by chunk, then validate and merge it with SQL"""
+        _excel_file = self.getvar(name=VAR_FILE_PATH)
+        if not _excel_file:
+            return
+        if not self.prepare_import(import_path=IMPORT_PATH_STAGED):
+            return
+
+        _action = f"Start thread {THREAD_IMPORT_DATA}"
+        logging.debug(msg=_action)
+        self._data_frame = None
+        self._queue = None
+        self._event = Event()
+        _model = self.getvar(name=VAR_IMPORT_TYPE)
+        _duplicates = self.getvar(name=VAR_DUPLICATES)
+        _job = job_runner.get_runner(IMPORT_DATA_BACKEND).submit(
+            _thread_staged_import,
+            args=(
+                self._controller,
+                _excel_file,
+                _model,
+                self._event,
+                _duplicates,
+                self._checkpoint,
+                self._memory_limit(),
+            ),
             name=THREAD_IMPORT_DATA,
-            target=_thread_import_data_on_db,
-            args=(self._controller, _model, self._queue, self._event),
+            metrics=metrics.MetricsRegistry(name=THREAD_IMPORT_DATA),
+            progress=ProgressChannel(),
         )
-        _thread.start()
-        self.after(ms=200, func=lambda t=_thread: self.monitor_thread(thread=t))
+        self.watch_thread(_job, self.show_progress, self.monitor_thread)
+
+    def _memory_limit(self) -> int:
+        """Memory limit of the staged import (MB) from the settings"""
+        _value = self._args.get("memory_limit", None)
+        try:
+            _memory_limit = int(_value)
+            if _memory_limit > 0:
+                return _memory_limit
+        except (TypeError, ValueError):
+            pass
+        if _value is not None:
+            logging.warning(msg=f"Invalid import memory limit: {_value=}")
+        return STAGED_MEMORY_LIMIT
 
     def select_import_type(self, event=None):
         """Change import type selection event
@@ -441,32 +717,91 @@ class ImportDialog(BaseDialog):
         if self.getvar(name=VAR_IMPORT_TYPE) == Invoice.__name__:
             self.setvar(name=VAR_CHECK_DELETE, value=True)
         # Change action button
-        self.action_btn.config(
-            text=BTN_CONTROL,
-            command=self.control_excel_file,
-        )
+        self.select_first_action()
 
-    def monitor_thread(self, thread: ResultThread) -> None:
-        if thread.is_alive():
-            if thread.name == THREAD_IMPORT_DATA:
-                _total = self._queue.maxsize
-                _ind = _total - self._queue.unfinished_tasks
-                _msg = f"{THREAD_IMPORT_DATA} processing record {_ind:,d} of {_total:,d}..."
-                self.setvar(
-                    name=VAR_MESSAGE,
-                    value=_msg,
-                )
-                self.progress_bar.config(value=_ind)
+    def select_import_path(self, name: str) -> None:
+        """Switch the one step or the low memory import: only one of them
+        can be on
 
-            self.after(ms=100, func=lambda: self.monitor_thread(thread=thread))
+        Args:
+            name (str): variable of the switch changed
+        """
+        if self.getvar(name=name) == 1:
+            _other = VAR_STAGED if name == VAR_PIPELINE else VAR_PIPELINE
+            self.setvar(name=_other, value=False)
+        self.select_first_action()
+
+    def select_first_action(self) -> None:
+        """Set the action button for the chosen file: Control, or Import for
+        the pipelined and the staged import of an xlsx/xlsm file"""
+        _excel_file = self.getvar(name=VAR_FILE_PATH)
+        _extension = os.path.splitext(_excel_file)[1].lower()
+        _command = None
+        if self.getvar(name=VAR_PIPELINE) == 1:
+            _command = self.pipeline_import
+        elif self.getvar(name=VAR_STAGED) == 1:
+            _command = self.staged_import
+        if _command is not None and _extension in PIPELINE_EXTENSIONS:
+            self._data_frame = None
+            self.action_btn.config(text=BTN_IMPORT_EXCEL, command=_command)
+            if _excel_file:
+                self.setvar(name=VAR_MESSAGE, value="Ready to import")
+        else:
+            self.action_btn.config(text=BTN_CONTROL, command=self.control_excel_file)
+            if _excel_file:
+                self.setvar(name=VAR_MESSAGE, value="Ready to control")
+
+    def show_progress(
+        self,
+        thread: Job,
+        state: progress.ProgressState | None,
+        events: list[progress.ProgressEvent],
+    ) -> None:
+        """Show the progress drained from the worker channel"""
+        _item = "import" if thread.name == THREAD_IMPORT_DATA else "control"
+        for event in events:
+            if event.kind == progress.EVENT_ERROR:
+                iid = f"{_item}.last_error"
+                if not self.treeview.exists(item=iid):
+                    self.treeview.insert(
+                        parent=_item, index="end", iid=iid, text="Last error"
+                    )
+                self.treeview.item(item=iid, values=(event.detail,))
+        if state is None:
             return
 
+        if state.total:
+            _rate = thread.metrics.rate("import.rows")
+            _msg = (
+                f"{thread.name} processing record {state.done:,d} of {state.total:,d}"
+                f" ({_rate:,.0f} rows/s)..."
+            )
+            self.progress_bar.stop()
+            self.progress_bar.config(
+                mode="determinate", maximum=state.total, value=state.done
+            )
+        else:
+            _msg = f"{thread.name}: {state.stage}..."
+        if state.errors:
+            _msg += f" {state.errors:,d} error(s)"
+        self.setvar(name=VAR_MESSAGE, value=_msg)
+        self.show_metrics(self.treeview, _item, thread.metrics)
+
+    def monitor_thread(self, thread: Job) -> None:
         _action = thread.name
         logging.debug(msg=f"Thread {_action} terminated")
+        if thread.metrics is not None:
+            logging.info(msg=thread.metrics.summary())
         self.progress_bar.stop()
         self._event = None
         self.action_btn.config(state=tk.NORMAL)
         self.set_frame_state(self.label_frm, tk.NORMAL)
+        if thread.exception is not None:
+            # The job failed without a result tuple (e.g. worker process died)
+            self.setvar(name=VAR_MESSAGE, value=f"{_action}... Error!")
+            msg = MSG_ERROR_TEMPLATE.format(_action, repr(thread.exception))
+            messagebox.showerror(title=_action, message=msg, parent=self)
+            return
         if thread.name == THREAD_CONTROL_EXCEL:
             _item = "control"
             res_code, res_msg, res_data = thread.result
@@ -511,7 +846,7 @@ class ImportDialog(BaseDialog):
 
         elif thread.name == THREAD_IMPORT_DATA:
             _item = "import"
-            res_code, res_msg, res_data, res_file_name = thread.result
+            res_code, res_msg, res_data, res_run_id = thread.result
             if res_code < 0:
                 logging.error(msg=f"{_action}: {res_code=}, {res_msg=}")
                 self.setvar(name=VAR_MESSAGE, value=f"{_action}... Error!")
@@ -532,9 +867,10 @@ class ImportDialog(BaseDialog):
 
             self.treeview.see(item=_item)
             if res_data:
-                _total = self._queue.maxsize
+                # The pipelined import has no queue: total of the rows read
+                _total = self._queue.maxsize if self._queue else sum(res_data)
                 msg += REPORT_TEMPLATE.format(
-                    res_data[0], res_data[1], res_data[2], _total
+                    res_data[0], res_data[1], res_data[2], res_data[3], _total
                 )
                 self.treeview.insert(
                     parent=_item,
@@ -554,25 +890,36 @@ class ImportDialog(BaseDialog):
                     text="Updated",
                     values=(f"{res_data[1]:,d}"),
                 )
-                iid = self.treeview.insert(
+                self.treeview.insert(
                     parent=_item,
                     index="end",
                     text="Error",
                     values=(f"{res_data[2]:,d}"),
                 )
+                iid = self.treeview.insert(
+                    parent=_item,
+                    index="end",
+                    text="Skipped",
+                    values=(f"{res_data[3]:,d}"),
+                )
                 self.treeview.item(item=_item, open=True)
                 self.treeview.see(item=iid)
                 self.treeview.selection_set(_item)
                 logging.info(msg=f"{_action}: {res_data=}")
-            if res_file_name and int(res_data[2]) > 0:
-                logging.info(msg=f"{_action}: {res_file_name=}")
+            if res_run_id and int(res_data[2]) > 0:
+                logging.info(msg=f"{_action}: {res_run_id=}")
                 msg += (
                     "\n\nSome records were not entered due to an error."
-                    "\nDo you want to open the temporary excel file with errors?"
+                    "\nDo you want to review the rejected records?"
                 )
                 ask = messagebox.askyesno(title=_action, message=msg, parent=self)
                 if ask:
-                    os.startfile(filepath=f"{res_file_name}")
+                    RejectsDialog(
+                        parent=self,
+                        title="Import rejects",
+                        controller=self._controller,
+                        import_run_id=res_run_id,
+                    )
             else:
                 messagebox.showinfo(title=_action, message=msg, parent=self)
             self.result = "Ok"
@@ -618,15 +965,24 @@ def _thread_control_excel_file(excel_file: str, model: str, event: Event):
         _step = 0
         while event.is_set() is False:
             if _step == 0:
+                _action = "Load pandas"
+                progress.stage(_action)
+                # pandas is loaded by the first import (or the warm-up)
+                import pandas
+
                 _action = "Open Excel file"
-                with pandas.ExcelFile(excel_file) as f_xls:
-                    _data_frame = pandas.read_excel(
-                        io=f_xls, dtype=data_type, na_filter=False
-                    )
+                progress.stage(_action)
+                with metrics.timer("import.parse"):
+                    with pandas.ExcelFile(excel_file) as f_xls:
+                        _data_frame = pandas.read_excel(
+                            io=f_xls, dtype=data_type, na_filter=False
+                        )
+                metrics.count("import.rows_read", len(_data_frame))
                 _step += 1
                 continue
             elif _step == 1:
                 _action = "Check Data frame"
+                progress.stage(_action)
                 if _data_frame.empty or _data_frame is None:
                     _exit = 1
                     _msg = "Data frame is EMPTY"
@@ -635,6 +991,7 @@ def _thread_control_excel_file(excel_file: str, model: str, event: Event):
                 continue
             elif _step == 2:
                 _action = "Check correct columns"
+                progress.stage(_action)
                 if not set(columns).issubset(_data_frame.columns):
                     missing_columns = set(columns) - set(_data_frame.columns)
                     _msg = f"For excel file missing required columns: {", ".join(missing_columns)}"
@@ -644,20 +1001,22 @@ def _thread_control_excel_file(excel_file: str, model: str, event: Event):
                 continue
             else:
                 _action = "Adjust data frame data"
-                _data_frame = _data_frame.replace(to_replace={pandas.NaT: None})
-                _data_frame = _data_frame.map(
-                    func=lambda x: x.upper()
-                    if pandas.notnull(x) and type(x) is str
-                    else x
-                )
-                if model == Distributor.__name__:
-                    _data_frame["DataDiNascita"] = pandas.to_datetime(
-                        arg=_data_frame["DataDiNascita"], format="mixed"
-                    ).dt.date
-                else:
-                    _data_frame["InvoiceDate"] = pandas.to_datetime(
-                        arg=_data_frame["InvoiceDate"], format="mixed"
-                    ).dt.date
+                progress.stage(_action)
+                with metrics.timer("import.transform"):
+                    _data_frame = _data_frame.replace(to_replace={pandas.NaT: None})
+                    _data_frame = _data_frame.map(
+                        func=lambda x: x.upper()
+                        if pandas.notnull(x) and type(x) is str
+                        else x
+                    )
+                    if model == Distributor.__name__:
+                        _data_frame["DataDiNascita"] = pandas.to_datetime(
+                            arg=_data_frame["DataDiNascita"], format="mixed"
+                        ).dt.date
+                    else:
+                        _data_frame["InvoiceDate"] = pandas.to_datetime(
+                            arg=_data_frame["InvoiceDate"], format="mixed"
+                        ).dt.date
                 break
         else:
             if event.is_set() is True:
@@ -673,75 +1032,462 @@ def _thread_control_excel_file(excel_file: str, model: str, event: Event):
 
 
 def _thread_import_data_on_db(
-    controller: Controller, model: str, queue: Queue, event: Event
+    controller: Controller,
+    model: str,
+    queue: Queue,
+    event: Event,
+    duplicates: str = DUPLICATE_MODES[0],
+    checkpoint: dict | None = None,
 ):
+    # Import run: counters, rows taken from the queue (the skipped ones
+    # included) and rejects not stored yet
+    _run = ImportRunRecorder(
+        controller, model, duplicates, checkpoint, chunk_size=INVOICE_BATCH_SIZE
+    )
     try:
         # Initialize
-        _inserted: int = 0
-        _updated: int = 0
-        _error: int = 0
-        _records = [_inserted, _updated, _error]
-        _csv_fd = None
         _msg: int = "OK"
         _exit: int = 0
 
-        # Open csv file
-        _action = "Open csv file"
-        with tempfile.NamedTemporaryFile(
-            mode="wt",
-            encoding="utf-8",
-            newline="",
-            delete=False,
-            suffix=".csv",
-            delete_on_close=True,
-        ) as _temp_fd:
-            _csv_fd = csv.writer(
-                _temp_fd, delimiter=",", quoting=csv.QUOTE_MINIMAL, lineterminator="\n"
-            )
-            # Loop queue
-            while not queue.empty():
-                if event.is_set():
-                    _exit = 1
-                    _msg = "Thread stopped by user"
-                    break
+        _action = "Start import run"
+        # A resumed run keeps its duplicate mode and chunks
+        run = _run.start()
+        duplicates = _run.duplicates
+        _chunk_size = _run.chunk_size
+        if run["rows_done"]:
+            # Every row before rows_done is committed (a cancelled run stops
+            # between two rows or batches)
+            _action = "Skip imported records"
+            progress.stage(_action)
+            _skip = 0
+            while _skip < run["rows_done"] and not queue.empty():
+                queue.get()
+                queue.task_done()
+                _skip += 1
+            progress.advance(_skip)
+
+        # Loop queue
+        progress.stage("Import records")
+        while not queue.empty():
+            if event.is_set():
+                _exit = 1
+                _msg = "Thread stopped by user"
+                break
 
-                _action = "Get item from queue"
-                item = queue.get()
+            if model == Invoice.__name__:
+                _action = "Get batch from queue"
+                batch = []
+                while len(batch) < _chunk_size and not queue.empty():
+                    batch.append(queue.get())
+                _run.advance(len(batch))
 
                 try:
-                    _action = "Import_data"
-                    _, is_updated = controller.import_data(data=item, model=model)
-                    # Update the counters based on the return value of the controller method
-                    if is_updated is True:
-                        _updated += 1
-                    else:
-                        _inserted += 1
+                    _action = "Import invoices batch"
+                    # The batch, its rejects and its checkpoint commit together
+                    with metrics.timer("import.batch"), controller.transaction():
+                        records, items, invalid = controller.validate_invoices(
+                            records=batch
+                        )
+                        inserted, replaced, skipped, rejects = (
+                            controller.insert_invoices(
+                                records=records, items=items, duplicates=duplicates
+                            )
+                        )
+                        rejects = [
+                            *((i, e, REJECT_STAGE_VALIDATE) for i, e in invalid),
+                            *((i, e, REJECT_STAGE_WRITE) for i, e in rejects),
+                        ]
+                        _run.save(rejects, (inserted, replaced, len(rejects), skipped))
+                    _run.record(inserted, replaced, skipped, rejects)
                 except Exception as e:
-                    if _error == 0:
-                        field_names = list(item.keys())
-                        field_names.append("Error")
-                        _csv_fd.writerow(field_names)
-                    _error += 1
-                    if item is not None:
-                        _values = list(item.values())
-                        _values.append(str(e))
-                        _csv_fd.writerow(_values)
+                    for item in batch:
+                        _run.reject(item, e, REJECT_STAGE_WRITE)
+                    _run.save()
                 finally:
-                    queue.task_done()
-                    _records = [_inserted, _updated, _error]
-
-            if _error == 0 and _temp_fd:
-                _temp_fd.close()
-            return (
-                _exit,
-                _msg,
-                _records,
-                (_temp_fd.name if _temp_fd and _error > 0 else None),
+                    _run.discard()
+                    for _ in batch:
+                        queue.task_done()
+                    metrics.count("import.rows", len(batch))
+                    progress.advance(len(batch))
+                continue
+
+            _action = "Get item from queue"
+            item = queue.get()
+            _run.advance()
+
+            try:
+                _action = "Import_data"
+                with metrics.timer("import.row"):
+                    _, is_updated = controller.import_data(data=item, model=model)
+                # Update the counters based on the return value of the controller method
+                if is_updated is True:
+                    _run.record(updated=1)
+                else:
+                    _run.record(inserted=1)
+            except Exception as e:
+                _run.reject(item, e, REJECT_STAGE_WRITE)
+            finally:
+                queue.task_done()
+                metrics.count("import.rows")
+                progress.advance()
+            # Rows are upserted: a chunk replayed after a crash is harmless
+            if _run.done % _chunk_size == 0 or queue.empty():
+                _run.save()
+
+        if _run.pending:
+            # Stopped by the user inside a chunk of rows
+            _run.save()
+        _run.finish(IMPORT_CANCELLED if _exit else IMPORT_COMPLETED)
+        return _run.result(_exit, _msg)
+
+    except Exception as e:
+        _run.finish(IMPORT_FAILED)
+        return _run.result(-1, f"{_action}: {str(e)}")
+
+
+def _clean_value(value: Any, data_type: type, is_date: bool = False) -> Any:
+    """Clean an excel cell value like the control of the excel file
+    (string columns in upper case, dates as date)"""
+    if is_date:
+        if value is None or value == "":
+            return None
+        if isinstance(value, datetime.datetime):
+            return value.date()
+        if isinstance(value, datetime.date):
+            return value
+        from dateutil import parser as date_parser
+
+        return date_parser.parse(str(value)).date()
+    if data_type is str:
+        if value is None:
+            return ""
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        return str(value).upper()
+    if value is None or value == "":
+        return None
+    return data_type(value)
+
+
+def _clean_rows(
+    fields_list: list, rows: list[dict]
+) -> tuple[list[dict], list[tuple[dict, Exception]]]:
+    """Clean a chunk of excel rows into model records
+
+    Args:
+        fields_list (list): DISTRIBUTOR_FIELDS_LIST or INVOICE_FIELDS_LIST
+        rows (list[dict]): rows as {column: value}
+
+    Returns:
+        tuple[list[dict], list[tuple[dict, Exception]]]: records and rejected
+            (record, error)
+    """
+    items = []
+    rejects = []
+    for row in rows:
+        try:
+            items.append(
+                {
+                    field: _clean_value(
+                        row.get(column), data_type, column in DATE_COLUMNS
+                    )
+                    for column, data_type, field in fields_list
+                }
             )
+        except Exception as e:
+            item = {field: row.get(column) for column, _, field in fields_list}
+            rejects.append((item, e))
+    return items, rejects
+
+
+def _thread_pipeline_import(
+    controller: Controller,
+    excel_file: str,
+    model: str,
+    event: Event,
+    duplicates: str = DUPLICATE_MODES[0],
+    checkpoint: dict | None = None,
+):
+    """Pipelined import of an excel file: a reader yields chunks of rows, a
+    validator cleans and validates them and the job thread writes them, see
+    controllers.import_pipeline
+
+    Each written chunk is recorded in the import run with its rejects, a
+    resumed run skips the chunks already written.
+
+    Returns:
+        tuple: same result of _thread_import_data_on_db
+    """
+    # Import run: counters, rows and chunks written (the skipped ones
+    # included) and rejects not stored yet
+    _run = ImportRunRecorder(
+        controller, model, duplicates, checkpoint, chunk_size=INVOICE_BATCH_SIZE
+    )
+    try:
+        # Initialize
+        _msg: str = "OK"
+        _exit: int = 0
+
+        _action = "Check model"
+        if model == Distributor.__name__:
+            fields_list = DISTRIBUTOR_FIELDS_LIST
+        elif model == Invoice.__name__:
+            fields_list = INVOICE_FIELDS_LIST
+        else:
+            return _run.result(2, f"Unknown model: {model=}")
+        columns = [v[0] for v in fields_list]
+
+        _action = "Start import run"
+        # A resumed run keeps its duplicate mode and chunks
+        run = _run.start()
+        duplicates = _run.duplicates
+        _chunk_size = _run.chunk_size
+        _skip_chunks = run["last_chunk"] + 1
+
+        def _read():
+            chunks = read_excel_chunks(
+                file_path=excel_file, columns=columns, chunk_size=_chunk_size
+            )
+            # The rows of the chunks already written are parsed, not validated
+            for index, rows in enumerate(chunks):
+                if index >= _skip_chunks:
+                    yield rows
+                else:
+                    progress.advance(len(rows))
+
+        def _validate(rows: list[dict]) -> tuple:
+            items, invalid = _clean_rows(fields_list, rows)
+            rejects = [(item, error, REJECT_STAGE_CLEAN) for item, error in invalid]
+            records = None
+            if model == Invoice.__name__:
+                records, items, invalid = controller.validate_invoices(records=items)
+                rejects.extend(
+                    (item, error, REJECT_STAGE_VALIDATE) for item, error in invalid
+                )
+            return (records, items, rejects, len(rows))
+
+        def _write(chunk: tuple) -> None:
+            records, items, rejects, size = chunk
+            _run.advance(size)
+            if model == Invoice.__name__:
+                try:
+                    # The chunk, its rejects and its checkpoint commit together
+                    with metrics.timer("import.batch"), controller.transaction():
+                        inserted, replaced, skipped, invalid = (
+                            controller.insert_invoices(
+                                records=records, items=items, duplicates=duplicates
+                            )
+                        )
+                        rejects = [
+                            *rejects,
+                            *((i, e, REJECT_STAGE_WRITE) for i, e in invalid),
+                        ]
+                        _run.save(rejects, (inserted, replaced, len(rejects), skipped))
+                    _run.record(inserted, replaced, skipped, rejects)
+                except Exception as e:
+                    for item, error, stage in chunk[2]:
+                        _run.reject(item, error, stage)
+                    for item in items:
+                        _run.reject(item, e, REJECT_STAGE_WRITE)
+                    _run.save()
+                finally:
+                    _run.discard()
+            else:
+                for item, error, stage in rejects:
+                    _run.reject(item, error, stage)
+                for item in items:
+                    try:
+                        with metrics.timer("import.row"):
+                            _, is_updated = controller.import_data(
+                                data=item, model=model
+                            )
+                        if is_updated is True:
+                            _run.record(updated=1)
+                        else:
+                            _run.record(inserted=1)
+                    except Exception as e:
+                        _run.reject(item, e, REJECT_STAGE_WRITE)
+                # Rows are upserted: a chunk replayed after a crash is harmless
+                _run.save()
+            metrics.count("import.rows", size)
+            progress.advance(size)
+
+        # Run pipeline
+        _action = "Import records"
+        progress.stage(_action)
+        completed = run_pipeline(
+            read=_read,
+            validate=_validate,
+            write=_write,
+            event=event,
+            name=THREAD_IMPORT_DATA,
+        )
+        if not completed:
+            _exit = 1
+            _msg = "Thread stopped by user"
+        elif sum(_run.totals()) == 0:
+            _exit = 1
+            _msg = "Excel file is EMPTY"
+
+        _run.finish(IMPORT_COMPLETED if completed else IMPORT_CANCELLED)
+        return _run.result(_exit, _msg)
 
     except Exception as e:
-        if _error == 0 and _temp_fd:
-            _temp_fd.close()
-        _msg = f"{_action}: {str(e)}"
-        _exit = -1
-        return (_exit, _msg, _records, (_temp_fd.name if _temp_fd else None))
+        _run.finish(IMPORT_FAILED)
+        return _run.result(-1, f"{_action}: {str(e)}")
+
+
+def _staged_limits(memory_limit: int) -> tuple[int, int]:
+    """Chunk size and database page cache of a staged import within a
+    memory limit
+
+    Args:
+        memory_limit (int): memory limit in MB
+
+    Returns:
+        tuple[int, int]: rows per chunk and page cache in KiB
+    """
+    cache_size = memory_limit * 1024 // STAGED_CACHE_SHARE
+    rows = (memory_limit * 1024 - cache_size) * 1024 // STAGED_ROW_BYTES
+    return max(STAGED_MIN_CHUNK, min(rows, STAGED_MAX_CHUNK)), cache_size
+
+
+def _thread_staged_import(
+    controller: Controller,
+    excel_file: str,
+    model: str,
+    event: Event,
+    duplicates: str = DUPLICATE_MODES[0],
+    checkpoint: dict | None = None,
+    memory_limit: int = STAGED_MEMORY_LIMIT,
+):
+    """Staged import of an excel file: the rows are cleaned and loaded chunk
+    by chunk into a staging table, then the checks, the distributor
+    resolution and the merge run as SQL over the staged rows, batch by batch.
+    The worker never holds more than one chunk of rows.
+
+    Each chunk is staged with its rejects and its checkpoint, each merged
+    batch leaves the stage with its rejects and the counters: a resumed run
+    skips the chunks already staged and merges the rows left.
+
+    Returns:
+        tuple: same result of _thread_import_data_on_db
+    """
+    _chunk_size, _cache_size = _staged_limits(memory_limit)
+    # Import run: counters, rows and chunks staged (the skipped ones
+    # included) and rejects not stored yet
+    _run = ImportRunRecorder(
+        controller, model, duplicates, checkpoint, chunk_size=_chunk_size
+    )
+    try:
+        # Initialize
+        _msg: str = "OK"
+        _exit: int = 0
+
+        _action = "Check model"
+        if model == Distributor.__name__:
+            fields_list = DISTRIBUTOR_FIELDS_LIST
+        elif model == Invoice.__name__:
+            fields_list = INVOICE_FIELDS_LIST
+        else:
+            return _run.result(2, f"Unknown model: {model=}")
+        columns = [v[0] for v in fields_list]
+
+        _action = "Start import run"
+        # A resumed run keeps its duplicate mode and chunks
+        run = _run.start()
+        duplicates = _run.duplicates
+        _chunk_size = _run.chunk_size
+        _skip_chunks = run["last_chunk"] + 1
+        logging.info(
+            msg=f"Staged import: {memory_limit=} MB, {_chunk_size=}, {_cache_size=} KiB"
+        )
+
+        # Load the rows into the stage
+        _action = "Stage records"
+        progress.stage(_action)
+        _read = 0
+        chunks = read_excel_chunks(
+            file_path=excel_file, columns=columns, chunk_size=_chunk_size
+        )
+        for index, rows in enumerate(chunks):
+            if event.is_set():
+                break
+            _read += len(rows)
+            if index < _skip_chunks:
+                # Staged by the interrupted run
+                progress.advance(len(rows))
+                continue
+            items, invalid = _clean_rows(fields_list, rows)
+            rejects = [(item, error, REJECT_STAGE_CLEAN) for item, error in invalid]
+            # The chunk, its rejects and its checkpoint commit together
+            with metrics.timer("import.stage"), controller.transaction():
+                controller.stage_rows(
+                    import_run_id=_run.id,
+                    model=model,
+                    records=items,
+                    first_row=_run.done,
+                    cache_size=_cache_size,
+                )
+                _run.advance(len(rows))
+                _run.save(rejects, (0, 0, len(rejects), 0))
+            _run.record(rejects=rejects)
+            metrics.count("import.rows_read", len(rows))
+            progress.advance(len(rows))
+        # Close the workbook when stopped by the user
+        chunks.close()
+
+        # Merge the staged rows
+        _action = "Merge staged records"
+        progress.stage(_action)
+        if not event.is_set():
+            _staged = controller.count_staged_rows(import_run_id=_run.id, model=model)
+            progress.set_total(_read + _staged)
+        completed = False
+        while not event.is_set():
+            try:
+                with metrics.timer("import.batch"), controller.transaction():
+                    size, inserted, updated, skipped, rejects = (
+                        controller.merge_staged_rows(
+                            import_run_id=_run.id,
+                            model=model,
+                            duplicates=duplicates,
+                            limit=_chunk_size,
+                            cache_size=_cache_size,
+                        )
+                    )
+                    if size:
+                        _run.save(rejects, (inserted, updated, len(rejects), skipped))
+                _run.record(inserted, updated, skipped, rejects)
+            except Exception as e:
+                # The batch leaves the stage as rejects of the write stage
+                logging.exception(msg=_action)
+                with controller.transaction():
+                    items = controller.reject_staged_rows(
+                        import_run_id=_run.id, model=model, limit=_chunk_size
+                    )
+                    for item in items:
+                        _run.reject(item, e, REJECT_STAGE_WRITE)
+                    _run.save()
+                size = len(items)
+            finally:
+                _run.discard()
+            if not size:
+                completed = True
+                break
+            metrics.count("import.rows", size)
+            progress.advance(size)
+
+        if not completed:
+            _exit = 1
+            _msg = "Thread stopped by user"
+        elif sum(_run.totals()) == 0:
+            _exit = 1
+            _msg = "Excel file is EMPTY"
+
+        _run.finish(IMPORT_COMPLETED if completed else IMPORT_CANCELLED)
+        return _run.result(_exit, _msg)
+
+    except Exception as e:
+        _run.finish(IMPORT_FAILED)
+        return _run.result(-1, f"{_action}: {str(e)}")
@@ -0,0 +1,451 @@
+# -*- coding: utf-8 -*-
+"""
+Import rejects dialog
+
+Rejects of an import run: filter them by stage, error and status, correct
+the source row of a reject and import again only the corrected rejects.
+
+@File: rejects_dialog.py
+@Date: 2026-10-19
+"""
+
+# Built-in/Generic Imports
+import csv
+import logging
+import tkinter as tk
+from tkinter import filedialog, messagebox, ttk
+
+# Own modules
+try:
+    import metrics
+    from controllers import Controller, Job, ProgressChannel, job_runner, progress
+    from helpers import MSG_ERROR_TEMPLATE, MSG_SUCCESS_TEMPLATE
+    from models import REJECT_CORRECTED, REJECT_STAGES, REJECT_STATUSES
+except:  # noqa: E722
+    import new_certificazione_770.metrics as metrics
+    from new_certificazione_770.controllers import (
+        Controller,
+        Job,
+        ProgressChannel,
+        job_runner,
+        progress,
+    )
+    from new_certificazione_770.helpers import (
+        MSG_ERROR_TEMPLATE,
+        MSG_SUCCESS_TEMPLATE,
+    )
+    from new_certificazione_770.models import (
+        REJECT_CORRECTED,
+        REJECT_STAGES,
+        REJECT_STATUSES,
+    )
+
+from .dialog import BaseDialog
+
+# Constants
+VAR_RUN = "rejects_run"
+VAR_STAGE = "rejects_stage"
+VAR_ERROR_CODE = "rejects_error_code"
+VAR_STATUS = "rejects_status"
+VAR_SEARCH = "rejects_search"
+VAR_MESSAGE = "rejects_message"
+
+BTN_FILTER = "Filter"
+BTN_EDIT = "Correct..."
+BTN_REPROCESS = "Reprocess corrected"
+BTN_EXPORT = "Export..."
+
+THREAD_REPROCESS = "Reprocess rejects"
+
+REJECTS_PAGE_SIZE = 1000  # rejects shown, narrow the filter to see the others
+FILTER_ALL = ""
+
+REJECT_COLUMNS = [
+    # (column, heading, width)
+    ("stage", "Stage", 70),
+    ("error_code", "Error", 140),
+    ("status", "Status", 80),
+    ("error_message", "Message", 250),
+    ("data", "Record", 300),
+]
+
+
+class RejectsDialog(BaseDialog):
+    """Import rejects dialog
+
+    Args:
+        BaseDialog (_type_): base dialog
+    """
+
+    def __init__(self, parent=None, title="", **kwargs):
+        self._controller: Controller | None = kwargs.get("controller", None)
+        self._run_id: int | None = kwargs.get("import_run_id", None)
+        self._runs: list = []
+        self._rejects: dict = {}
+        super().__init__(parent=parent, title=title, **kwargs)
+
+    def body(self, master):
+        body_frm = ttk.Frame(master=master, padding=10)
+        body_frm.pack(fill=tk.BOTH, expand=tk.YES)
+
+        # Header
+        self.headerbox(master=body_frm, default="import")
+
+        # Import run
+        frm = ttk.Frame(master=body_frm, padding=5)
+        frm.pack(side=tk.TOP, fill=tk.X)
+        lbl = ttk.Label(master=frm, text="Import:", width=10)
+        lbl.pack(side=tk.LEFT)
+        self.setvar(name=VAR_RUN, value="")
+        self.run_opt = ttk.Combobox(
+            master=frm, textvariable=VAR_RUN, state="readonly", width=70
+        )
+        self.run_opt.bind(sequence="<<ComboboxSelected>>", func=self.select_run)
+        self.run_opt.pack(side=tk.LEFT, fill=tk.X, expand=tk.YES, padx=5)
+
+        # Filters
+        frm = ttk.Frame(master=body_frm, padding=5)
+        frm.pack(side=tk.TOP, fill=tk.X)
+        self.filter_opts = {}
+        for var, text, values in (
+            (VAR_STAGE, "Stage:", REJECT_STAGES),
+            (VAR_ERROR_CODE, "Error:", ()),
+            (VAR_STATUS, "Status:", REJECT_STATUSES),
+        ):
+            lbl = ttk.Label(master=frm, text=text)
+            lbl.pack(side=tk.LEFT, padx=(5, 0))
+            self.setvar(name=var, value=FILTER_ALL)
+            ent = ttk.Combobox(
+                master=frm,
+                textvariable=var,
+                state="readonly",
+                values=(FILTER_ALL, *values),
+                width=16,
+            )
+            ent.bind(sequence="<<ComboboxSelected>>", func=self.load_rejects)
+            ent.pack(side=tk.LEFT, padx=5)
+            self.filter_opts[var] = ent
+        self.setvar(name=VAR_SEARCH, value="")
+        ent = ttk.Entry(master=frm, textvariable=VAR_SEARCH, width=20)
+        ent.bind(sequence="<Return>", func=self.load_rejects)
+        ent.pack(side=tk.LEFT, fill=tk.X, expand=tk.YES, padx=5)
+        btn = ttk.Button(master=frm, text=BTN_FILTER, command=self.load_rejects)
+        btn.pack(side=tk.LEFT, padx=5)
+
+        # Rejects
+        frm = ttk.Frame(master=body_frm, padding=5)
+        frm.pack(side=tk.TOP, fill=tk.BOTH, expand=tk.YES)
+        self.treeview = ttk.Treeview(
+            master=frm,
+            show="headings",
+            height=15,
+            columns=[column for column, _, _ in REJECT_COLUMNS],
+        )
+        for column, heading, width in REJECT_COLUMNS:
+            self.treeview.heading(column=column, text=heading, anchor="w")
+            self.treeview.column(column=column, width=width, anchor="w")
+        self.treeview.bind(sequence="<Double-1>", func=self.edit_reject)
+        scroll = ttk.Scrollbar(
+            master=frm, orient=tk.VERTICAL, command=self.treeview.yview
+        )
+        self.treeview.configure(yscrollcommand=scroll.set)
+        self.treeview.pack(side=tk.LEFT, fill=tk.BOTH, expand=tk.YES)
+        scroll.pack(side=tk.RIGHT, fill=tk.Y)
+
+        # Message and actions
+        frm = ttk.Frame(master=body_frm, padding=5)
+        frm.pack(side=tk.TOP, fill=tk.X)
+        self.setvar(name=VAR_MESSAGE, value="")
+        lbl = ttk.Label(master=frm, textvariable=VAR_MESSAGE)
+        lbl.pack(side=tk.LEFT, fill=tk.X, expand=tk.YES, padx=5)
+        self.reprocess_btn = ttk.Button(
+            master=frm,
+            text=BTN_REPROCESS,
+            command=self.reprocess_rejects,
+            style="Accent.TButton",
+        )
+        self.reprocess_btn.pack(side=tk.RIGHT, padx=5)
+        btn = ttk.Button(master=frm, text=BTN_EXPORT, command=self.export_rejects)
+        btn.pack(side=tk.RIGHT, padx=5)
+        btn = ttk.Button(master=frm, text=BTN_EDIT, command=self.edit_reject)
+        btn.pack(side=tk.RIGHT, padx=5)
+
+        self.progress_bar = ttk.Progressbar(master=body_frm, mode="determinate")
+        self.progress_bar.pack(side=tk.TOP, fill=tk.X, pady=5)
+
+        self.load_runs()
+
+    def buttonbox(self):
+        """Button box"""
+        box = ttk.Frame(master=self)
+
+        w = ttk.Button(box, text="Close", width=20, command=self.cancel)
+        w.pack(side=tk.LEFT, padx=5, pady=5)
+
+        self.bind(sequence="<Escape>", func=self.cancel)
+        self.protocol("WM_DELETE_WINDOW", self.cancel)
+        ttk.Separator(self).pack(fill=tk.X)
+        box.pack(side=tk.BOTTOM)
+
+    def _filters(self) -> dict:
+        """Filters of the rejects query"""
+        return dict(
+            stage=self.getvar(name=VAR_STAGE),
+            error_code=self.getvar(name=VAR_ERROR_CODE),
+            status=self.getvar(name=VAR_STATUS),
+            search=self.getvar(name=VAR_SEARCH).strip(),
+        )
+
+    def _show_error(self, action: str, error: Exception) -> None:
+        logging.exception(msg=action)
+        msg = MSG_ERROR_TEMPLATE.format(action, str(error))
+        messagebox.showerror(title=action, message=msg, parent=self)
+
+    def load_runs(self) -> None:
+        """Load the import runs with rejects"""
+        _action = "Load import runs"
+        logging.debug(msg=_action)
+        try:
+            self._runs = self._controller.get_import_runs(with_rejects=True)
+        except Exception as e:
+            self._show_error(_action, e)
+            return
+        options = [
+            (
+                f"#{_run['id']} {_run['created_at']:%Y-%m-%d %H:%M}"
+                f" {_run['import_type']} {_run['file_name']} ({_run['status']})"
+            )
+            for _run in self._runs
+        ]
+        self.run_opt.config(values=options)
+        ids = [_run["id"] for _run in self._runs]
+        if self._run_id not in ids:
+            self._run_id = ids[0] if ids else None
+        if self._run_id is not None:
+            self.setvar(name=VAR_RUN, value=options[ids.index(self._run_id)])
+        self.load_summary()
+        self.load_rejects()
+
+    def select_run(self, event=None) -> None:
+        """Change import run selection event"""
+        self._run_id = self._runs[self.run_opt.current()]["id"]
+        for var in (VAR_STAGE, VAR_ERROR_CODE, VAR_STATUS):
+            self.setvar(name=var, value=FILTER_ALL)
+        self.load_summary()
+        self.load_rejects()
+
+    def load_summary(self) -> None:
+        """Load the error codes of the import run in the error filter"""
+        if self._run_id is None:
+            return
+        _action = "Load rejects summary"
+        try:
+            summary = self._controller.get_import_reject_summary(self._run_id)
+        except Exception as e:
+            self._show_error(_action, e)
+            return
+        codes = sorted({row["error_code"] for row in summary})
+        self.filter_opts[VAR_ERROR_CODE].config(values=(FILTER_ALL, *codes))
+
+    def load_rejects(self, event=None) -> None:
+        """Load the rejects of the import run matching the filters"""
+        self.treeview.delete(*self.treeview.get_children())
+        self._rejects = {}
+        if self._run_id is None:
+            self.setvar(name=VAR_MESSAGE, value="No rejected records")
+            return
+        _action = "Load rejects"
+        logging.debug(msg=_action)
+        try:
+            filters = self._filters()
+            total = self._controller.count_import_rejects(self._run_id, **filters)
+            rejects = self._controller.get_import_rejects(
+                self._run_id, limit=REJECTS_PAGE_SIZE, **filters
+            )
+        except Exception as e:
+            self._show_error(_action, e)
+            return
+        for _reject in rejects:
+            self._rejects[str(_reject["id"])] = _reject
+            self.treeview.insert(
+                parent="",
+                index="end",
+                iid=str(_reject["id"]),
+                values=self._row_values(_reject),
+            )
+        _msg = f"{total:,d} rejected record(s)"
+        if total > len(rejects):
+            _msg += f", first {len(rejects):,d} shown"
+        self.setvar(name=VAR_MESSAGE, value=_msg)
+
+    @staticmethod
+    def _row_values(reject: dict) -> tuple:
+        """Treeview values of a reject"""
+        data = ", ".join(f"{key}={value}" for key, value in reject["data"].items())
+        message = " ".join(reject["error_message"].split())
+        return (reject["stage"], reject["error_code"], reject["status"], message, data)
+
+    def edit_reject(self, event=None) -> None:
+        """Correct the source record of the selected reject"""
+        selection = self.treeview.selection()
+        if not selection:
+            return
+        _reject = self._rejects[selection[0]]
+        dlg = RejectEditDialog(
+            parent=self, title=f"Reject #{_reject['id']}", reject=_reject
+        )
+        if dlg.result is None:
+            return
+        _action = "Correct reject"
+        try:
+            self._controller.correct_import_reject(id=_reject["id"], data=dlg.result)
+        except Exception as e:
+            self._show_error(_action, e)
+            return
+        logging.info(msg=f"{_action}: id={_reject['id']}")
+        _reject.update(data=dlg.result, status=REJECT_CORRECTED)
+        self.treeview.item(item=selection[0], values=self._row_values(_reject))
+
+    def reprocess_rejects(self) -> None:
+        """Import again the corrected rejects of the import run"""
+        if self._run_id is None:
+            return
+        _action = THREAD_REPROCESS
+        try:
+            corrected = self._controller.count_import_rejects(
+                self._run_id, status=REJECT_CORRECTED
+            )
+        except Exception as e:
+            self._show_error(_action, e)
+            return
+        if not corrected:
+            msg = "There are no corrected records to reprocess"
+            messagebox.showinfo(title=_action, message=msg, parent=self)
+            return
+        logging.debug(msg=f"Start thread {_action}")
+        self.reprocess_btn.config(state=tk.DISABLED)
+        self.progress_bar.config(value=0, maximum=corrected)
+        _job = job_runner.get_runner(job_runner.BACKEND_THREAD).submit(
+            self._controller.reprocess_import_rejects,
+            args=(self._run_id,),
+            name=THREAD_REPROCESS,
+            metrics=metrics.MetricsRegistry(name=THREAD_REPROCESS),
+            progress=ProgressChannel(total=corrected),
+        )
+        self.watch_thread(_job, self.show_progress, self.monitor_thread)
+
+    def show_progress(
+        self,
+        thread: Job,
+        state: progress.ProgressState | None,
+        events: list[progress.ProgressEvent],
+    ) -> None:
+        """Show the progress drained from the worker channel"""
+        if state is None:
+            return
+        self.progress_bar.config(value=state.done)
+        self.setvar(
+            name=VAR_MESSAGE,
+            value=f"{thread.name}: {state.done:,d} of {state.total:,d}...",
+        )
+
+    def monitor_thread(self, thread: Job) -> None:
+        _action = thread.name
+        logging.debug(msg=f"Thread {_action} terminated")
+        if thread.metrics is not None:
+            logging.info(msg=thread.metrics.summary())
+        self.reprocess_btn.config(state=tk.NORMAL)
+        self.progress_bar.config(value=0)
+        if thread.exception is not None:
+            self.setvar(name=VAR_MESSAGE, value=f"{_action}... Error!")
+            msg = MSG_ERROR_TEMPLATE.format(_action, repr(thread.exception))
+            messagebox.showerror(title=_action, message=msg, parent=self)
+            return
+        reprocessed, rejected = thread.result
+        msg = MSG_SUCCESS_TEMPLATE.format(_action)
+        logging.info(msg=f"{msg}: {reprocessed=}, {rejected=}")
+        msg += f"\n\nImported: {reprocessed:,d}\nStill rejected: {rejected:,d}"
+        messagebox.showinfo(title=_action, message=msg, parent=self)
+        self.result = "Ok"
+        self.load_runs()
+
+    def export_rejects(self) -> None:
+        """Export the rejects matching the filters to a csv file"""
+        if self._run_id is None:
+            return
+        _action = "Export rejects"
+        file_path = filedialog.asksaveasfilename(
+            parent=self,
+            defaultextension=".csv",
+            filetypes=[("CSV file (*.csv)", "*.csv")],
+            initialfile=f"rejects_{self._run_id}.csv",
+            title="Export rejected records",
+        )
+        if not file_path:
+            return
+        try:
+            rejects = self._controller.get_import_rejects(
+                self._run_id, **self._filters()
+            )
+            fields = list(dict.fromkeys(k for r in rejects for k in r["data"]))
+            with open(file_path, mode="wt", encoding="utf-8", newline="") as f:
+                writer = csv.writer(f, delimiter=",", quoting=csv.QUOTE_MINIMAL)
+                writer.writerow(["id", *fields, "stage", "error", "status", "message"])
+                for _reject in rejects:
+                    writer.writerow(
+                        [
+                            _reject["id"],
+                            *(_reject["data"].get(field) for field in fields),
+                            _reject["stage"],
+                            _reject["error_code"],
+                            _reject["status"],
+                            _reject["error_message"],
+                        ]
+                    )
+        except Exception as e:
+            self._show_error(_action, e)
+            return
+        logging.info(msg=f"{_action}: {file_path=}, rejects={len(rejects):,d}")
+        self.setvar(name=VAR_MESSAGE, value=f"{_action}... {len(rejects):,d} record(s)")
+
+
+class RejectEditDialog(BaseDialog):
+    """Correct the source record of a reject
+
+    Args:
+        BaseDialog (_type_): base dialog
+    """
+
+    def body(self, master):
+        self.resizable(0, 0)
+        body_frm = ttk.Frame(master=master, padding=10)
+        body_frm.pack(fill=tk.BOTH, expand=tk.YES)
+
+        _reject = self._args["reject"]
+        lbl = ttk.Label(
+            master=body_frm,
+            text=_reject["error_message"],
+            wraplength=400,
+            padding=(0, 0, 0, 10),
+        )
+        lbl.pack(side=tk.TOP, fill=tk.X)
+
+        self._vars = {}
+        frm = ttk.Frame(master=body_frm)
+        frm.pack(side=tk.TOP, fill=tk.BOTH, expand=tk.YES)
+        for row, (key, value) in enumerate(_reject["data"].items()):
+            lbl = ttk.Label(master=frm, text=str(key).replace("_", " ").title())
+            lbl.grid(row=row, column=0, sticky="w", padx=(0, 10), pady=2)
+            var = tk.StringVar(self, value="" if value is None else str(value))
+            ent = ttk.Entry(master=frm, textvariable=var, width=40)
+            ent.grid(row=row, column=1, sticky="we", pady=2)
+            self._vars[key] = var
+
+    def validate(self) -> bool:
+        # The model validates the record when it is reprocessed
+        data = self._args["reject"]["data"]
+        self.result = {
+            key: (None if var.get() == "" and data[key] is None else var.get())
+            for key, var in self._vars.items()
+        }
+        return True
@@ -4,9 +4,16 @@ _Description_
 """
 
 # Built-in/Generic Imports
+import re
+import sys
+import threading
 import tkinter as tk
 import tkinter.ttk as ttk
-from datetime import datetime
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Sequence
+from datetime import date, datetime
+from itertools import islice
 from math import ceil
 from tkinter import Grid, Pack, Place, font
 from typing import Any, Dict, List, Union
@@ -19,6 +26,69 @@ DOW_NARROW = "⬇"
 ASCENDING = 0
 DESCENDING = 1
 
+SEARCH_DELAY = 300  # ms of typing pause before searching
+SEARCH_POLL = 20  # ms between checks of the search worker result
+SEARCH_SEPARATOR = "\x1f"  # joins the cells of a search key
+
+EXPORT_CHUNK_SIZE = 2000  # rows written per chunk by the export worker
+EXPORT_POLL = 100  # ms between checks of the export progress
+EXPORT_EVENT = "<<TableviewExport>>"  # generated on export progress
+PAGE_POLL = 20  # ms between checks of the datasource page worker result
+PAGE_EVENT = "<<TableviewPage>>"  # generated when a datasource page is loaded
+
+# sort keys are (rank, value): 0 = typed value, 1 = value not matching
+#   the column datatype, 2 = empty; so mixed values always compare
+EMPTY_KEY = (2, "")
+
+
+def _to_date(value) -> date:
+    """Convert a date, datetime or ISO string to a date"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value).strip()[:10])
+
+
+def _typed_sort_key(convert):
+    """Return a sort key function converting the values with convert"""
+
+    def key(value):
+        if value is None or value == "":
+            return EMPTY_KEY
+        try:
+            return (0, convert(value))
+        except (TypeError, ValueError):
+            return (1, str(value))
+
+    return key
+
+
+def _auto_sort_key(value):
+    """Sort key of an untyped column: numbers first, then text"""
+    if value is None or value == "":
+        return EMPTY_KEY
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (0, value)
+    return (1, str(value))
+
+
+SORT_KEYS = {
+    "str": _typed_sort_key(lambda value: str(value).casefold()),
+    "int": _typed_sort_key(int),
+    "float": _typed_sort_key(float),
+    "date": _typed_sort_key(_to_date),
+}
+
+FILTER_OPERATORS = ("==", "!=", "<", "<=", ">", ">=", "empty", "present")
+FILTER_SEPARATOR = re.compile(r"\s*;\s*|\s+and\s+", re.IGNORECASE)
+FILTER_COMPARISON = re.compile(
+    r"^(?P<column>.+?)\s*(?P<operator>==|!=|<=|>=|=|<|>)\s*(?P<value>.*)$"
+)
+FILTER_EMPTY = re.compile(
+    r"^(?P<column>.+?)\s+(?P<operator>empty|present)$", re.IGNORECASE
+)
+
 
 class TableColumn:
     """Represents a column in a Tableview object"""
@@ -34,6 +104,7 @@ class TableColumn:
         width=200,
         minwidth=20,
         stretch=False,
+        datatype=None,
     ):
         """
         Parameters:
@@ -67,11 +138,17 @@ class TableColumn:
                 Specifies whether or not the column width should be
                 adjusted whenever the widget is resized or the user
                 drags the column separator.
+
+            datatype (str):
+                The type used to sort the column values. One of
+                "str", "int", "float", "date". If None, numbers are
+                sorted before text.
         """
         self._table = tableview
         self._cid = cid
         self._headertext = text
         self._sort = ASCENDING
+        self._datatype = datatype
         self._settings_column = {}
         self._settings_heading = {}
 
@@ -108,6 +185,16 @@ class TableColumn:
     def columnsort(self, value):
         self._sort = value
 
+    @property
+    def datatype(self):
+        """The type used to sort the column values"""
+        return self._datatype
+
+    @datatype.setter
+    def datatype(self, value):
+        self._datatype = value
+        self._table._indexes.pop(self._cid, None)
+
     @property
     def cid(self):
         """A unique column identifier"""
@@ -196,8 +283,8 @@ class TableColumn:
         if index is None:
             return
 
-        for row in self._table.tablerows:
-            row.values.pop(index)
+        self._table._store.pop_column(index)
+        for row in self._table.tablerows_visible:
             row.refresh()
 
         # actual columns
@@ -241,12 +328,258 @@ class TableColumn:
         self._settings_column.pop("id")
 
 
+class TableStore:
+    """Columnar storage for the rows of a Tableview.
+
+    Values are kept in one list per column and a row is identified by
+    its row id (rid), the position of its values in the column lists.
+    String values are interned so repeated values (cities, provinces,
+    dates, ...) are stored once. Deleted rows leave a hole until the
+    store is cleared.
+    """
+
+    def __init__(self):
+        self.columns: List[list] = []
+        self.version = 0  # incremented on every change of the data
+        self.generation = 0  # incremented on clear, when row ids restart
+        self._alive = bytearray()
+        self._count = 0
+        self._searchkeys = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def size(self):
+        """The number of row ids allocated, deleted rows included"""
+        return len(self._alive)
+
+    @property
+    def width(self):
+        """The number of columns"""
+        return len(self.columns)
+
+    def is_alive(self, rid):
+        """Indicates whether the row id refers to a row not deleted"""
+        return 0 <= rid < len(self._alive) and self._alive[rid] == 1
+
+    def append(self, values) -> int:
+        """Append a row and return its row id"""
+        return self.extend([values]).start
+
+    def extend(self, rowdata) -> range:
+        """Append rows and return the range of their row ids"""
+        start = len(self._alive)
+        columns = self.columns
+        intern = sys.intern
+        for values in rowdata:
+            if len(values) > len(columns):
+                self.ensure_width(len(values))
+            width = len(columns)
+            i = -1
+            for i, value in enumerate(values):
+                columns[i].append(intern(value) if type(value) is str else value)
+            for i in range(i + 1, width):
+                columns[i].append("")
+            self._alive.append(1)
+        added = len(self._alive) - start
+        self._count += added
+        with self._lock:
+            self.version += 1
+            if self._searchkeys is not None:
+                self._searchkeys.extend(
+                    self.search_key(rid) for rid in range(start, start + added)
+                )
+        return range(start, start + added)
+
+    def row(self, rid) -> list:
+        """Return the values of a row"""
+        return [column[rid] for column in self.columns]
+
+    def value(self, rid, index):
+        """Return the value of a row in the column at index"""
+        return self.columns[index][rid]
+
+    def set_row(self, rid, values):
+        """Replace the values of a row"""
+        if len(values) > len(self.columns):
+            self.ensure_width(len(values))
+        values = list(values) + [""] * (len(self.columns) - len(values))
+        for column, value in zip(self.columns, values):
+            column[rid] = sys.intern(value) if type(value) is str else value
+        with self._lock:
+            self.version += 1
+            if self._searchkeys is not None:
+                self._searchkeys[rid] = self.search_key(rid)
+
+    def delete(self, rids):
+        """Delete rows; their row ids are not reused"""
+        for rid in rids:
+            if self._alive[rid]:
+                self._alive[rid] = 0
+                self._count -= 1
+                for column in self.columns:
+                    column[rid] = None
+        self._touch()
+
+    def clear(self):
+        """Delete all rows"""
+        for column in self.columns:
+            column.clear()
+        self._alive = bytearray()
+        self._count = 0
+        self.generation += 1
+        self._touch(invalidate=True)
+
+    def ensure_width(self, width, fillvalue=""):
+        """Add columns, filled with fillvalue, up to width"""
+        if len(self.columns) >= width:
+            return
+        while len(self.columns) < width:
+            self.columns.append([fillvalue] * len(self._alive))
+        self._touch(invalidate=True)
+
+    def pop_column(self, index):
+        """Remove the column at index"""
+        if index < len(self.columns):
+            self.columns.pop(index)
+            self._touch(invalidate=True)
+
+    def search_key(self, rid) -> str:
+        """Return the lower-cased search key of a row"""
+        return SEARCH_SEPARATOR.join(str(column[rid]).lower() for column in self.columns)
+
+    def search_keys(self) -> List[str]:
+        """Return the search keys indexed by row id.
+
+        The keys are built on first use and then kept up to date by the
+        store changes. The method can run in a worker thread: keys built
+        while the data changed are returned but not kept.
+        """
+        keys = self._searchkeys
+        if keys is None:
+            version = self.version
+            keys = [self.search_key(rid) for rid in range(len(self._alive))]
+            with self._lock:
+                if version == self.version:
+                    self._searchkeys = keys
+        return keys
+
+    def _touch(self, invalidate=False):
+        """Mark the data as changed"""
+        with self._lock:
+            self.version += 1
+            if invalidate:
+                self._searchkeys = None
+
+
+class ColumnIndex:
+    """Row ids of a column sorted by their typed sort key.
+
+    The index answers equality and range predicates with a binary
+    search on the keys and is also the ascending sort order of the
+    column. It is built from the store values and is valid for the
+    store version it was built for.
+    """
+
+    __slots__ = ("version", "keys", "rids")
+
+    def __init__(self, values, rids, key, version):
+        """
+        Parameters:
+
+            values (list):
+                The column values indexed by row id.
+
+            rids (Iterable[int]):
+                The row ids to index.
+
+            key (Callable):
+                The sort key of the column values.
+
+            version (int):
+                The store version of the values.
+        """
+        rowkeys = [key(value) for value in values]
+        self.version = version
+        self.rids = array("q", sorted(rids, key=rowkeys.__getitem__))
+        self.keys = [rowkeys[rid] for rid in self.rids]
+
+    def match(self, operator, key) -> array:
+        """Return the row ids matching a predicate, in key order.
+
+        Range operators only match keys of the same rank, so empty
+        values and values not matching the column type are excluded.
+
+        Parameters:
+
+            operator (str):
+                One of the FILTER_OPERATORS.
+
+            key (tuple):
+                The sort key of the value to compare with.
+        """
+        keys, rids = self.keys, self.rids
+        if operator == "empty":
+            return rids[bisect_left(keys, EMPTY_KEY) :]
+        if operator == "present":
+            return rids[: bisect_left(keys, EMPTY_KEY)]
+
+        lo = bisect_left(keys, key)
+        hi = bisect_right(keys, key, lo)
+        if operator == "==":
+            return rids[lo:hi]
+        if operator == "!=":
+            return rids[:lo] + rids[hi:]
+
+        rank_lo = bisect_left(keys, key[:1], 0, lo)
+        rank_hi = bisect_left(keys, (key[0] + 1,), hi)
+        if operator == "<":
+            return rids[rank_lo:lo]
+        if operator == "<=":
+            return rids[rank_lo:hi]
+        if operator == ">":
+            return rids[hi:rank_hi]
+        if operator == ">=":
+            return rids[lo:rank_hi]
+        raise ValueError(f"Unknown filter operator: {operator}")
+
+
+class TableRowSequence(Sequence):
+    """Read-only sequence of TableRow produced on demand from row ids"""
+
+    def __init__(self, tableview, rids):
+        self._table = tableview
+        self._rids = rids
+
+    def __len__(self):
+        return len(self._rids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._table._row(rid) for rid in self._rids[index]]
+        return self._table._row(self._rids[index])
+
+    def __iter__(self):
+        row = self._table._row
+        for rid in self._rids:
+            yield row(rid)
+
+    def __contains__(self, row):
+        return isinstance(row, TableRow) and row._rid in self._rids
+
+
 class TableRow:
-    """Represents a row in a Tableview object"""
+    """Represents a row in a Tableview object.
+
+    A TableRow is a lightweight proxy to a row of the tableview store;
+    the values are read from and written to the store.
+    """
 
-    _cnt = 0
+    __slots__ = ("view", "_table", "_rid")
 
-    def __init__(self, tableview, values):
+    def __init__(self, tableview, values=None, rid=None):
         """
         Parameters:
 
@@ -254,25 +587,50 @@ class TableRow:
                 The Tableview widget that contains this row
 
             values (List[Any, ...]):
-                A list of values to display in the row
+                A list of values to display in the row; the values are
+                appended to the tableview store
+
+            rid (int):
+                The row id of an existing row of the tableview store
         """
         self.view: ttk.Treeview = tableview.view
-        self._values = list(values)
-        self._iid = None
-        self._sort = TableRow._cnt + 1
         self._table = tableview
+        if rid is None:
+            rid = tableview._store.append(list(values or []))
+        self._rid = rid
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, TableRow)
+            and other._table is self._table
+            and other._rid == self._rid
+        )
+
+    def __hash__(self):
+        return hash(self._rid)
+
+    @property
+    def rid(self):
+        """The row id in the tableview store"""
+        return self._rid
 
-        # increment cnt
-        TableRow._cnt += 1
+    @property
+    def _sort(self):
+        """The original insert position (1-based)"""
+        return self._rid + 1
+
+    @property
+    def _iid(self):
+        return self._table._rowitems.get(self._rid)
 
     @property
     def values(self):
         """The table row values"""
-        return self._values
+        return self._table._store.row(self._rid)
 
     @values.setter
     def values(self, values):
-        self._values = values
+        self._table._store.set_row(self._rid, values)
         self.refresh()
 
     @property
@@ -299,11 +657,13 @@ class TableRow:
             self.build()
 
         if opt is not None:
+            if self._iid is None:
+                return
             return self.view.item(self.iid, opt)
         elif "values" in kwargs:
             values = kwargs.pop("values")
             self.values = values
-        else:
+        elif self._iid is not None:
             self.view.item(self.iid, **kwargs)
 
     def show(self, striped=False):
@@ -326,29 +686,31 @@ class TableRow:
 
     def delete(self):
         """Delete the row from the dataset"""
-        if self.iid:
-            self._table.iidmap.pop(self.iid)
-            self._table.tablerows_visible.remove(self)
-            self._table._tablerows.remove(self)
-            self._table.load_table_data()
-            self.view.delete(self.iid)
+        self._table._delete_rows_data([self._rid])
 
     def hide(self):
         """Remove the row from the data table view"""
-        self.view.detach(self.iid)
+        if self._iid is not None:
+            self.view.detach(self.iid)
 
     def refresh(self):
         """Syncs the tableview values with the object values"""
-        if self._iid:
+        if self._iid is not None:
             self.view.item(self.iid, values=self.values)
 
     def build(self):
         """Create the row object in the `Treeview` and capture
         the resulting item id (iid).
+
+        In virtual mode rows never own an item: the tableview assigns
+        a recycled item of its pool while the row is on the current page.
         """
+        if self._table._virtual:
+            return
         if self._iid is None:
-            self._iid = self.view.insert("", tk.END, values=self.values)
-            self._table.iidmap[self.iid] = self
+            iid = self.view.insert("", tk.END, values=self.values)
+            self._table._rowitems[self._rid] = iid
+            self._table.iidmap[iid] = self
 
 
 class TableEvent:
@@ -373,6 +735,21 @@ class Tableview(ttk.Frame):
     to be loaded very quickly even with hundreds of thousands of
     records.
 
+    With the virtual option the Treeview holds a fixed pool of items,
+    as many as the rows of one page; on page change the pool items are
+    updated in place with the values of the rows of the new page, so the
+    number of Tk items does not grow while the user pages through the
+    data.
+
+    Row values are kept in a columnar `TableStore` and the table order,
+    the filtered rows and the sort results are arrays of integer row ids;
+    `TableRow` objects are lightweight proxies created on demand.
+
+    With a datasource the rows are not loaded at all: every page is
+    requested to the datasource, and sorting, searching and filtering
+    are passed to it. The store then holds the rows of the current page
+    only.
+
     All table columns are sortable. Clicking a column header will toggle
     between sorting "ascending" and "descending".
 
@@ -443,6 +820,8 @@ class Tableview(ttk.Frame):
         pagesize=10,
         height=10,
         delimiter=",",
+        virtual=False,
+        datasource=None,
     ):
         """
         Parameters:
@@ -515,11 +894,25 @@ class Tableview(ttk.Frame):
             delimiter (str):
                 The character to use as a delimiter when exporting data
                 to CSV.
+
+            virtual (bool):
+                If `True`, rows are displayed by recycling a pool of
+                Treeview items instead of creating one item per row.
+                The `iid` of a row is the pool item showing it and is
+                only valid while the row is on the current page. Use it
+                together with `paginated=True`.
+
+            datasource (Any):
+                An object serving the table pages, see `set_datasource`.
+                The rowdata is ignored and the Treeview items are
+                recycled as with `virtual=True`.
         """
         super().__init__(master)
         self._tablecols = []
-        self._tablerows = []
-        self._tablerows_filtered = []
+        self._store = TableStore()
+        self._rids = array("q")  # row ids of all rows, in table order
+        self._rids_filtered = array("q")  # row ids of the filtered rows
+        self._rowitems = {}  # maps row id to iid
         self._viewdata = []
         self._rowindex = tk.IntVar(value=0)
         self._pageindex = tk.IntVar(value=1)
@@ -538,19 +931,40 @@ class Tableview(ttk.Frame):
         self._delimiter = delimiter
         self._iidmap = {}  # maps iid to row object
         self._cidmap = {}  # maps cid to col object
+        self._virtual = virtual or datasource is not None
+        self._virtualmode = virtual  # the virtual option without datasource
+        self._datasource = datasource
+        self._datasort = None  # (column index, descending) of the datasource
+        self._rowcount = 0  # rows matching the datasource query
+        self._pagetoken = 0  # identifies the latest datasource page request
+        self._pageresults = {}  # token -> (rowcount, page start, limit, rows, error)
+        self._pagerequest = None  # (token, query) waiting for the page worker
+        self._pagelock = threading.Lock()  # guards the request and the worker
+        self._pageworker = None  # worker thread of the datasource pages
+        self._pageerror = None  # error of the last datasource page request
+        self._itempool = []  # recycled Treeview items (virtual mode)
+        self._searchjob = None  # pending debounced search
+        self._searchtoken = 0  # identifies the latest search request
+        self._searchresults = {}  # token -> (version, criteria, rids)
+        self._searchcache = None  # (criteria, version, rids) last search
+        self._selected = {}  # selected row ids, in selection order
+        self._indexes = {}  # cid -> ColumnIndex, sort order and filters
+        self._filters = []  # (cid, operator, value) of the column filter
+        self._export = None  # progress of the running or last export
+        self._exportstop = None  # stop event of the running export
 
         self.view: ttk.Treeview = None
         self._build_tableview_widget(coldata, rowdata)
 
     @property
     def tablerows(self):
-        """A list of all tablerow objects"""
-        return self._tablerows
+        """A sequence of all tablerow objects"""
+        return TableRowSequence(self, self._rids)
 
     @property
     def tablerows_filtered(self):
-        """A list of filtered tablerow objects"""
-        return self._tablerows_filtered
+        """A sequence of filtered tablerow objects"""
+        return TableRowSequence(self, self._rids_filtered)
 
     @property
     def tablerows_visible(self):
@@ -574,6 +988,68 @@ class Tableview(ttk.Frame):
             columns.append(self.cidmap.get(int(cid)))
         return columns
 
+    @property
+    def datasource(self):
+        """The object serving the table pages, None for in-memory rows"""
+        return self._datasource
+
+    @property
+    def page_error(self):
+        """The error of the last datasource page request, None if the
+        page was loaded"""
+        return self._pageerror
+
+    @property
+    def rowcount(self) -> int:
+        """The number of rows of the table, after filters and search"""
+        if self._datasource is not None:
+            return self._rowcount
+        if self._filtered:
+            return len(self._rids_filtered)
+        return len(self._rids)
+
+    def set_datasource(self, datasource):
+        """Serve the table pages from a datasource, or from the in-memory
+        rows when datasource is None. The table rows are cleared.
+
+        The datasource must implement:
+
+        - `count(search, filters) -> int`, the rows matching the query;
+        - `page(offset, limit, sort, search, filters) -> List[list]`,
+          the row values of one page.
+
+        The sort is None or a (column index, descending) tuple, search
+        is the search criteria and filters are (column index, operator,
+        value) predicates, see `filter_rows`.
+
+        The exports read the rows with the optional
+        `iter_rows(sort, search, filters, chunk_size) -> Iterator[list]`,
+        called from a worker thread; without it they request pages.
+
+        The pages are requested from a worker thread, so `count` and
+        `page` must be thread safe; the page is shown when ready and
+        PAGE_EVENT is generated (see `page_error`). The optional
+        `check_filters(filters)` validates the filters on the caller
+        thread, raising ValueError, before they are applied.
+
+        Parameters:
+
+            datasource (Any):
+                The object serving the table pages, or None.
+        """
+        self._datasource = None
+        self._pagetoken += 1  # drop the pending page requests
+        with self._pagelock:
+            self._pagerequest = None
+        self._pageresults.clear()
+        self._pageerror = None
+        self.delete_rows()
+        self._datasource = datasource
+        self._virtual = self._virtualmode or datasource is not None
+        self._datasort = None
+        self._rowcount = 0
+        self.reset_table()
+
     @property
     def is_filtered(self):
         """Indicates whether the table is currently filtered"""
@@ -598,6 +1074,36 @@ class Tableview(ttk.Frame):
     def pagesize(self, value):
         self._pagesize.set(value)
 
+    @property
+    def selected_rids(self):
+        """A set-like view of the row ids currently selected"""
+        return self._selected.keys()
+
+    @property
+    def selected_rows(self) -> List[TableRow]:
+        """A list of the tablerow objects currently selected"""
+        return [self._row(rid) for rid in self._selected]
+
+    @property
+    def selection_count(self) -> int:
+        """The number of rows currently selected"""
+        return len(self._selected)
+
+    def is_selected(self, row) -> bool:
+        """Indicates whether a row is currently selected.
+
+        Parameters:
+
+            row (TableRow):
+                The table row object.
+
+        Returns:
+
+            bool:
+                True if the row is selected.
+        """
+        return row.rid in self._selected
+
     @property
     def iidmap(self) -> Dict[str, TableRow]:
         """A map of iid to tablerow object"""
@@ -671,9 +1177,9 @@ class Tableview(ttk.Frame):
                 # a dictionary of column settings
                 self.insert_column(i, **col)
 
-        # build the table rows
-        for values in rowdata:
-            self.insert_row(values=values)
+        # build the table rows; a datasource serves its own rows
+        if self._datasource is None:
+            self.insert_rows(tk.END, rowdata)
 
         # load the table data
         self.load_table_data()
@@ -717,7 +1223,7 @@ class Tableview(ttk.Frame):
             TableRow:
                 A table row object.
         """
-        rowcount = len(self._tablerows)
+        rowcount = len(self._rids)
 
         # validate the index
         if len(values) == 0:
@@ -729,9 +1235,9 @@ class Tableview(ttk.Frame):
 
         record = TableRow(self, values)
         if rowcount == 0 or index == -1:
-            self._tablerows.append(record)
+            self._rids.append(record.rid)
         else:
-            self._tablerows.insert(index, record)
+            self._rids.insert(index, record.rid)
 
         return record
 
@@ -760,11 +1266,14 @@ class Tableview(ttk.Frame):
         """
         if len(rowdata) == 0:
             return
-        if sort == 0:
-            for values in rowdata:
-                self.insert_row(index, values)
+        if sort != 0:
+            rowdata = list(reversed(rowdata))
+        if index == tk.END or index > len(self._rids) - 1:
+            # bulk append into the columnar store
+            rids = self._store.extend(row for row in rowdata if len(row) > 0)
+            self._rids.extend(rids)
         else:
-            for values in reversed(rowdata):
+            for values in rowdata:
                 self.insert_row(index, values)
 
     def delete_column(self, index=None, cid=None, visible=True):
@@ -872,30 +1381,53 @@ class Tableview(ttk.Frame):
                 record.delete()
             # original index
             else:
-                for record in self.tablerows:
-                    if record._sort == index:
-                        record.delete()
+                self._delete_rows_data([index - 1])
 
-    def delete_rows(self, indices=None, iids=None, visible=True):
-        """Delete rows specified by indices or iids.
+    def delete_rows(self, indices=None, iids=None, visible=True, rids=None):
+        """Delete rows specified by indices, iids or row ids.
 
-        If both indices and iids are None, then all records in the
+        The rows are removed in one pass and the page is reloaded once.
+        If indices, iids and rids are None, then all records in the
         table will be deleted.
+
+        Parameters:
+
+            indices (List[int]):
+                Record indices, relative to the visible records unless
+                visible is False (original insert position, 1-based).
+
+            iids (List[str]):
+                Unique record identifiers.
+
+            visible (bool):
+                Indicates that the indices are relative to the current
+                records in view.
+
+            rids (Iterable[int]):
+                Row ids in the tableview store.
         """
-        # remove records by iid
-        if iids is not None:
-            for iid in iids:
-                self.delete_row(iid=iid)
-        # remove records by index
-        elif indices is not None:
-            for index in indices:
-                self.delete_row(index=index, visible=visible)
+        # iids and indices are resolved to row ids first as virtual
+        #   items are recycled on every reload
+        if rids is None and iids is not None:
+            rids = [self.iidmap[iid].rid for iid in iids if iid in self.iidmap]
+        elif rids is None and indices is not None:
+            if visible:
+                rids = [self._viewdata[index].rid for index in indices]
+            else:
+                rids = [index - 1 for index in indices]
+
+        if rids is not None:
+            self._delete_rows_data(rids)
         # remove ALL records
         else:
-            self._tablerows.clear()
-            self._tablerows_filtered.clear()
+            self._store.clear()
+            self._rids = array("q")
+            self._rids_filtered = array("q")
             self._viewdata.clear()
             self._iidmap.clear()
+            self._rowitems.clear()
+            self._itempool.clear()
+            self._selected.clear()
             records = self.view.get_children()
             self.view.delete(*records)
         # route to new page if no records visible
@@ -912,6 +1444,7 @@ class Tableview(ttk.Frame):
         width=200,
         minwidth=20,
         stretch=False,
+        datatype=None,
     ) -> TableColumn:
         """
         Parameters:
@@ -947,6 +1480,10 @@ class Tableview(ttk.Frame):
                 adjusted whenever the widget is resized or the user
                 drags the column separator.
 
+            datatype (str):
+                The type used to sort the column values. One of
+                "str", "int", "float", "date".
+
         Returns:
 
             TableColumn:
@@ -994,6 +1531,7 @@ class Tableview(ttk.Frame):
             width=width,
             minwidth=minwidth,
             stretch=stretch,
+            datatype=datatype,
         )
         self._tablecols.append(column)
         # must be called to show the header after initially creating it
@@ -1016,13 +1554,21 @@ class Tableview(ttk.Frame):
         """
         self.delete_rows()
         self.cidmap.clear()
+        self._indexes.clear()
+        self._filters = []
         self.tablecolumns.clear()
         self.view.configure(columns=[], displaycolumns=[])
 
     def unload_table_data(self):
         """Unload all data from the table"""
-        for row in self.tablerows_visible:
-            row.hide()
+        if self._virtual:
+            for row in self.tablerows_visible:
+                self._iidmap.pop(self._rowitems.pop(row._rid, None), None)
+            if self._itempool:
+                self.view.detach(*self._itempool)
+        else:
+            for row in self.tablerows_visible:
+                row.hide()
         self.tablerows_visible.clear()
 
     def load_table_data(self, clear_filters=False):
@@ -1034,12 +1580,18 @@ class Tableview(ttk.Frame):
                 Specifies that the table filters should be cleared
                 before loading the data into the view.
         """
-        if len(self.tablerows) == 0:
-            return
-
         if clear_filters:
             self.reset_table()
 
+        if self._datasource is not None:
+            self._load_datasource_page()
+            return
+
+        if len(self._rids) == 0:
+            self.unload_table_data()
+            self._selected.clear()
+            return
+
         self.unload_table_data()
 
         if self._paginated:
@@ -1047,14 +1599,14 @@ class Tableview(ttk.Frame):
             page_end = self._rowindex.get() + self._pagesize.get()
         else:
             page_start = 0
-            page_end = len(self._tablerows)
+            page_end = len(self._rids)
 
         if self._filtered:
-            rowdata = self._tablerows_filtered[page_start:page_end]
-            rowcount = len(self._tablerows_filtered)
+            rids = self._rids_filtered
         else:
-            rowdata = self._tablerows[page_start:page_end]
-            rowcount = len(self._tablerows)
+            rids = self._rids
+        rowdata = [self._row(rid) for rid in rids[page_start:page_end]]
+        rowcount = len(rids)
 
         self._pagelimit.set(ceil(rowcount / self._pagesize.get()))
 
@@ -1062,13 +1614,244 @@ class Tableview(ttk.Frame):
         pagelimit = self._pagelimit.get()
         self._pageindex.set(min([pagelimit, pageindex]))
 
-        for i, row in enumerate(rowdata):
-            if self._stripecolor is not None and i % 2 == 0:
-                row.show(True)
+        self._show_page(rowdata)
+
+    def _show_page(self, rowdata):
+        """Show the rows of the current page.
+
+        Parameters:
+
+            rowdata (List[TableRow]):
+                The rows of the current page.
+        """
+        if self._virtual:
+            self._load_virtual_page(rowdata)
+        else:
+            for i, row in enumerate(rowdata):
+                if self._stripecolor is not None and i % 2 == 0:
+                    row.show(True)
+                else:
+                    row.show(False)
+                self._viewdata.append(row)
+        self._restore_selection()
+
+    def _load_datasource_page(self, then=None):
+        """Request the current page to the datasource in a worker
+        thread; the current page stays in view until the new one is
+        ready (see `_datasource_poll`). The worker serves only the
+        latest request: the ones replaced while it is busy are never
+        queried.
+
+        Parameters:
+
+            then (Callable):
+                Called without arguments once the new page is shown.
+        """
+        self._pagetoken += 1
+        token = self._pagetoken
+        query = (
+            self._datasource,
+            self._rowindex.get(),
+            self._pagesize.get(),
+            self._paginated,
+            self._datasort,
+            self.searchcriteria,
+            self._datasource_filters(),
+        )
+        with self._pagelock:
+            self._pagerequest = (token, query)
+            if self._pageworker is None:
+                self._pageworker = threading.Thread(
+                    target=self._datasource_worker, daemon=True
+                )
+                self._pageworker.start()
+        self.after(PAGE_POLL, self._datasource_poll, token, then)
+
+    def _datasource_worker(self):
+        """Serve the latest page request until none is left (worker
+        thread)"""
+        while True:
+            with self._pagelock:
+                request, self._pagerequest = self._pagerequest, None
+                if request is None:
+                    self._pageworker = None
+                    return
+            token, query = request
+            result = self._datasource_query(token, *query)
+            if result is not None and token == self._pagetoken:
+                self._pageresults[token] = result
+
+    def _datasource_query(
+        self, token, datasource, rowindex, pagesize, paginated, sort, search, filters
+    ):
+        """Count the rows and read the page of the query, None when a
+        newer page was requested in the meantime"""
+        try:
+            rowcount = datasource.count(search, filters)
+            if token != self._pagetoken:
+                return None
+            if paginated:
+                # stay on the last page when rows were removed
+                lastpage = max(ceil(rowcount / pagesize) - 1, 0)
+                page_start = min(rowindex, lastpage * pagesize)
+                limit = pagesize
             else:
-                row.show(False)
+                page_start = 0
+                limit = rowcount
+            rows = datasource.page(page_start, limit, sort, search, filters)
+            return (rowcount, page_start, limit, rows, None)
+        except Exception as e:
+            return (0, rowindex, pagesize, [], e)
+
+    def _datasource_poll(self, token, then=None):
+        """Show the datasource page when the worker is done. The store
+        is refilled with the rows of the page."""
+        if token != self._pagetoken:
+            return  # a newer page was requested
+        result = self._pageresults.pop(token, None)
+        if result is None:
+            self.after(PAGE_POLL, self._datasource_poll, token, then)
+            return
+
+        self._pageresults.clear()
+        rowcount, page_start, limit, rows, error = result
+        self._pageerror = error
+        if error is not None:
+            self.event_generate(PAGE_EVENT)
+            return
+
+        self.unload_table_data()
+        pagesize = self._pagesize.get()
+        self._rowindex.set(page_start)
+
+        # row ids restart on every page, so the selection does not apply
+        self._store.clear()
+        self._selected.clear()
+        self._filtered = False
+        self._rids_filtered = array("q")
+        self._rids = array("q", self._store.extend(rows))
+        self._rowcount = rowcount
+
+        self._pagelimit.set(ceil(rowcount / pagesize))
+        pageindex = ceil((page_start + limit) / pagesize)
+        self._pageindex.set(min([self._pagelimit.get(), pageindex]))
+
+        self._show_page([self._row(rid) for rid in self._rids])
+        if then is not None:
+            then()
+        self.event_generate(PAGE_EVENT)
+
+    def _datasource_filters(self, filters=None):
+        """The column filters as (column index, operator, value)"""
+        if filters is None:
+            filters = self._filters
+        return [
+            (self.cidmap[int(cid)].tableindex, operator, value)
+            for cid, operator, value in filters
+        ]
+
+    def _restore_selection(self):
+        """Keep the selection on the rows of the new page that were
+        selected, recycled virtual items would otherwise carry the
+        selection over to other rows."""
+        visible = {row._rid for row in self._viewdata}
+        rids = [rid for rid in self._selected if rid in visible]
+        self._set_selection(rids)
+
+    def _set_selection(self, rids):
+        """Select the rows in the view and in the selection set.
+
+        Parameters:
+
+            rids (Iterable[int]):
+                The row ids in the tableview store.
+        """
+        self._selected = dict.fromkeys(rids)
+        items = [self._rowitems[rid] for rid in self._selected]
+        self.view.selection_set(items)
+
+    def _on_treeview_select(self, event=None):
+        """Update the selection set when the Treeview selection
+        changes; the selection is read from Tk once per event."""
+        iidmap = self._iidmap
+        self._selected = dict.fromkeys(
+            iidmap[iid]._rid for iid in self.view.selection() if iid in iidmap
+        )
+
+    def _load_virtual_page(self, rowdata):
+        """Show the page rows by recycling the Treeview item pool.
+
+        Parameters:
+
+            rowdata (List[TableRow]):
+                The rows of the current page.
+        """
+        pool = self._itempool
+        # grow the pool up to the page size, shrink it after a page
+        #   size reduction
+        while len(pool) < len(rowdata):
+            pool.append(self.view.insert("", tk.END))
+        if self._paginated and len(pool) > self.pagesize:
+            self.view.delete(*pool[self.pagesize :])
+            del pool[self.pagesize :]
+
+        for i, row in enumerate(rowdata):
+            iid = pool[i]
+            striped = self._stripecolor is not None and i % 2 == 0
+            self.view.item(iid, values=row.values, tags=("striped",) if striped else ())
+            self.view.move(iid, "", i)
+            self._rowitems[row._rid] = iid
+            self._iidmap[iid] = row
             self._viewdata.append(row)
 
+    def _row(self, rid) -> TableRow:
+        """Return the TableRow of a row id; rows with a Treeview item
+        keep the same object.
+
+        Parameters:
+
+            rid (int):
+                The row id in the tableview store.
+        """
+        iid = self._rowitems.get(rid)
+        if iid is not None:
+            return self._iidmap[iid]
+        return TableRow(self, rid=rid)
+
+    def _delete_rows_data(self, rids):
+        """Delete rows from the store, the row orders and the view, then
+        reload the current page once.
+
+        Parameters:
+
+            rids (Iterable[int]):
+                The row ids in the tableview store.
+        """
+        rids = {rid for rid in rids if self._store.is_alive(rid)}
+        if not rids:
+            return
+
+        for rid in rids:
+            self._selected.pop(rid, None)
+
+        items = []
+        for rid in rids:
+            iid = self._rowitems.pop(rid, None)
+            if iid is not None:
+                self._iidmap.pop(iid, None)
+                items.append(iid)
+
+        self._rids = array("q", (rid for rid in self._rids if rid not in rids))
+        self._rids_filtered = array(
+            "q", (rid for rid in self._rids_filtered if rid not in rids)
+        )
+        self._store.delete(rids)
+
+        # virtual items belong to the item pool and are recycled
+        if items and not self._virtual:
+            self.view.delete(*items)
+        self.load_table_data()
+
     def fill_empty_columns(self, fillvalue=""):
         """Fill empty columns with the fillvalue.
 
@@ -1081,18 +1864,14 @@ class Tableview(ttk.Frame):
             fillvalue (Any):
                 A value to insert into an empty column
         """
-        rowcount = len(self._tablerows)
-        if rowcount == 0:
+        if len(self._rids) == 0:
             return
         colcount = len(self._tablecols)
-        for row in self._tablerows:
-            var = colcount - len(row._values)
-            if var <= 0:
-                return
-            else:
-                for _ in range(var):
-                    row._values.append(fillvalue)
-                row.configure(values=row._values)
+        if self._store.width >= colcount:
+            return
+        self._store.ensure_width(colcount, fillvalue)
+        for row in self.tablerows_visible:
+            row.refresh()
 
     # CONFIGURATION
 
@@ -1180,11 +1959,11 @@ class Tableview(ttk.Frame):
         if visible:
             return self._viewdata
         elif filtered:
-            return self._tablerows_filtered
+            return self.tablerows_filtered
         elif selected:
-            return [row for row in self._viewdata if row.iid in self.view.selection()]
+            return self.selected_rows
         else:
-            return self._tablerows
+            return self.tablerows
 
     def get_row(self, index=None, visible=False, filtered=False, iid=None) -> TableRow:
         """Returns the `TableRow` object from an index or the iid.
@@ -1242,8 +2021,9 @@ class Tableview(ttk.Frame):
 
     def _select_first_visible_item(self):
         try:
-            iid = self.tablerows_visible[0].iid
-            self.view.selection_set(iid)
+            row = self.tablerows_visible[0]
+            iid = row.iid
+            self._set_selection([row._rid])
             # must force focus, sometimes just focus on iid doesn't work
             self.view.focus_force()
             # this sets the focus on the specific row item
@@ -1329,9 +2109,9 @@ class Tableview(ttk.Frame):
 
         # update table data
         if self.is_filtered:
-            tablerows = self.tablerows_filtered
+            rids = self._rids_filtered
         else:
-            tablerows = self.tablerows
+            rids = self._rids
 
         if sort is not None:
             columnsort = sort
@@ -1343,22 +2123,36 @@ class Tableview(ttk.Frame):
         else:
             self._tablecols[index].columnsort = ASCENDING
 
-        try:
-            sortedrows = sorted(
-                tablerows, reverse=columnsort, key=lambda x: x.values[index]
-            )
-        except Exception:
-            # when data is missing, or sometimes with numbers
-            # this is still not right, but it works most of the time
-            # fix sometime down the road when I have time
-            self.fill_empty_columns()
-            sortedrows = sorted(
-                tablerows, reverse=columnsort, key=lambda x: int(x.values[index])
-            )
+        if self._datasource is not None:
+            self._datasort = (index, columnsort == DESCENDING)
+            self._rowindex.set(0)
+            self._column_sort_header_reset()
+            self._column_sort_header_update(column.cid)
+            self._load_datasource_page(then=self._select_first_visible_item)
+            return
+
+        order = self._column_index(column).rids
+        if not self.is_filtered:
+            sortedrids = order[:]
+        elif len(rids) * 8 < len(order):
+            # a small subset is faster to sort than to pick from the order
+            key = SORT_KEYS.get(column.datatype, _auto_sort_key)
+            values = self._store.columns[index]
+            sortedrids = array("q", sorted(rids, key=lambda rid: key(values[rid])))
+        else:
+            member = bytearray(self._store.size)
+            for rid in rids:
+                member[rid] = 1
+            sortedrids = array("q", (rid for rid in order if member[rid]))
+        # descending is the reversed ascending order
+        if columnsort == DESCENDING:
+            sortedrids.reverse()
+
         if self.is_filtered:
-            self._tablerows_filtered = sortedrows
+            self._rids_filtered = sortedrids
         else:
-            self._tablerows = sortedrows
+            self._rids = sortedrids
+        self._searchcache = None
 
         # update headers
         self._column_sort_header_reset()
@@ -1373,6 +2167,7 @@ class Tableview(ttk.Frame):
     def reset_row_filters(self):
         """Remove all row level filters; unhide all rows."""
         self._filtered = False
+        self._filters = []
         self.searchcriteria = ""
         self.unload_table_data()
         self.load_table_data()
@@ -1391,16 +2186,38 @@ class Tableview(ttk.Frame):
         cols = sorted([col.cid for col in self.tablecolumns_visible], key=int)
         self.view.configure(displaycolumns=cols)
 
+    def _column_index(self, column) -> ColumnIndex:
+        """Return the index of a column, built from the typed sort key
+        of the column on first use after the table data changes.
+
+        Parameters:
+
+            column (TableColumn):
+                The table column object.
+
+        Returns:
+
+            ColumnIndex:
+                The column index. Do not modify.
+        """
+        version = self._store.version
+        index = self._indexes.get(column._cid)
+        if index is None or index.version != version:
+            key = SORT_KEYS.get(column.datatype, _auto_sort_key)
+            values = self._store.columns[column.tableindex]
+            index = ColumnIndex(values, self._rids, key, version)
+            self._indexes[column._cid] = index
+        return index
+
     def reset_table(self):
         """Remove all table data filters and column sorts"""
         self._filtered = False
+        self._filters = []
+        self._datasort = None
         self.searchcriteria = ""
-        try:
-            sortedrows = sorted(self.tablerows, key=lambda x: x._sort)
-        except IndexError:
-            self.fill_empty_columns()
-            sortedrows = sorted(self.tablerows, key=lambda x: x._sort)
-        self._tablerows = sortedrows
+        # row ids follow the original insert order
+        self._rids = array("q", sorted(self._rids))
+        self._searchcache = None
         self.unload_table_data()
 
         # reset the columns
@@ -1431,62 +2248,178 @@ class Tableview(ttk.Frame):
             eo = self._get_event_objects(event)
             index = eo.column.tableindex
             value = value or eo.row.values[index]
-        elif cid is not None:
-            column: TableColumn = self.cidmap.get(cid)
-            index = column.tableindex
-        else:
+            cid = eo.column._cid
+        elif cid is None:
             return
 
-        self._filtered = True
-        self.tablerows_filtered.clear()
-        self.unload_table_data()
+        self.filter_rows([(cid, "==", value)])
+
+    @property
+    def filters(self) -> List[tuple]:
+        """The (cid, operator, value) predicates of the column filter"""
+        return list(self._filters)
+
+    def filter_rows(self, filters):
+        """Hide all records except for records matching all the
+        filters. The rows are found in the column indexes, built once
+        per data change, and intersected; the table order is kept. With
+        a datasource the filters are passed to it.
+
+        Parameters:
+
+            filters (Iterable[tuple]):
+                The (cid, operator, value) predicates. The operator is
+                one of "==", "!=", "<", "<=", ">", ">=", "empty",
+                "present"; values are compared with the column
+                datatype. An empty list removes the filter.
+
+        Raises:
 
-        for row in self.tablerows:
-            if row.values[index] == value:
-                self.tablerows_filtered.append(row)
+            ValueError:
+                The column, the operator or a range value is not valid.
+        """
+        filters = list(filters)
+        if not filters:
+            self.reset_row_filters()
+            return
 
+        columns = []
+        for cid, operator, value in filters:
+            column: TableColumn = self.cidmap.get(int(cid))
+            if column is None:
+                raise ValueError(f"Unknown column: {cid}")
+            if operator not in FILTER_OPERATORS:
+                raise ValueError(f"Unknown filter operator: {operator}")
+            key = SORT_KEYS.get(column.datatype, _auto_sort_key)(value)
+            if operator in ("<", "<=", ">", ">=") and key[0] != 0 and column.datatype:
+                raise ValueError(
+                    f"Invalid {column.datatype} value for {column.headertext}: {value!r}"
+                )
+            columns.append((column, operator, key))
+
+        if self._datasource is not None:
+            # the datasource filters the rows
+            check_filters = getattr(self._datasource, "check_filters", None)
+            if check_filters is not None:
+                check_filters(self._datasource_filters(filters))
+            self._filters = filters
+            self.searchcriteria = ""
+            self._rowindex.set(0)
+            self.load_table_data()
+            return
+
+        matches = [
+            self._column_index(column).match(operator, key)
+            for column, operator, key in columns
+        ]
+
+        # intersect starting from the smallest match
+        matches.sort(key=len)
+        result = set(matches[0])
+        for match in matches[1:]:
+            if not result:
+                break
+            result.intersection_update(match)
+
+        member = bytearray(self._store.size)
+        for rid in result:
+            member[rid] = 1
+
+        self.unload_table_data()
+        self._filtered = True
+        self._filters = filters
+        self._rids_filtered = array("q", (rid for rid in self._rids if member[rid]))
+        self.searchcriteria = ""
+        self._searchcache = None
         self._rowindex.set(0)
         self.load_table_data()
 
+    def add_filter(self, cid, operator, value=None):
+        """Add a predicate to the column filter and apply it.
+
+        Parameters:
+
+            cid (int):
+                A unique column identifier.
+
+            operator (str):
+                The comparison operator, see `filter_rows`.
+
+            value (Any):
+                The value to compare with.
+        """
+        self.filter_rows(self._filters + [(int(cid), operator, value)])
+
+    def parse_filters(self, expression) -> List[tuple]:
+        """Parse a filter expression into predicates for `filter_rows`.
+
+        The predicates are separated by ";" or "and", each one is a
+        column header text, an operator and a value, for example
+        `Birth Province = RM and Birth Date < 1970-01-01 and VAT
+        Number present`.
+
+        Parameters:
+
+            expression (str):
+                The filter expression.
+
+        Returns:
+
+            List[tuple]:
+                The (cid, operator, value) predicates.
+
+        Raises:
+
+            ValueError:
+                A predicate or a column is not valid.
+        """
+        columns = {col.headertext.casefold(): col for col in self._tablecols}
+        filters = []
+        for predicate in FILTER_SEPARATOR.split(expression.strip()):
+            if not predicate:
+                continue
+            match = FILTER_COMPARISON.match(predicate) or FILTER_EMPTY.match(predicate)
+            if match is None:
+                raise ValueError(f"Invalid filter: {predicate}")
+            column = columns.get(match["column"].strip().casefold())
+            if column is None:
+                raise ValueError(f"Unknown column: {match['column']}")
+            operator = match["operator"].lower()
+            if operator == "=":
+                operator = "=="
+            value = match.groupdict().get("value")
+            filters.append((column._cid, operator, value))
+        return filters
+
     def filter_to_selected_rows(self):
         """Hide all records except for the selected rows"""
-        criteria = self.view.selection()
-        if len(criteria) == 0:
+        if not self._selected:
             return  # nothing is selected
 
-        if self.is_filtered:
-            for row in self.tablerows_visible:
-                if row.iid not in criteria:
-                    row.hide()
-                    self.tablerows_filtered.remove(row)
-        else:
-            self._filtered = True
-            self.tablerows_filtered.clear()
-            for row in self.tablerows_visible:
-                if row.iid in criteria:
-                    self.tablerows_filtered.append(row)
+        # keep the rows in table order
+        selected = [row._rid for row in self.tablerows_visible if self.is_selected(row)]
+        self.unload_table_data()
+        self._filtered = True
+        self._filters = []
+        self._rids_filtered = array("q", selected)
         self._rowindex.set(0)
         self.load_table_data()
 
     def hide_selected_rows(self):
         """Hide the currently selected rows"""
-        selected = self.view.selection()
+        hidden = set(self._selected)
         view_cnt = len(self._viewdata)
-        hide_cnt = len(selected)
-        self.view.detach(*selected)
-
-        tablerows = []
-        for row in self.tablerows_visible:
-            if row.iid in selected:
-                tablerows.append(row)
+        hide_cnt = len(hidden)
+        self._set_selection(())
 
         if not self.is_filtered:
             self._filtered = True
-            self._tablerows_filtered = self.tablerows.copy()
+            self._rids_filtered = array("q", self._rids)
+        self._filters = []
 
-        for row in tablerows:
-            if self.is_filtered:
-                self.tablerows_filtered.remove(row)
+        self._rids_filtered = array(
+            "q", (rid for rid in self._rids_filtered if rid not in hidden)
+        )
 
         if hide_cnt == view_cnt:
             # assuming that if the count of the records on the page are
@@ -1544,57 +2477,86 @@ class Tableview(ttk.Frame):
 
     # DATA EXPORT
 
+    @property
+    def export_progress(self):
+        """The progress of the running or last export, None if no export
+        was started. A dict with the keys filename, written, total (None
+        when unknown), done, stopped and error (the exception raised)."""
+        return None if self._export is None else dict(self._export)
+
+    @property
+    def is_exporting(self) -> bool:
+        """Indicates whether an export is running"""
+        return self._export is not None and not self._export["done"]
+
     def export_all_records(self):
-        """Export all records to a csv file"""
+        """Export all records to a csv or xlsx file"""
         headers = [col.headertext for col in self.tablecolumns]
-        records = [row.values for row in self.tablerows]
-        self.save_data_to_csv(headers, records, self._delimiter)
+        if self._datasource is not None:
+            # the rows are counted only without search and filters, the
+            # Tk thread does not query the datasource
+            total = None if self.searchcriteria or self._filters else self._rowcount
+            records = self._datasource_records(self._datasort, "", [])
+        else:
+            total = len(self._rids)
+            records = self._store_records(array("q", self._rids))
+        self.save_data_to_csv(headers, records, self._delimiter, total)
 
     def export_current_page(self):
-        """Export records on current page to csv file"""
+        """Export records on current page to csv or xlsx file"""
         headers = [col.headertext for col in self.tablecolumns]
         records = [row.values for row in self.tablerows_visible]
-        self.save_data_to_csv(headers, records, self._delimiter)
+        self.save_data_to_csv(headers, records, self._delimiter, len(records))
 
     def export_current_selection(self):
-        """Export rows currently selected to csv file"""
+        """Export rows currently selected to csv or xlsx file"""
         headers = [col.headertext for col in self.tablecolumns]
-        selected = self.view.selection()
-        records = []
-        for iid in selected:
-            record: TableRow = self.iidmap.get(iid)
-            records.append(record.values)
-        self.save_data_to_csv(headers, records, self._delimiter)
+        rids = array("q", self._selected)
+        records = self._store_records(rids)
+        self.save_data_to_csv(headers, records, self._delimiter, len(rids))
 
     def export_records_in_filter(self):
-        """Export rows currently filtered to csv file"""
+        """Export rows currently filtered to csv or xlsx file"""
         headers = [col.headertext for col in self.tablecolumns]
-        if not self.is_filtered:
-            return
-        records = [row.values for row in self.tablerows_filtered]
-        self.save_data_to_csv(headers, records, self._delimiter)
+        if self._datasource is not None:
+            search = self.searchcriteria
+            filters = self._datasource_filters()
+            if not (search or filters):
+                return
+            total = self._rowcount
+            records = self._datasource_records(self._datasort, search, filters)
+        else:
+            if not self.is_filtered:
+                return
+            total = len(self._rids_filtered)
+            records = self._store_records(array("q", self._rids_filtered))
+        self.save_data_to_csv(headers, records, self._delimiter, total)
 
-    def save_data_to_csv(self, headers, records, delimiter=","):
-        """Save data records to a csv file.
+    def save_data_to_csv(self, headers, records, delimiter=",", total=None):
+        """Ask the file name and save data records to a csv or xlsx
+        file, see `export_records`.
 
         Parameters:
 
             headers (List[str]):
                 A list of header labels.
 
-            records (List[Tuple[...]]):
-                A list of table records.
+            records (Iterable[Tuple[...]]):
+                An iterable of table records.
 
             delimiter (str):
                 The character to use for delimiting the values.
+
+            total (int):
+                The number of records, if known, for the progress.
         """
-        import csv
         from tkinter.filedialog import asksaveasfilename
 
-        timestamp = datetime.now().strftime("%tk.Y%m%d_%H%M%S")
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         initialfile = f"tabledata_{timestamp}.csv"
         filetypes = [
             ("CSV UTF-8 (Comma delimited)", "*.csv"),
+            ("Excel Workbook", "*.xlsx"),
             ("All file types", "*.*"),
         ]
         filename = asksaveasfilename(
@@ -1604,112 +2566,250 @@ class Tableview(ttk.Frame):
             initialfile=initialfile,
         )
         if filename:
-            with open(filename, "w", encoding="utf-8", newline="") as f:
-                writer = csv.writer(f, delimiter=delimiter)
-                writer.writerow(headers)
-                writer.writerows(records)
+            self.export_records(filename, headers, records, delimiter, total)
+
+    def export_records(self, filename, headers, records, delimiter=",", total=None):
+        """Write data records to a csv file, or to an xlsx file when
+        the file name ends with .xlsx.
+
+        The records are consumed in chunks by a worker thread and
+        written as they come, so they are never all held in memory.
+        While writing, the `<<TableviewExport>>` virtual event is
+        generated on the Tableview; read `export_progress` to follow
+        the export. Only one export runs at a time.
+
+        Parameters:
+
+            filename (str):
+                The file to write.
+
+            headers (List[str]):
+                A list of header labels.
+
+            records (Iterable[Tuple[...]]):
+                An iterable of table records, consumed by the worker.
+
+            delimiter (str):
+                The character to use for delimiting the csv values.
+
+            total (int):
+                The number of records, if known, for the progress.
+
+        Returns:
+
+            bool:
+                False if another export is running.
+        """
+        if self.is_exporting:
+            return False
+        state = {
+            "filename": filename,
+            "written": 0,
+            "total": total,
+            "done": False,
+            "stopped": False,
+            "error": None,
+        }
+        stop = threading.Event()
+        self._export = state
+        self._exportstop = stop
+        worker = threading.Thread(
+            target=self._export_worker,
+            args=(state, headers, records, delimiter, stop),
+            daemon=True,
+        )
+        worker.start()
+        self.after(EXPORT_POLL, self._export_poll, state)
+        return True
+
+    def cancel_export(self):
+        """Stop the running export, the file is not kept"""
+        if self.is_exporting:
+            self._exportstop.set()
+
+    def _store_records(self, rids):
+        """Yield the values of the rows; rows deleted meanwhile are
+        skipped and a cleared store stops the export."""
+        store = self._store
+        generation = store.generation
+        for rid in rids:
+            if store.generation != generation:
+                raise RuntimeError("The table data changed during the export")
+            if store.is_alive(rid):
+                yield store.row(rid)
+
+    def _datasource_records(self, sort, search, filters):
+        """Yield the rows of the datasource query, chunk by chunk"""
+        datasource = self._datasource
+        iter_rows = getattr(datasource, "iter_rows", None)
+        if iter_rows is not None:
+            yield from iter_rows(sort, search, filters, EXPORT_CHUNK_SIZE)
+            return
+        offset = 0
+        while True:
+            rows = datasource.page(offset, EXPORT_CHUNK_SIZE, sort, search, filters)
+            yield from rows
+            if len(rows) < EXPORT_CHUNK_SIZE:
+                return
+            offset += len(rows)
+
+    def _export_worker(self, state, headers, records, delimiter, stop):
+        """Write the records to the file in chunks (worker thread)"""
+        import os
+
+        filename = state["filename"]
+        records = iter(records)
+        written = False  # the file was opened for writing
+        try:
+            if filename.lower().endswith(".xlsx"):
+                from openpyxl import Workbook
+
+                workbook = Workbook(write_only=True)
+                sheet = workbook.create_sheet()
+                sheet.append(headers)
+                while not stop.is_set():
+                    chunk = list(islice(records, EXPORT_CHUNK_SIZE))
+                    if not chunk:
+                        written = True
+                        workbook.save(filename)
+                        break
+                    for values in chunk:
+                        sheet.append(values)
+                    state["written"] += len(chunk)
+            else:
+                import csv
+
+                with open(filename, "w", encoding="utf-8", newline="") as f:
+                    written = True
+                    writer = csv.writer(f, delimiter=delimiter)
+                    writer.writerow(headers)
+                    while not stop.is_set():
+                        chunk = list(islice(records, EXPORT_CHUNK_SIZE))
+                        if not chunk:
+                            break
+                        writer.writerows(chunk)
+                        state["written"] += len(chunk)
+            state["stopped"] = stop.is_set()
+        except Exception as e:
+            state["error"] = e
+        finally:
+            close = getattr(records, "close", None)
+            if close is not None:
+                close()
+            failed = state["stopped"] or state["error"] is not None
+            if failed and written and os.path.exists(filename):
+                os.remove(filename)
+            state["done"] = True
+
+    def _export_poll(self, state):
+        """Notify the export progress until the worker is done"""
+        if state is not self._export:
+            return
+        self.event_generate(EXPORT_EVENT)
+        if not state["done"]:
+            self.after(EXPORT_POLL, self._export_poll, state)
 
     # ROW MOVEMENT
 
     def move_selected_rows_to_top(self):
         """Move the selected rows to the top of the data set"""
-        selected = self.view.selection()
+        selected = list(self._selected)
         if len(selected) == 0:
             return
 
         if self.is_filtered:
-            tablerows = self.tablerows_filtered.copy()
+            rids = array("q", self._rids_filtered)
         else:
-            tablerows = self.tablerows.copy()
+            rids = array("q", self._rids)
 
-        for i, iid in enumerate(selected):
-            row = self.iidmap.get(iid)
-            tablerows.remove(row)
-            tablerows.insert(i, row)
+        for i, rid in enumerate(selected):
+            rids.remove(rid)
+            rids.insert(i, rid)
 
         if self.is_filtered:
-            self._tablerows_filtered = tablerows
+            self._rids_filtered = rids
         else:
-            self._tablerows = tablerows
+            self._rids = rids
 
         # refresh the table data
+        self._searchcache = None
         self.unload_table_data()
         self.load_table_data()
 
     def move_selected_rows_to_bottom(self):
         """Move the selected rows to the bottom of the dataset"""
-        selected = self.view.selection()
+        selected = list(self._selected)
         if len(selected) == 0:
             return
 
         if self.is_filtered:
-            tablerows = self.tablerows_filtered.copy()
+            rids = array("q", self._rids_filtered)
         else:
-            tablerows = self.tablerows.copy()
+            rids = array("q", self._rids)
 
-        for iid in selected:
-            row = self.iidmap.get(iid)
-            tablerows.remove(row)
-            tablerows.append(row)
+        for rid in selected:
+            rids.remove(rid)
+            rids.append(rid)
 
         if self.is_filtered:
-            self._tablerows_filtered = tablerows
+            self._rids_filtered = rids
         else:
-            self._tablerows = tablerows
+            self._rids = rids
 
         # refresh the table data
+        self._searchcache = None
         self.unload_table_data()
         self.load_table_data()
 
     def move_selected_row_up(self):
         """Move the selected rows up one position in the dataset"""
-        selected = self.view.selection()
+        selected = list(self._selected)
         if len(selected) == 0:
             return
 
         if self.is_filtered:
-            tablerows = self._tablerows_filtered.copy()
+            rids = array("q", self._rids_filtered)
         else:
-            tablerows = self.tablerows.copy()
+            rids = array("q", self._rids)
 
-        for iid in selected:
-            row = self.iidmap.get(iid)
-            index = tablerows.index(row) - 1
-            tablerows.remove(row)
-            tablerows.insert(index, row)
+        for rid in selected:
+            index = rids.index(rid) - 1
+            rids.remove(rid)
+            rids.insert(index, rid)
 
         if self.is_filtered:
-            self._tablerows_filtered = tablerows
+            self._rids_filtered = rids
         else:
-            self._tablerows = tablerows
+            self._rids = rids
 
         # refresh the table data
+        self._searchcache = None
         self.unload_table_data()
         self.load_table_data()
 
     def move_row_down(self):
         """Move the selected rows down one position in the dataset"""
-        selected = self.view.selection()
+        selected = list(self._selected)
         if len(selected) == 0:
             return
 
         if self._filtered:
-            tablerows = self._tablerows_filtered
+            rids = self._rids_filtered
         else:
-            tablerows = self._tablerows
+            rids = self._rids
 
-        for iid in selected:
-            row = self.iidmap.get(iid)
-            index = tablerows.index(row) + 1
-            tablerows.remove(row)
-            tablerows.insert(index, row)
+        for rid in selected:
+            index = rids.index(rid) + 1
+            rids.remove(rid)
+            rids.insert(index, rid)
 
         if self._filtered:
-            self._tablerows_filtered = tablerows
+            self._rids_filtered = rids
         else:
-            self._tablerows = tablerows
+            self._rids = rids
 
         # refresh the table data
+        self._searchcache = None
         self.unload_table_data()
         self.load_table_data()
 
@@ -1895,10 +2995,10 @@ class Tableview(ttk.Frame):
         """Align the columns and headers based on the data type of the
         values. Text is left-aligned; numbers are right-aligned. This
         method will have no effect if there is no data in the tables."""
-        if len(self._tablerows) == 0:
+        if len(self._rids) == 0:
             return
 
-        values = self._tablerows[0]._values
+        values = self._store.row(self._rids[0])
         for i, value in enumerate(values):
             if str(value).isnumeric():
                 self.view.column(i, anchor=tk.E)
@@ -2042,19 +3142,96 @@ class Tableview(ttk.Frame):
         """Search the table data for records that meet search criteria.
         Currently, this search locates any records that contain the
         specified text; it is also case insensitive.
+
+        The rows are matched against the lower-cased search keys of the
+        store in a worker thread; when the new criteria contains the
+        previous one, only the previous result is searched. The result
+        is applied to the view when ready.
         """
-        criteria = self._searchcriteria.get()
-        self._filtered = True
-        self.tablerows_filtered.clear()
+        if self._searchjob is not None:
+            self.after_cancel(self._searchjob)
+            self._searchjob = None
+
+        self._searchtoken += 1
+        if self._datasource is not None:
+            # the datasource searches the rows
+            self._filters = []
+            self._rowindex.set(0)
+            self.load_table_data()
+            return
+
+        criteria = str(self._searchcriteria.get()).lower()
+        if not criteria:
+            self._searchcache = None
+            self.unload_table_data()
+            self._filtered = False
+            self._filters = []
+            self._rowindex.set(0)
+            self.load_table_data()
+            return
+
+        version = self._store.version
+        cache = self._searchcache
+        if cache is not None and cache[1] == version and cache[0] in criteria:
+            base = cache[2]
+        else:
+            base = array("q", self._rids)
+
+        token = self._searchtoken
+        worker = threading.Thread(
+            target=self._search_worker,
+            args=(token, version, criteria, base),
+            daemon=True,
+        )
+        worker.start()
+        self.after(SEARCH_POLL, self._search_poll, token)
+
+    def _search_worker(self, token, version, criteria, base):
+        """Match the rows of base against criteria (worker thread)"""
+        try:
+            keys = self._store.search_keys()
+            rids = array("q", (rid for rid in base if criteria in keys[rid]))
+        except Exception:
+            # data changed while searching
+            rids = None
+        if token == self._searchtoken:
+            self._searchresults[token] = (version, criteria, rids)
+
+    def _search_poll(self, token):
+        """Apply the search result when the worker is done"""
+        if token != self._searchtoken:
+            return  # a newer search was requested
+        result = self._searchresults.pop(token, None)
+        if result is None:
+            self.after(SEARCH_POLL, self._search_poll, token)
+            return
+
+        self._searchresults.clear()
+        version, criteria, rids = result
+        if rids is None or version != self._store.version:
+            self._search_table_data(None)
+            return
+
         self.unload_table_data()
-        for row in self.tablerows:
-            for col in row.values:
-                if str(criteria).lower() in str(col).lower():
-                    self.tablerows_filtered.append(row)
-                    break
+        self._filtered = True
+        self._filters = []
+        self._rids_filtered = rids
+        self._searchcache = (criteria, version, rids)
         self._rowindex.set(0)
         self.load_table_data()
 
+    def _schedule_search(self, event=None):
+        """Debounce the search while the user is typing"""
+        if event is not None and event.keysym in ("Return", "KP_Enter"):
+            return
+        criteria = str(self._searchcriteria.get()).lower()
+        cache = self._searchcache
+        if cache is not None and cache[0] == criteria:
+            return
+        if self._searchjob is not None:
+            self.after_cancel(self._searchjob)
+        self._searchjob = self.after(SEARCH_DELAY, self._search_table_data, None)
+
     # PRIVATE METHODS - SORTING
 
     def _column_sort_header_reset(self):
@@ -2118,6 +3295,7 @@ class Tableview(ttk.Frame):
         searchterm.pack(fill=tk.X, side=tk.LEFT, expand=tk.YES)
         searchterm.bind("<Return>", self._search_table_data)
         searchterm.bind("<KP_Enter>", self._search_table_data)
+        searchterm.bind("<KeyRelease>", self._schedule_search)
         if not self._paginated:
             ttk.Button(
                 frame,
@@ -2228,6 +3406,12 @@ class Tableview(ttk.Frame):
             sequence = "<Button-3>"
         self.view.bind(sequence, self._table_rightclick)
 
+        # the selection set is updated through its own bind tag so that
+        #   `view.bind("<<TreeviewSelect>>", ...)` does not replace it
+        tag = f"{self.view}.selection"
+        self.view.bindtags((tag,) + self.view.bindtags())
+        self.view.bind_class(tag, "<<TreeviewSelect>>", self._on_treeview_select)
+
         # add trace to track pagesize changes
         self._pagesize.trace_add("write", self._trace_pagesize)
 
@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""
+Controller tests
+
+@File: test_controller.py
+@Date: 2026-10-19
+"""
+
+# Built-in/Generic Imports
+import os
+import tempfile
+import unittest
+from datetime import date
+
+# Own modules
+from new_certificazione_770.controllers import Controller, ImportRunRecorder
+from new_certificazione_770.models import (
+    IMPORT_ABANDONED,
+    IMPORT_CANCELLED,
+    IMPORT_COMPLETED,
+    IMPORT_RUNNING,
+    REJECT_OPEN,
+    REJECT_REPROCESSED,
+    REJECT_STAGE_VALIDATE,
+    REJECT_STAGE_WRITE,
+    Distributor,
+    ImportRun,
+    Invoice,
+)
+
+FILE_HASH = "0" * 64
+
+
+def _distributor(number: str) -> dict:
+    """Distributor record (model columns without id)"""
+    return {
+        "number": number,
+        "name": "Mario",
+        "last_name": "Rossi",
+        "gender": "M",
+        "fiscal_code": "RSSMRA80A01H501U",
+        "birth_date": date(1980, 1, 1),
+        "birth_city": "Roma",
+        "birth_province": "RM",
+    }
+
+
+def _invoice(number: str, total_amount: float) -> dict:
+    """Invoice record of distributor D1 (model columns without id)"""
+    return {
+        "number": number,
+        "year": 2024,
+        "mb_type": "I",
+        "invoice_date": date(2024, 1, 1),
+        "distributor_number": "D1",
+        "taxable_amount": total_amount,
+        "vat_amount": 0,
+        "inps_amount": 0,
+        "rit_amount": 0,
+        "total_amount": total_amount,
+        "aliquota_iva": "0",
+    }
+
+
+class ControllerTestCase(unittest.TestCase):
+    """Controller on a temporary database with distributor D1"""
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.controller = Controller(os.path.join(self.directory.name, "test.db"))
+        self.controller.import_data(data=_distributor("D1"), model="Distributor")
+
+    def tearDown(self) -> None:
+        self.controller.close()
+        self.directory.cleanup()
+
+    def start_run(
+        self,
+        resume: bool = False,
+        import_type: str = "Invoice",
+        duplicates: str = "skip",
+    ) -> dict:
+        """Start an import run of the test file"""
+        return self.controller.start_import_run(
+            file_hash=FILE_HASH,
+            file_name="test.xlsx",
+            import_type=import_type,
+            duplicates=duplicates,
+            chunk_size=2,
+            resume=resume,
+        )
+
+    def get_run(self, id: int) -> ImportRun:
+        """Import run stored in the database"""
+        return self.controller.repository.get_by_id(ImportRun, id)
+
+
+class ImportRunTest(ControllerTestCase):
+    """Import run resume and checkpoints"""
+
+    def test_resume_keeps_checkpoint(self) -> None:
+        """A resumed run continues from its last checkpoint"""
+        run = self.start_run()
+        self.controller.checkpoint_import_run(
+            id=run["id"],
+            chunk=1,
+            counters=dict(rows_done=4, inserted=3, updated=0, errors=1, skipped=0),
+        )
+        self.controller.finish_import_run(id=run["id"], status=IMPORT_CANCELLED)
+
+        resumed = self.start_run(resume=True)
+
+        self.assertEqual(resumed["id"], run["id"])
+        self.assertEqual(resumed["status"], IMPORT_RUNNING)
+        self.assertEqual((resumed["rows_done"], resumed["last_chunk"]), (4, 1))
+        self.assertEqual((resumed["inserted"], resumed["errors"]), (3, 1))
+
+    def test_abandon_deletes_staged_rows(self) -> None:
+        """A new run of the same file abandons the old one and its stage"""
+        run = self.start_run(import_type="Distributor:staged")
+        self.controller.stage_rows(
+            import_run_id=run["id"],
+            model="Distributor",
+            records=[_distributor("D2"), _distributor("D3")],
+        )
+        self.assertEqual(
+            self.controller.count_staged_rows(run["id"], "Distributor"), 2
+        )
+
+        new_run = self.start_run(import_type="Distributor:staged")
+
+        self.assertNotEqual(new_run["id"], run["id"])
+        self.assertEqual(new_run["rows_done"], 0)
+        self.assertEqual(self.get_run(run["id"]).status, IMPORT_ABANDONED)
+        self.assertEqual(
+            self.controller.count_staged_rows(run["id"], "Distributor"), 0
+        )
+
+    def test_checkpoint_commits_with_batch(self) -> None:
+        """The checkpoint and its batch commit or roll back together"""
+        run = self.start_run()
+
+        def _write(numbers: list[str], chunk: int, fail: bool = False) -> None:
+            with self.controller.transaction():
+                records, items, _ = self.controller.validate_invoices(
+                    [_invoice(number, 10) for number in numbers]
+                )
+                inserted, _, _, _ = self.controller.insert_invoices(
+                    records=records, items=items, duplicates="skip"
+                )
+                self.controller.checkpoint_import_run(
+                    id=run["id"],
+                    chunk=chunk,
+                    counters=dict(rows_done=(chunk + 1) * 2, inserted=inserted),
+                )
+                if fail:
+                    raise RuntimeError("crash after the checkpoint")
+
+        _write(["1", "2"], chunk=0)
+        with self.assertRaises(RuntimeError):
+            _write(["3", "4"], chunk=1, fail=True)
+
+        stored = self.get_run(run["id"])
+        self.assertEqual((stored.last_chunk, stored.rows_done), (0, 2))
+        self.assertEqual(stored.inserted, 2)
+        invoices = sorted(i.number for i in self.controller.repository.list(Invoice))
+        self.assertEqual(invoices, ["1", "2"])
+
+    def test_recorder_resumes_after_checkpoint(self) -> None:
+        """A second run of the same file skips the rows and chunks done"""
+        checkpoint = dict(
+            file_hash=FILE_HASH,
+            file_name="test.xlsx",
+            import_type="Distributor",
+            resume=False,
+        )
+        recorder = ImportRunRecorder(
+            self.controller, "Distributor", "skip", checkpoint, chunk_size=2
+        )
+        recorder.start()
+        for number in ("D2", "D3", "D4"):
+            recorder.advance()
+            self.controller.import_data(data=_distributor(number), model="Distributor")
+            recorder.record(inserted=1)
+            if recorder.done % recorder.chunk_size == 0:
+                recorder.save()
+        # Interrupted inside the second chunk: D4 is not checkpointed
+        del recorder
+
+        resumed = ImportRunRecorder(
+            self.controller,
+            "Distributor",
+            "replace",
+            dict(checkpoint, resume=True),
+            chunk_size=10,
+        )
+        run = resumed.start()
+
+        self.assertEqual((run["rows_done"], run["last_chunk"]), (2, 0))
+        self.assertEqual((resumed.done, resumed.chunk), (2, 0))
+        # The resumed run keeps its duplicate mode, chunks and counters
+        self.assertEqual((resumed.duplicates, resumed.chunk_size), ("skip", 2))
+        self.assertEqual(resumed.totals(), [2, 0, 0, 0])
+        resumed.advance()
+        resumed.record(updated=1)
+        resumed.finish(IMPORT_CANCELLED)
+        stored = self.get_run(run["id"])
+        self.assertEqual((stored.rows_done, stored.inserted, stored.updated), (3, 2, 1))
+        self.assertEqual(len(self.controller.repository.list(Distributor)), 4)
+
+
+class ReprocessImportRejectsTest(ControllerTestCase):
+    """Reprocess of the corrected rejects of an invoice import"""
+
+    def test_mixed_rejects(self) -> None:
+        """Each reject gets the outcome of its own corrected record"""
+        run = self.start_run(duplicates="report")
+        records, items, _ = self.controller.validate_invoices([_invoice("2", 10)])
+        self.controller.insert_invoices(records=records, items=items)
+        rejects = [
+            (_invoice(number, 10), ValueError("invalid"), REJECT_STAGE_WRITE)
+            for number in ("1", "3", "4", "2", "5")
+        ]
+        self.controller.add_import_rejects(import_run_id=run["id"], rejects=rejects)
+        self.controller.finish_import_run(
+            id=run["id"],
+            status=IMPORT_COMPLETED,
+            counters=dict(rows_done=6, inserted=1, updated=0, errors=5, skipped=0),
+        )
+        ids = [r["id"] for r in self.controller.get_import_rejects(run["id"])]
+        corrections = [
+            _invoice("1", 20),  # corrected
+            dict(_invoice("3", 20), distributor_number="NOPE"),  # no distributor
+            dict(_invoice("4", 20), distributor_number=None),  # still invalid
+            _invoice("2", 20),  # duplicate of the stored invoice
+        ]
+        for _id, data in zip(ids, corrections):
+            self.controller.correct_import_reject(id=_id, data=data)
+
+        reprocessed, rejected = self.controller.reprocess_import_rejects(
+            run["id"], chunk_size=2
+        )
+
+        self.assertEqual((reprocessed, rejected), (1, 3))
+        outcome = [
+            (r["status"], r["stage"], r["error_code"])
+            for r in self.controller.get_import_rejects(run["id"])
+        ]
+        self.assertEqual(
+            outcome,
+            [
+                (REJECT_REPROCESSED, REJECT_STAGE_WRITE, "ValueError"),
+                (REJECT_OPEN, REJECT_STAGE_WRITE, "NoDataFoundError"),
+                (REJECT_OPEN, REJECT_STAGE_VALIDATE, "KeyAttributeNotFoundError"),
+                (REJECT_OPEN, REJECT_STAGE_WRITE, "DuplicateInvoiceError"),
+                (REJECT_OPEN, REJECT_STAGE_WRITE, "ValueError"),
+            ],
+        )
+        stored = self.get_run(run["id"])
+        self.assertEqual((stored.inserted, stored.errors, stored.skipped), (2, 4, 0))
+        invoices = sorted(
+            (i.number, i.total_amount) for i in self.controller.repository.list(Invoice)
+        )
+        self.assertEqual(invoices, [("1", 20), ("2", 10)])
+
+
+if __name__ == "__main__":
+    unittest.main()
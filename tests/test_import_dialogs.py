@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Import workers tests
+
+@File: test_import_dialogs.py
+@Date: 2026-10-19
+"""
+
+# Built-in/Generic Imports
+import os
+import tempfile
+import unittest
+from datetime import date
+from queue import Queue
+from threading import Event
+
+# Own modules
+from new_certificazione_770.controllers import Controller
+from new_certificazione_770.models import IMPORT_CANCELLED, Distributor
+from new_certificazione_770.views import import_dialogs
+
+FILE_HASH = "0" * 64
+NUMBERS = ["D1", "D2", "D3", "D4", "D5"]
+
+
+def _distributor(number: str) -> dict:
+    """Distributor record of the import (model columns without id)"""
+    return dict(
+        number=number,
+        name="MARIO",
+        last_name="ROSSI",
+        gender="M",
+        vat_number="",
+        fiscal_code="RSSMRA80A01H501U",
+        birth_city="ROMA",
+        birth_province="RM",
+        birth_date=date(1980, 1, 1),
+        residential_city="",
+        residential_province="",
+        residential_zip_code="",
+        residential_address="",
+    )
+
+
+class ResumeImportTest(unittest.TestCase):
+    """A resumed import skips the rows and chunks of its last checkpoint"""
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.controller = Controller(os.path.join(self.directory.name, "test.db"))
+
+    def tearDown(self) -> None:
+        self.controller.close()
+        self.directory.cleanup()
+
+    def interrupt_run(self, import_type: str) -> dict:
+        """Import run cancelled after its first chunk of two rows"""
+        checkpoint = dict(
+            file_hash=FILE_HASH,
+            file_name="test.xlsx",
+            import_type=import_type,
+            resume=True,
+        )
+        run = self.controller.start_import_run(
+            duplicates="skip", chunk_size=2, **dict(checkpoint, resume=False)
+        )
+        self.controller.checkpoint_import_run(
+            id=run["id"],
+            chunk=0,
+            counters=dict(rows_done=2, inserted=2, updated=0, errors=0, skipped=0),
+        )
+        self.controller.finish_import_run(id=run["id"], status=IMPORT_CANCELLED)
+        return checkpoint
+
+    def assert_resumed(self, result: tuple) -> None:
+        """Only the rows after the checkpoint are imported"""
+        exit, msg, records, _ = result
+        self.assertEqual((exit, msg), (0, "OK"))
+        self.assertEqual(records, [5, 0, 0, 0])
+        numbers = sorted(d.number for d in self.controller.repository.list(Distributor))
+        self.assertEqual(numbers, NUMBERS[2:])
+
+    def test_queue_import_skips_rows_done(self) -> None:
+        """The one step import skips rows_done rows of the queue"""
+        checkpoint = self.interrupt_run(import_type="Distributor")
+        queue = Queue()
+        for number in NUMBERS:
+            queue.put(_distributor(number))
+
+        result = import_dialogs._thread_import_data_on_db(
+            self.controller, "Distributor", queue, Event(), "skip", checkpoint
+        )
+
+        self.assert_resumed(result)
+
+    def test_pipeline_import_skips_last_chunk(self) -> None:
+        """The pipelined import skips the chunks up to last_chunk"""
+        from openpyxl import Workbook
+
+        checkpoint = self.interrupt_run(import_type="Distributor:pipeline")
+        excel_file = os.path.join(self.directory.name, "test.xlsx")
+        workbook = Workbook()
+        sheet = workbook.active
+        fields_list = import_dialogs.DISTRIBUTOR_FIELDS_LIST
+        sheet.append([column for column, _, _ in fields_list])
+        for number in NUMBERS:
+            record = _distributor(number)
+            sheet.append([record[field] for _, _, field in fields_list])
+        workbook.save(excel_file)
+
+        result = import_dialogs._thread_pipeline_import(
+            self.controller, excel_file, "Distributor", Event(), "skip", checkpoint
+        )
+
+        self.assert_resumed(result)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""
+Logger tests
+
+@File: test_logger.py
+@Date: 2026-10-19
+"""
+
+# Built-in/Generic Imports
+import logging
+import unittest
+
+# Own modules
+from new_certificazione_770.logger import LOG_STAGE, RateLimitFilter
+
+
+def _record(msg: str, stage: str | None = None) -> logging.LogRecord:
+    """Warning record, with the stage attribute when given"""
+    record = logging.LogRecord("test", logging.WARNING, __file__, 1, msg, None, None)
+    if stage is not None:
+        setattr(record, LOG_STAGE, stage)
+    return record
+
+
+class RateLimitFilterTest(unittest.TestCase):
+    """Rate limit of the log records"""
+
+    def test_only_stage_records_are_limited(self) -> None:
+        """Records without a stage always pass, the stage ones up to burst"""
+        log_filter = RateLimitFilter(burst=2, interval=60)
+
+        plain = [log_filter.filter(_record(f"plain {i}")) for i in range(5)]
+        staged = [log_filter.filter(_record(f"row {i}", "import")) for i in range(5)]
+
+        self.assertEqual(plain, [True] * 5)
+        self.assertEqual(staged, [True, True, False, False, False])
+        self.assertEqual(log_filter.pop_suppressed(), [("import", 3)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Schema migrations tests
+
+@File: test_migrations.py
+@Date: 2026-10-19
+"""
+
+# Built-in/Generic Imports
+import os
+import tempfile
+import unittest
+from datetime import date
+
+# Libs
+from sqlalchemy import create_engine, func, insert, inspect, select
+
+# Own modules
+from new_certificazione_770.models import Distributor, Invoice, Setting, migrations
+
+
+class UpgradeTest(unittest.TestCase):
+    """Upgrade of a release 0.2.x database to the current schema"""
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        path = os.path.join(self.directory.name, "test.db")
+        self.engine = create_engine(f"sqlite:///{path}")
+        # Baseline: user_version 0, old settings table, duplicated invoice keys
+        with self.engine.begin() as connection:
+            connection.exec_driver_sql(
+                "CREATE TABLE settings"
+                " (id INTEGER PRIMARY KEY, code_somme_non_sogg TEXT)"
+            )
+            Distributor.__table__.create(bind=connection)
+            Invoice.__table__.create(bind=connection)
+            connection.execute(
+                insert(Distributor.__table__),
+                dict(
+                    id=1,
+                    number="D1",
+                    last_name="Rossi",
+                    fiscal_code="RSSMRA80A01H501U",
+                    birth_date=date(1980, 1, 1),
+                    birth_city="Roma",
+                    birth_province="RM",
+                ),
+            )
+            connection.execute(
+                insert(Invoice.__table__),
+                [
+                    dict(
+                        number="1",
+                        year=2024,
+                        mb_type="I",
+                        invoice_date=date(2024, 1, 1),
+                        distributor_number="D1",
+                        distributor_id=1,
+                        total_amount=total_amount,
+                    )
+                    for total_amount in (10, 20)
+                ],
+            )
+
+    def tearDown(self) -> None:
+        self.engine.dispose()
+        self.directory.cleanup()
+
+    def test_upgrade_from_baseline(self) -> None:
+        """Every step runs once and the data is kept"""
+        applied = migrations.upgrade(self.engine)
+
+        self.assertEqual(applied, [version for version, _, _ in migrations.MIGRATIONS])
+        inspector = inspect(self.engine)
+        with self.engine.connect() as connection:
+            self.assertEqual(
+                migrations.get_schema_version(connection), migrations.SCHEMA_VERSION
+            )
+            invoices = connection.execute(
+                select(func.count()).select_from(Invoice.__table__)
+            ).scalar()
+            distributors = connection.execute(
+                select(func.count()).select_from(Distributor.__table__)
+            ).scalar()
+            self.assertFalse(migrations.invoice_natural_key_is_unique(connection))
+        self.assertEqual((invoices, distributors), (2, 1))
+        self.assertIn(
+            "name", [c["name"] for c in inspector.get_columns(Setting.__tablename__)]
+        )
+        self.assertIn(
+            migrations.INVOICE_KEY_INDEX,
+            [i["name"] for i in inspector.get_indexes(Invoice.__tablename__)],
+        )
+        tables = inspector.get_table_names()
+        for table in migrations.IMPORT_STAGE_TABLES.values():
+            self.assertIn(table.name, tables)
+
+    def test_current_schema_skips_steps(self) -> None:
+        """A current schema runs no step"""
+        migrations.upgrade(self.engine)
+        steps = migrations.MIGRATIONS[:]
+
+        def _fail(connection) -> None:
+            self.fail("Migration step applied to a current schema")
+
+        migrations.MIGRATIONS[:] = [(v, d, _fail) for v, d, _ in steps]
+        try:
+            applied = migrations.upgrade(self.engine)
+        finally:
+            migrations.MIGRATIONS[:] = steps
+        self.assertEqual(applied, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
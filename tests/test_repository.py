@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+Repository tests
+
+@File: test_repository.py
+@Date: 2026-10-19
+"""
+
+# Built-in/Generic Imports
+import os
+import tempfile
+import unittest
+from datetime import date
+
+# Own modules
+from new_certificazione_770.models import Distributor, Invoice, Repository
+from new_certificazione_770.models.repository import (
+    DUPLICATE_KEEP,
+    DUPLICATE_REPLACE,
+    REJECT_DUPLICATE,
+)
+
+
+def _invoice(number: str, total_amount: float) -> dict:
+    """Invoice record of distributor D1 (model columns without id)"""
+    return {
+        "number": number,
+        "year": 2024,
+        "mb_type": "I",
+        "invoice_date": date(2024, 1, 1),
+        "distributor_number": "D1",
+        "taxable_amount": total_amount,
+        "vat_amount": 0,
+        "inps_amount": 0,
+        "rit_amount": 0,
+        "total_amount": total_amount,
+        "aliquota_iva": "0",
+    }
+
+
+class InsertInvoicesBulkTest(unittest.TestCase):
+    """insert_invoices_bulk duplicate handling"""
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.repository = Repository(os.path.join(self.directory.name, "test.db"))
+        self.repository.open_session()
+        with self.repository.session_scope(write=True) as session:
+            session.add(
+                Distributor(
+                    number="D1",
+                    last_name="Rossi",
+                    fiscal_code="RSSMRA80A01H501U",
+                    birth_date=date(1980, 1, 1),
+                    birth_city="Roma",
+                    birth_province="RM",
+                )
+            )
+
+    def tearDown(self) -> None:
+        self.repository.close_session()
+        self.directory.cleanup()
+
+    def test_replace_legacy_duplicate_keys(self) -> None:
+        """Replace counts keys, not rows, on a table with duplicated keys"""
+        # Without the optional unique index a key can be stored three times
+        with self.repository.session_scope(write=True) as session:
+            distributor_id = self.repository.list(Distributor, number="D1")[0].id
+            for _ in range(3):
+                session.add(Invoice(distributor_id=distributor_id, **_invoice("1", 10)))
+
+        inserted, replaced, skipped, rejects = self.repository.insert_invoices_bulk(
+            [_invoice("1", 20), _invoice("2", 30)], DUPLICATE_REPLACE
+        )
+        self.assertEqual((inserted, replaced, skipped, rejects), (1, 1, 0, []))
+        invoices = sorted(
+            (invoice.number, invoice.total_amount)
+            for invoice in self.repository.list(Invoice)
+        )
+        self.assertEqual(invoices, [("1", 20), ("2", 30)])
+
+    def test_replace_superseded_in_batch(self) -> None:
+        """Replace keeps the last row of a key and skips the superseded ones"""
+        self.repository.insert_invoices_bulk([_invoice("1", 10)])
+
+        inserted, replaced, skipped, rejects = self.repository.insert_invoices_bulk(
+            [_invoice("1", 20), _invoice("1", 25), _invoice("2", 30)],
+            DUPLICATE_REPLACE,
+        )
+        self.assertEqual((inserted, replaced, skipped, rejects), (1, 1, 1, []))
+        invoices = sorted(
+            (invoice.number, invoice.total_amount)
+            for invoice in self.repository.list(Invoice)
+        )
+        self.assertEqual(invoices, [("1", 25), ("2", 30)])
+
+    def test_keep_repeated_keys(self) -> None:
+        """Keep stores repeated keys while the unique index is off"""
+        self.repository.insert_invoices_bulk([_invoice("1", 10)])
+
+        result = self.repository.insert_invoices_bulk(
+            [_invoice("1", 20), _invoice("1", 20)], DUPLICATE_KEEP
+        )
+        self.assertEqual(result, (2, 0, 0, []))
+        self.assertEqual(len(self.repository.list(Invoice, number="1")), 3)
+
+    def test_keep_with_unique_key(self) -> None:
+        """The unique index is opt-in and turns keep into report"""
+        self.assertTrue(self.repository.ensure_invoice_natural_key(unique=True))
+        self.repository.insert_invoices_bulk([_invoice("1", 10)])
+
+        result = self.repository.insert_invoices_bulk(
+            [_invoice("1", 20), _invoice("2", 30)], DUPLICATE_KEEP
+        )
+        rejects = [(0, REJECT_DUPLICATE, "Duplicate invoice")]
+        self.assertEqual(result, (1, 0, 0, rejects))
+
+        # Back to the plain index, repeated keys are kept again
+        self.assertFalse(self.repository.ensure_invoice_natural_key(unique=False))
+        result = self.repository.insert_invoices_bulk(
+            [_invoice("1", 20)], DUPLICATE_KEEP
+        )
+        self.assertEqual(result, (1, 0, 0, []))
+
+    def test_unique_key_with_duplicated_keys(self) -> None:
+        """The unique index is not created over duplicated keys"""
+        self.repository.insert_invoices_bulk(
+            [_invoice("1", 10), _invoice("1", 20)], DUPLICATE_KEEP
+        )
+        self.assertFalse(self.repository.ensure_invoice_natural_key(unique=True))
+
+
+class GetPageTest(unittest.TestCase):
+    """get_page keyset pagination"""
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.repository = Repository(os.path.join(self.directory.name, "test.db"))
+        self.repository.open_session()
+        with self.repository.session_scope(write=True) as session:
+            for number in range(1, 6):
+                session.add(
+                    Distributor(
+                        number=f"D{number}",
+                        last_name="Rossi",
+                        fiscal_code="RSSMRA80A01H501U",
+                        birth_date=date(1980, 1, 1),
+                        birth_city="Roma",
+                        birth_province="RM",
+                    )
+                )
+
+    def tearDown(self) -> None:
+        self.repository.close_session()
+        self.directory.cleanup()
+
+    def test_keyset_follows_the_order(self) -> None:
+        """The page after a known id continues in the requested direction"""
+        for descending, after_id, expected in (
+            (False, 2, [3, 4]),
+            (True, 4, [3, 2]),
+        ):
+            rows = self.repository.get_page(
+                Distributor,
+                ["id"],
+                limit=2,
+                descending=descending,
+                after_id=after_id,
+            )
+            self.assertEqual([row[0] for row in rows], expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
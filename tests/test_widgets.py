@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Widgets tests
+
+@File: test_widgets.py
+@Date: 2026-10-19
+"""
+
+# Built-in/Generic Imports
+import threading
+import time
+import tkinter as tk
+import unittest
+from array import array
+
+# Own modules
+from new_certificazione_770.views.widgets import Tableview
+
+
+class TableviewSearchTest(unittest.TestCase):
+    """Tableview search worker results"""
+
+    def setUp(self) -> None:
+        try:
+            self.root = tk.Tk()
+        except tk.TclError:
+            self.skipTest("No display available")
+        self.root.withdraw()
+        self.table = Tableview(
+            self.root,
+            coldata=["Number", "Name"],
+            rowdata=[[i, f"name {i}"] for i in range(100)],
+            paginated=True,
+            pagesize=10,
+        )
+
+    def tearDown(self) -> None:
+        self.root.destroy()
+
+    def test_workers_finish_in_reverse_order(self) -> None:
+        """A slower older search does not hide the result of the newer one"""
+        table = self.table
+        version = table._store.version
+        base = array("q", table._rids)
+        table._searchtoken += 2
+        older, newer = table._searchtoken - 1, table._searchtoken
+
+        table._search_worker(newer, version, "name 1", base)
+        table._search_worker(older, version, "name", base)
+        table._search_poll(newer)
+
+        # name 1 and name 10 to name 19
+        self.assertTrue(table.is_filtered)
+        self.assertEqual(table.rowcount, 11)
+        self.assertEqual(table._searchresults, {})
+
+
+
+class _BlockingDataSource:
+    """Datasource recording its queries, count waits for the gate"""
+
+    def __init__(self) -> None:
+        self.calls = []
+        self.gate = threading.Event()
+
+    def count(self, search, filters) -> int:
+        self.calls.append(("count", search))
+        self.gate.wait(timeout=5)
+        return 100
+
+    def page(self, offset, limit, sort, search, filters) -> list:
+        self.calls.append(("page", search))
+        return [[i, f"name {i}"] for i in range(offset, offset + limit)]
+
+
+class TableviewDatasourceTest(unittest.TestCase):
+    """Tableview datasource page requests"""
+
+    def setUp(self) -> None:
+        try:
+            self.root = tk.Tk()
+        except tk.TclError:
+            self.skipTest("No display available")
+        self.root.withdraw()
+        self.table = Tableview(
+            self.root, coldata=["Number", "Name"], paginated=True, pagesize=10
+        )
+
+    def tearDown(self) -> None:
+        self.root.destroy()
+
+    def test_replaced_requests_are_not_queried(self) -> None:
+        """Requests replaced while the worker is busy never reach the datasource"""
+        table = self.table
+        datasource = _BlockingDataSource()
+        table.set_datasource(datasource)
+        deadline = time.monotonic() + 5
+        while not datasource.calls:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+        for criteria in ("a", "b", "c"):
+            table._searchcriteria.set(criteria)
+            table._load_datasource_page()
+        datasource.gate.set()
+
+        while table._pageworker is not None or table._pageresults:
+            self.assertLess(time.monotonic(), deadline)
+            self.root.update()
+
+        # the first count was running, its page is skipped
+        self.assertEqual(
+            datasource.calls, [("count", ""), ("count", "c"), ("page", "c")]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()